@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autores', '0002_alter_autor_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='autor',
+            index=models.Index(fields=['nombre'], name='autor_nombre_idx'),
+        ),
+    ]
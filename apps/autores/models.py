@@ -7,11 +7,16 @@ class Autor(models.Model):
     nombre = models.CharField(max_length=100)
     biografia = models.TextField(blank=True)
     nacionalidad = models.CharField(max_length=100)
+    # Versión para ETag / Last-Modified de la API
+    modificado = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['nombre']
         verbose_name = 'Autor'
         verbose_name_plural = 'Autores'
+        indexes = [
+            models.Index(fields=['nombre'], name='autor_nombre_idx'),
+        ]
     
     def __str__(self):
         return self.nombre
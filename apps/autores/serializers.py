@@ -18,4 +18,12 @@ class AutorSerializer(serializers.ModelSerializer):
             qs = qs.exclude(pk=self.instance.pk)
         if qs.exists():
             raise serializers.ValidationError("Ya existe un autor con este nombre")
-        return value
\ No newline at end of file
+        return value
+
+class AutorLoteSerializer(AutorSerializer):
+    """
+    Variante de ``AutorSerializer`` para las operaciones por lotes: la
+    unicidad del nombre la comprueba ``AutorService`` con una consulta por lote.
+    """
+    def validate_nombre(self, value):
+        return value
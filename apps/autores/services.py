@@ -0,0 +1,121 @@
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.core.exceptions import ValidationError
+from apps.common import cache_respuestas
+from apps.libros.models import Libro
+from apps.libros.search import reconstruir_indice
+from .models import Autor
+
+class AutorService:
+    @staticmethod
+    @transaction.atomic
+    def crear_autores_lote(elementos):
+        """
+        Crea varios autores con un único ``bulk_create``.
+
+        Args:
+            elementos: Lista de ``(indice, datos)`` ya validados por
+                ``AutorLoteSerializer``
+
+        Returns:
+            Tupla ``(creados, errores)``: diccionarios por índice con el autor
+            creado o los errores del elemento
+        """
+        errores = AutorService._validar_lote([(indice, None, datos) for indice, datos in elementos])
+
+        creados = {}
+        for indice, datos in elementos:
+            if indice in errores:
+                continue
+            autor = Autor(**datos)
+            try:
+                autor.clean_fields()
+            except ValidationError as e:
+                errores[indice] = e.message_dict
+                continue
+            creados[indice] = autor
+
+        if creados:
+            Autor.objects.bulk_create(creados.values())
+            if next(iter(creados.values())).pk is None:
+                # MySQL no devuelve las PKs de bulk_create: se leen por nombre
+                pks = dict(Autor.objects.filter(
+                    nombre__in=[autor.nombre for autor in creados.values()]
+                ).values_list('nombre', 'pk'))
+                for autor in creados.values():
+                    autor.pk = pks[autor.nombre]
+            # bulk_create no emite post_save
+            cache_respuestas.invalidar(Autor)
+
+        return creados, errores
+
+    @staticmethod
+    @transaction.atomic
+    def actualizar_autores_lote(elementos):
+        """
+        Aplica actualizaciones parciales a varios autores con un único
+        ``bulk_update`` sobre la unión de los campos modificados.
+
+        Args:
+            elementos: Lista de ``(indice, autor, datos)`` ya validados por
+                ``AutorLoteSerializer``
+
+        Returns:
+            Tupla ``(actualizados, errores)`` por índice
+        """
+        errores = AutorService._validar_lote(elementos)
+
+        actualizados = {}
+        campos = set()
+        for indice, autor, datos in elementos:
+            if indice in errores:
+                continue
+            for campo, valor in datos.items():
+                setattr(autor, campo, valor)
+            try:
+                autor.clean_fields()
+            except ValidationError as e:
+                errores[indice] = e.message_dict
+                continue
+            actualizados[indice] = autor
+            campos.update(datos)
+
+        if actualizados:
+            ahora = timezone.now()
+            for autor in actualizados.values():
+                autor.modificado = ahora
+            Autor.objects.bulk_update(actualizados.values(), sorted(campos | {'modificado'}))
+            if 'nombre' in campos:
+                # bulk_update no emite post_save: se reindexan sus libros
+                reconstruir_indice(Libro.objects.filter(autor__in=list(actualizados.values())))
+            cache_respuestas.invalidar(Autor)
+
+        return actualizados, errores
+
+    @staticmethod
+    def _validar_lote(elementos):
+        """
+        Comprueba en una sola consulta que los nombres no existan ya (sin
+        distinguir mayúsculas) ni se repitan en el lote. Devuelve los errores
+        por índice.
+        """
+        nombres = {datos['nombre'].lower() for _, _, datos in elementos if 'nombre' in datos}
+        ocupados = dict(
+            Autor.objects.annotate(nombre_minusculas=Lower('nombre'))
+            .filter(nombre_minusculas__in=nombres)
+            .values_list('nombre_minusculas', 'pk')
+        )
+
+        errores = {}
+        for indice, autor, datos in elementos:
+            if 'nombre' not in datos:
+                continue
+            clave = datos['nombre'].lower()
+            propietario = ocupados.get(clave)
+            if propietario is not None and (autor is None or propietario != autor.pk):
+                errores[indice] = {'nombre': ['Ya existe un autor con este nombre.']}
+            else:
+                # Reservado para este elemento: detecta repetidos en el lote
+                ocupados[clave] = autor.pk if autor else -indice - 1
+        return errores
@@ -1,6 +1,13 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from .models import Autor
-from .serializers import AutorSerializer
+from .serializers import AutorLoteSerializer, AutorSerializer
+from .services import AutorService
+from apps.common.cache_respuestas import CacheRespuestasMixin
+from apps.common.condicional import CondicionalMixin
+from apps.common.lectura import EsquemaLectura, LecturaRapidaMixin
+from apps.common.replicas import LecturaReplicaMixin
+from apps.common.lotes import elementos_solicitud, ids_solicitados, respuesta_lote, validar_elementos
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
@@ -8,9 +15,11 @@ from django.shortcuts import render, redirect
 
 # Create your views here.
 
-class AutorViewSet(viewsets.ModelViewSet):
+class AutorViewSet(LecturaReplicaMixin, CondicionalMixin, CacheRespuestasMixin, LecturaRapidaMixin, viewsets.ModelViewSet):
     queryset = Autor.objects.all()
     serializer_class = AutorSerializer
+    esquema_lectura = EsquemaLectura(AutorSerializer)
+    cache_modelos = (Autor,)
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -19,6 +28,26 @@ class AutorViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
 
+    @action(detail=False, methods=['post', 'patch'], serializer_class=AutorLoteSerializer)
+    def lote(self, request):
+        """
+        Crea (``POST``) o actualiza parcialmente (``PATCH``, cada objeto con
+        su ``id``) una lista de autores. Devuelve un resultado por elemento.
+        """
+        elementos = elementos_solicitud(request)
+        contexto = self.get_serializer_context()
+        if request.method == 'POST':
+            validos, errores = validar_elementos(AutorLoteSerializer, elementos, context=contexto)
+            guardados, rechazados = AutorService.crear_autores_lote(
+                [(indice, datos) for indice, _, datos in validos]
+            )
+            return respuesta_lote(len(elementos), guardados, {**errores, **rechazados}, status.HTTP_201_CREATED)
+
+        instancias = Autor.objects.in_bulk(ids_solicitados(elementos))
+        validos, errores = validar_elementos(AutorLoteSerializer, elementos, instancias, context=contexto)
+        guardados, rechazados = AutorService.actualizar_autores_lote(validos)
+        return respuesta_lote(len(elementos), guardados, {**errores, **rechazados})
+
 def registro(request):
     if request.method == 'POST':
         form = UserCreationForm(request.POST)
@@ -0,0 +1,192 @@
+"""
+Lecturas asíncronas de la API para el servidor ASGI.
+
+DRF no tiene vistas asíncronas. ``vista_asincrona`` convierte las acciones
+``list`` y ``retrieve`` de un viewset con ``LecturaRapidaMixin`` en una
+vista asíncrona de Django que responde lo mismo que el viewset: el mismo
+``EsquemaLectura`` (con ``?fields=`` y ``?expand=``), los mismos cursores de
+paginación por clave y la misma caché de respuestas anónimas.
+
+Es una capa asíncrona fina sobre piezas síncronas de DRF. Son asíncronas la
+consulta de la caché (``cache.aget`` y las generaciones con
+``aget_many``) y la lectura de la página o del objeto (``async for``,
+``afirst``). Siguen siendo síncronas, cada una en su ``sync_to_async``:
+
+- ``_preparar``: autenticación, permisos y throttles del viewset
+  (``initial`` de DRF). Las peticiones que la vía asíncrona no cubre
+  (paginación numerada, GET condicionales, formatos distintos de JSON) se
+  atienden aquí con el ``dispatch`` síncrono del viewset.
+- ``_consultar``: los filtros, que pueden consultar la base de datos al
+  construirse (django-filter y el ranking de la búsqueda de texto
+  completo). Solo se ejecuta si la respuesta no estaba en la caché.
+
+Mientras se ejecutan ocupan un hilo del ejecutor de ``sync_to_async``; el
+ahorro frente al servidor WSGI está en la espera de la caché, de la página
+y del envío al cliente.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.http import require_safe
+from rest_framework import exceptions
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from . import cache_respuestas, replicas
+from .cache_respuestas import CacheRespuestasMixin
+from .pagination import (
+    BibliotecaPagination, KeysetPagination, apagina_keyset, codificar_cursor, decodificar_cursor,
+    ordenacion_keyset
+)
+
+PREFIJO = 'async'
+
+# Cabeceras con las que la respuesta ya no sale de la vía asíncrona
+CABECERAS_CONDICIONALES = ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+
+
+def vista_asincrona(clase, accion, basename):
+    """
+    Vista asíncrona (solo ``GET`` y ``HEAD``) para la acción ``list`` o
+    ``retrieve`` del viewset ``clase``, registrado con ``basename``.
+    """
+    @require_safe
+    async def vista(request, **kwargs):
+        preparada = await sync_to_async(_preparar)(request, clase, accion, basename, kwargs)
+        if not isinstance(preparada, _Lectura):
+            return preparada
+        vista = preparada.vista
+        if isinstance(vista, CacheRespuestasMixin) and not preparada.peticion.user.is_authenticated:
+            preparada.clave = await cache_respuestas.aclave_respuesta(
+                preparada.peticion, f'{PREFIJO}:{vista.basename}:{accion}', vista.cache_modelos
+            )
+            datos = await cache.aget(preparada.clave)
+            if datos is not None:
+                return preparada.responder(datos, 'HIT')
+            # Lo que se guarda sale de la principal, no de una réplica atrasada
+            replicas.desactivar()
+        try:
+            await sync_to_async(_consultar)(preparada)
+        except Exception as exc:
+            return preparada.responder_error(exc)
+        try:
+            if accion == 'list':
+                datos = await _pagina(preparada)
+            else:
+                datos = await _objeto(preparada)
+        except exceptions.APIException as exc:
+            return preparada.responder_error(exc)
+        if preparada.clave is not None:
+            await cache.aset(preparada.clave, datos, _ttl())
+        return preparada.responder(datos, 'MISS')
+
+    vista.__name__ = vista.__qualname__ = f'{clase.__name__}_{accion}_async'
+    return vista
+
+
+def _ttl():
+    return getattr(settings, 'CACHE_RESPUESTAS_TTL', cache_respuestas.TTL_POR_DEFECTO)
+
+
+class _Lectura:
+    """Estado de una petición ya autorizada, a falta de leer los datos."""
+
+    def __init__(self, vista, peticion, accion):
+        self.vista = vista
+        self.peticion = peticion
+        self.accion = accion
+        self.clave = None
+        self.filas = None
+        self.esquema = None
+
+    def responder(self, datos, estado_cache):
+        respuesta = self._finalizar(Response(datos))
+        if self.clave is not None:
+            respuesta['X-Cache'] = estado_cache
+        return respuesta
+
+    def responder_error(self, exc):
+        return self._finalizar(self.vista.handle_exception(exc))
+
+    def _finalizar(self, respuesta):
+        respuesta = self.vista.finalize_response(self.peticion, respuesta)
+        respuesta.render()
+        return respuesta
+
+
+def _preparar(request, clase, accion, basename, kwargs):
+    vista = clase(basename=basename, detail=accion == 'retrieve', action_map={'get': accion, 'head': accion})
+    vista.args, vista.kwargs = (), kwargs
+    peticion = vista.initialize_request(request, **kwargs)
+    vista.request = peticion
+    vista.headers = vista.default_response_headers
+
+    paginador = vista.paginator
+    sincrona = (
+        any(cabecera in request.META for cabecera in CABECERAS_CONDICIONALES)
+        or (isinstance(paginador, BibliotecaPagination) and paginador.usa_numeracion(peticion))
+    )
+    try:
+        vista.initial(peticion, **kwargs)
+        if sincrona or peticion.accepted_renderer.format != 'json':
+            respuesta = getattr(vista, accion)(peticion, **kwargs)
+        else:
+            return _Lectura(vista, peticion, accion)
+    except Exception as exc:
+        respuesta = vista.handle_exception(exc)
+    respuesta = vista.finalize_response(peticion, respuesta, **kwargs)
+    if isinstance(respuesta, Response):
+        respuesta.render()
+    return respuesta
+
+
+def _consultar(lectura):
+    vista = lectura.vista
+    esquema = vista.esquema_solicitado()
+    queryset = vista.filter_queryset(vista.get_queryset())
+    if lectura.accion == 'retrieve':
+        lookup_url_kwarg = vista.lookup_url_kwarg or vista.lookup_field
+        queryset = queryset.filter(**{vista.lookup_field: vista.kwargs[lookup_url_kwarg]}).order_by()
+    lectura.esquema, lectura.filas = esquema, esquema.filas(queryset)
+
+
+async def _pagina(lectura):
+    """Página por clave con la misma forma y cursores que ``KeysetPagination``."""
+    paginador = KeysetPagination()
+    peticion = lectura.peticion
+    tamano = paginador.get_page_size(peticion)
+    ordering = ordenacion_keyset(lectura.filas)
+    posicion, reverse = None, False
+    codificado = peticion.query_params.get(paginador.cursor_query_param)
+    if codificado is not None:
+        try:
+            posicion, reverse = decodificar_cursor(lectura.filas.model, ordering, codificado)
+        except ValueError:
+            raise exceptions.NotFound(paginador.invalid_cursor_message)
+
+    pagina, hay_mas = await apagina_keyset(lectura.filas, ordering, posicion, tamano, reverse)
+    if reverse:
+        hay_anterior, hay_siguiente = hay_mas, True
+    else:
+        hay_siguiente, hay_anterior = hay_mas, posicion is not None
+
+    base_url = peticion.build_absolute_uri()
+
+    def enlace(fila, atras):
+        return replace_query_param(
+            base_url, paginador.cursor_query_param, codificar_cursor(ordering, fila, atras)
+        )
+
+    return {
+        'next': enlace(pagina[-1], False) if hay_siguiente and pagina else None,
+        'previous': enlace(pagina[0], True) if hay_anterior and pagina else None,
+        'results': lectura.esquema.construir_lista(pagina),
+    }
+
+
+async def _objeto(lectura):
+    fila = await lectura.filas.afirst()
+    if fila is None:
+        raise exceptions.NotFound()
+    lectura.vista.check_object_permissions(lectura.peticion, fila)
+    return lectura.esquema.construir(fila)
@@ -0,0 +1,139 @@
+"""
+Autenticación de la API con el usuario cacheado.
+
+``JWTAuthentication`` lee la fila de ``User`` en cada petición y
+``BasicAuthentication`` calcula el hash PBKDF2 de la contraseña cada vez.
+Estas clases resuelven el usuario desde la caché durante
+``AUTENTICACION_CACHE_TTL`` segundos:
+
+- El usuario se guarda por ``id`` (el claim ``user_id`` del token) con las
+  columnas de ``CAMPOS_USUARIO`` y una huella del hash de su contraseña. Se
+  reconstruye con ``User.from_db``: el resto de columnas quedan diferidas y
+  un ``save()`` sobre él solo escribe las cargadas.
+- Una verificación Basic correcta se recuerda bajo un HMAC (con
+  ``SECRET_KEY``) del usuario y la contraseña, junto con la huella del hash.
+  Si la contraseña cambia, la huella deja de coincidir y se vuelve a
+  verificar.
+
+Cualquier ``save()`` o borrado de un usuario (desactivarlo, cambiar la
+contraseña, ``last_login``...) borra su entrada mediante las señales de
+``apps.usuarios.signals``; los ``update()`` masivos sobre ``User`` dependen
+del TTL. Las claves ``autenticacion:`` no se copian en la LRU de cada
+proceso (``SOLO_COMPARTIDA`` en ``CACHES``), así que la invalidación se ve
+en todos los workers a la vez.
+
+Las vistas con ``permitir_basic = False`` no aceptan credenciales Basic.
+"""
+import hashlib
+import hmac
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import BasicAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+PREFIJO = 'autenticacion'
+
+# Segundos que se conserva un usuario o una verificación Basic
+TTL_POR_DEFECTO = 60
+
+# Columnas del usuario que se cachean; el resto se cargan al usarse
+CAMPOS_USUARIO = (
+    'id', 'username', 'email', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_superuser', 'last_login', 'date_joined',
+)
+
+
+def _ttl():
+    return getattr(settings, 'AUTENTICACION_CACHE_TTL', TTL_POR_DEFECTO)
+
+
+def _campos(User):
+    # from_db espera los valores en el orden de las columnas del modelo
+    return [f.attname for f in User._meta.concrete_fields if f.attname in CAMPOS_USUARIO]
+
+
+def _clave_usuario(user_id):
+    return f'{PREFIJO}:usuario:{user_id}'
+
+
+def usuario_cacheado(user_id):
+    """
+    Usuario con ``id = user_id`` y la huella de su contraseña, desde la
+    caché o la base de datos. Devuelve ``(None, None)`` si no existe.
+    """
+    User = get_user_model()
+    campos = _campos(User)
+    entrada = cache.get(_clave_usuario(user_id))
+    if entrada is None:
+        fila = User.objects.filter(pk=user_id).values_list(*campos, 'password').first()
+        if fila is None:
+            return None, None
+        entrada = (fila[:-1], get_md5_hash_password(fila[-1]))
+        cache.set(_clave_usuario(user_id), entrada, _ttl())
+    valores, huella = entrada
+    return User.from_db('default', campos, valores), huella
+
+
+def invalidar_usuario(user_id):
+    """Olvida el usuario cacheado, ahora y al confirmar la transacción."""
+    cache.delete(_clave_usuario(user_id))
+    transaction.on_commit(lambda: cache.delete(_clave_usuario(user_id)))
+
+
+class JWTAutenticacionCacheada(JWTAuthentication):
+    """``JWTAuthentication`` que resuelve el usuario del token desde la caché."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        user, huella = usuario_cacheado(user_id)
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != huella:
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user
+
+
+class BasicAutenticacionCacheada(BasicAuthentication):
+    """
+    ``BasicAuthentication`` que recuerda las verificaciones correctas y que
+    se desactiva en las vistas con ``permitir_basic = False``.
+    """
+
+    def authenticate(self, request):
+        vista = (getattr(request, 'parser_context', None) or {}).get('view')
+        if not getattr(vista, 'permitir_basic', True):
+            return None
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, userid, password, request=None):
+        firma = hmac.new(
+            settings.SECRET_KEY.encode(), f'{userid}\0{password}'.encode(), hashlib.sha256
+        ).hexdigest()
+        clave = f'{PREFIJO}:basic:{firma}'
+
+        recordada = cache.get(clave)
+        if recordada is not None:
+            user_id, huella_recordada = recordada
+            user, huella = usuario_cacheado(user_id)
+            if user is not None and huella == huella_recordada:
+                if not user.is_active:
+                    raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+                return (user, None)
+
+        user, _auth = super().authenticate_credentials(userid, password, request)
+        cache.set(clave, (user.pk, get_md5_hash_password(user.password)), _ttl())
+        return (user, None)
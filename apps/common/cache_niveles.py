@@ -0,0 +1,374 @@
+"""
+Caché del proyecto en dos niveles.
+
+``CacheDosNiveles`` es el backend de la caché ``default``: una LRU acotada
+(``MAX_ENTRADAS``) en la memoria de cada proceso delante de la caché
+compartida por todos los workers (el alias ``COMPARTIDA``: Redis si se
+configura ``REDIS_URL`` y, si no, archivos locales). Las lecturas se sirven
+de la LRU durante ``TTL_LOCAL`` segundos como mucho; las escrituras, los
+``incr`` y los borrados van a la caché compartida y descartan la copia
+local del proceso que los hace. Así una invalidación (las generaciones de
+``apps.common.cache_respuestas``) tarda como mucho ``TTL_LOCAL`` segundos en
+verse desde los demás workers. Las claves con un prefijo de
+``SOLO_COMPARTIDA`` (los usuarios autenticados, que se invalidan al
+desactivarlos) nunca se copian en la LRU y se leen siempre de la
+compartida.
+
+Encima, ``obtener``, el decorador ``cacheado`` y ``CacheNivelesMixin``
+(``list`` y ``retrieve`` de los viewsets) guardan resultados en los
+espacios de ``ESPACIOS`` (``libros``, ``autores``, ``categorias`` y
+``prestamos``). Cada espacio sigue la generación de su modelo, de modo que
+las señales y servicios que ya llaman a ``cache_respuestas.invalidar`` lo
+invalidan. Si varias peticiones echan en falta la misma clave a la vez,
+solo una la calcula (un cerrojo con ``add`` en la caché compartida) y las
+demás esperan su resultado hasta ``ESPERA_MAXIMA`` segundos; con la caché en
+archivos el cerrojo es aproximado porque ``add`` no es atómico entre
+procesos.
+
+Cada proceso cuenta aciertos (locales y compartidos), fallos y expulsiones
+de la LRU por prefijo de clave y suma sus cuentas en la caché compartida
+cada ``PUBLICAR_CADA`` segundos; ``estadisticas`` las reúne y el personal
+las consulta en ``/api/admin/cache/``.
+"""
+import functools
+import hashlib
+import pickle
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.http import urlencode
+from rest_framework.response import Response
+
+from . import cache_respuestas
+from .replicas import en_primaria
+
+# Espacio de claves -> modelo cuyos cambios lo invalidan
+ESPACIOS = {
+    'libros': 'libros.Libro',
+    'autores': 'autores.Autor',
+    'categorias': 'libros.Categoria',
+    'prestamos': 'prestamos.Prestamo',
+}
+
+CONTADORES = ('aciertos_locales', 'aciertos_compartidos', 'fallos', 'expulsiones')
+
+PREFIJO_ESTADISTICAS = 'cache_niveles:estadisticas'
+
+# Segundos entre publicaciones de las cuentas de un proceso
+PUBLICAR_CADA = 10
+
+# Segundos que se espera a que otra petición calcule la misma clave
+ESPERA_MAXIMA = 5
+INTERVALO_ESPERA = 0.05
+
+_AUSENTE = object()
+
+# Estado de cada proceso por LOCATION de la caché, compartido entre sus hilos
+_locales = {}
+_cerrojos = {}
+_cuentas = {}
+_publicado = {}
+
+
+def _prefijo(clave):
+    return clave.split(':', 1)[0]
+
+
+class CacheDosNiveles(BaseCache):
+    """
+    LRU en memoria del proceso delante de otra caché configurada.
+
+    Opciones: ``COMPARTIDA`` (alias de la caché compartida), ``MAX_ENTRADAS``
+    (tamaño de la LRU), ``TTL_LOCAL`` (segundos que vale una copia local) y
+    ``SOLO_COMPARTIDA`` (prefijos de clave que no se copian en la LRU).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        opciones = params.get('OPTIONS', {})
+        self._alias = opciones.get('COMPARTIDA', 'compartida')
+        self._max_entradas = opciones.get('MAX_ENTRADAS', 1000)
+        self._ttl_local = opciones.get('TTL_LOCAL', 5)
+        self._solo_compartida = frozenset(opciones.get('SOLO_COMPARTIDA', ()))
+        self._nombre = location
+        self._local = _locales.setdefault(location, OrderedDict())
+        self._lock = _cerrojos.setdefault(location, threading.Lock())
+        self._cuentas = _cuentas.setdefault(location, Counter())
+
+    @property
+    def compartida(self):
+        return caches[self._alias]
+
+    # Nivel local
+
+    def _leer_local(self, clave):
+        with self._lock:
+            entrada = self._local.get(clave)
+            if entrada is None:
+                return _AUSENTE
+            expira, contenido, _ = entrada
+            if expira <= time.monotonic():
+                del self._local[clave]
+                return _AUSENTE
+            self._local.move_to_end(clave)
+        return pickle.loads(contenido)
+
+    def _guardar_local(self, key, version, valor, timeout=DEFAULT_TIMEOUT):
+        if _prefijo(key) in self._solo_compartida:
+            return
+        clave = self.make_and_validate_key(key, version)
+        ttl = self._ttl_local
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            ttl = min(ttl, timeout)
+        if ttl <= 0:
+            self._olvidar_local(clave)
+            return
+        contenido = pickle.dumps(valor, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local[clave] = (time.monotonic() + ttl, contenido, key)
+            self._local.move_to_end(clave)
+            while len(self._local) > self._max_entradas:
+                _, (_, _, expulsada) = self._local.popitem(last=False)
+                self._cuentas[(_prefijo(expulsada), 'expulsiones')] += 1
+
+    def _olvidar_local(self, *claves):
+        with self._lock:
+            for clave in claves:
+                self._local.pop(clave, None)
+
+    def _contar(self, clave, contador):
+        with self._lock:
+            self._cuentas[(_prefijo(clave), contador)] += 1
+        self._publicar()
+
+    def _publicar(self, forzar=False):
+        ahora = time.monotonic()
+        with self._lock:
+            if not forzar and ahora - _publicado.get(self._nombre, 0) < PUBLICAR_CADA:
+                return
+            _publicado[self._nombre] = ahora
+            pendientes = dict(self._cuentas)
+            self._cuentas.clear()
+        if not pendientes:
+            return
+        compartida = self.compartida
+        for (prefijo, contador), cantidad in pendientes.items():
+            clave = f'{PREFIJO_ESTADISTICAS}:{prefijo}:{contador}'
+            if not compartida.add(clave, cantidad, None):
+                try:
+                    compartida.incr(clave, cantidad)
+                except ValueError:
+                    compartida.set(clave, cantidad, None)
+        prefijos = {prefijo for prefijo, _ in pendientes}
+        indice = compartida.get(PREFIJO_ESTADISTICAS, set())
+        if not prefijos <= indice:
+            compartida.set(PREFIJO_ESTADISTICAS, indice | prefijos, None)
+
+    def estadisticas(self):
+        """
+        Cuentas de todos los procesos por prefijo de clave, más el tamaño de
+        la LRU de este proceso.
+        """
+        self._publicar(forzar=True)
+        compartida = self.compartida
+        prefijos = sorted(compartida.get(PREFIJO_ESTADISTICAS, set()))
+        claves = {
+            (prefijo, contador): f'{PREFIJO_ESTADISTICAS}:{prefijo}:{contador}'
+            for prefijo in prefijos for contador in CONTADORES
+        }
+        valores = compartida.get_many(claves.values())
+        with self._lock:
+            entradas = len(self._local)
+        return {
+            'espacios': {
+                prefijo: {contador: valores.get(claves[(prefijo, contador)], 0) for contador in CONTADORES}
+                for prefijo in prefijos
+            },
+            'local': {'entradas': entradas, 'max_entradas': self._max_entradas},
+        }
+
+    # API de BaseCache
+
+    def get(self, key, default=None, version=None):
+        clave = self.make_and_validate_key(key, version)
+        valor = self._leer_local(clave)
+        if valor is not _AUSENTE:
+            self._contar(key, 'aciertos_locales')
+            return valor
+        valor = self.compartida.get(key, _AUSENTE, version=version)
+        if valor is _AUSENTE:
+            self._contar(key, 'fallos')
+            return default
+        self._contar(key, 'aciertos_compartidos')
+        self._guardar_local(key, version, valor)
+        return valor
+
+    def get_many(self, keys, version=None):
+        encontrados, faltan = {}, []
+        for key in keys:
+            valor = self._leer_local(self.make_and_validate_key(key, version))
+            if valor is _AUSENTE:
+                faltan.append(key)
+            else:
+                self._contar(key, 'aciertos_locales')
+                encontrados[key] = valor
+        if faltan:
+            compartidos = self.compartida.get_many(faltan, version=version)
+            for key in faltan:
+                if key in compartidos:
+                    self._contar(key, 'aciertos_compartidos')
+                    self._guardar_local(key, version, compartidos[key])
+                else:
+                    self._contar(key, 'fallos')
+            encontrados.update(compartidos)
+        return encontrados
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.compartida.set(key, value, timeout, version=version)
+        self._guardar_local(key, version, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        fallidas = self.compartida.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in fallidas:
+                self._guardar_local(key, version, value, timeout)
+        return fallidas
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # No se copia en la LRU: add sirve sobre todo de cerrojo
+        return self.compartida.add(key, value, timeout, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._olvidar_local(self.make_and_validate_key(key, version))
+        return self.compartida.touch(key, timeout, version=version)
+
+    def has_key(self, key, version=None):
+        if self._leer_local(self.make_and_validate_key(key, version)) is not _AUSENTE:
+            return True
+        return self.compartida.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._olvidar_local(self.make_and_validate_key(key, version))
+        return self.compartida.incr(key, delta, version=version)
+
+    def delete(self, key, version=None):
+        self._olvidar_local(self.make_and_validate_key(key, version))
+        return self.compartida.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        self._olvidar_local(*(self.make_and_validate_key(key, version) for key in keys))
+        self.compartida.delete_many(keys, version=version)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        self.compartida.clear()
+
+    def close(self, **kwargs):
+        self.compartida.close(**kwargs)
+
+
+def _cache():
+    return caches['default']
+
+
+def _clave_espacio(espacios, clave):
+    modelos = [apps.get_model(ESPACIOS[espacio]) for espacio in espacios]
+    version = '.'.join(str(generacion) for generacion in cache_respuestas.generaciones(modelos))
+    return f'{espacios[0]}:{version}:{clave}'
+
+
+def obtener(espacios, clave, calcular, ttl=None):
+    """
+    Valor de ``clave`` en los ``espacios`` indicados, calculándolo con
+    ``calcular()`` si no está en la caché.
+
+    Args:
+        espacios: Nombres de ``ESPACIOS`` de los que depende el valor; el
+            primero da el prefijo de la clave
+        clave: Clave dentro del espacio
+        calcular: Función sin argumentos que devuelve el valor
+        ttl: Segundos que se conserva (por defecto, ``CACHE_RESPUESTAS_TTL``)
+    """
+    if ttl is None:
+        ttl = getattr(settings, 'CACHE_RESPUESTAS_TTL', cache_respuestas.TTL_POR_DEFECTO)
+    cache = _cache()
+    completa = _clave_espacio(espacios, clave)
+    valor = cache.get(completa, _AUSENTE)
+    if valor is not _AUSENTE:
+        return valor
+
+    cerrojo = f'{completa}:calculando'
+    if not cache.add(cerrojo, True, ESPERA_MAXIMA):
+        limite = time.monotonic() + ESPERA_MAXIMA
+        while time.monotonic() < limite:
+            time.sleep(INTERVALO_ESPERA)
+            valor = cache.get(completa, _AUSENTE)
+            if valor is not _AUSENTE:
+                return valor
+            if not cache.has_key(cerrojo):
+                # Quien la calculaba falló: se calcula aquí
+                break
+
+    try:
+        # Lo que se guarda sale de la principal, no de una réplica atrasada
+        with en_primaria():
+            valor = calcular()
+        cache.set(completa, valor, ttl)
+    finally:
+        cache.delete(cerrojo)
+    return valor
+
+
+def cacheado(*espacios, ttl=None, clave=None):
+    """
+    Decorador que guarda el resultado de una función en ``espacios``.
+
+    La clave es el nombre de la función más sus argumentos (su ``repr``) o
+    lo que devuelva ``clave(*args, **kwargs)``. El resultado debe poder
+    serializarse con ``pickle`` y no depender del usuario.
+    """
+    def decorador(funcion):
+        nombre = f'{funcion.__module__}.{funcion.__qualname__}'
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            partes = clave(*args, **kwargs) if clave else (args, sorted(kwargs.items()))
+            resumen = hashlib.sha256(repr(partes).encode()).hexdigest()[:32]
+            return obtener(espacios, f'{nombre}:{resumen}', lambda: funcion(*args, **kwargs), ttl)
+        return envoltura
+    return decorador
+
+
+class CacheNivelesMixin:
+    """
+    Sirve ``list`` y ``retrieve`` desde los espacios ``cache_espacios`` para
+    cualquier usuario, con un solo cálculo por clave ante peticiones
+    simultáneas. Solo para vistas cuya representación no depende del
+    usuario que la pide.
+    """
+    cache_espacios = ()
+
+    def list(self, request, *args, **kwargs):
+        return self._respuesta_espacios(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._respuesta_espacios(request, super().retrieve, *args, **kwargs)
+
+    def _respuesta_espacios(self, request, calcular, *args, **kwargs):
+        # Los enlaces de paginación llevan el host: forma parte de la clave
+        parametros = urlencode(sorted(request.query_params.lists()), doseq=True)
+        url = f'{request.get_host()}{request.path}?{parametros}'
+        clave = f'{self.basename}:{self.action}:{hashlib.sha256(url.encode()).hexdigest()[:32]}'
+        # Los errores (404, filtros no válidos) llegan como excepciones y no se guardan
+        return Response(obtener(self.cache_espacios, clave, lambda: calcular(request, *args, **kwargs).data))
+
+
+def estadisticas():
+    """Aciertos, fallos y expulsiones de la caché ``default`` por prefijo de clave."""
+    return _cache().estadisticas()
@@ -0,0 +1,182 @@
+"""
+Caché de respuestas de lectura de la API para peticiones anónimas.
+
+Cada modelo tiene un contador de generación en la caché. La clave de una
+respuesta incluye la generación de todos los modelos de los que depende, así
+que invalidar es solo incrementar un contador: las entradas antiguas dejan
+de ser alcanzables y caducan por su TTL, que además sirve de red de
+seguridad ante cualquier escritura que no pase por ``invalidar``.
+
+Los guardados y borrados individuales invalidan mediante señales
+(``apps.libros.signals``); las escrituras por conjuntos (``update()``,
+``bulk_create``, ``bulk_update``) llaman a ``invalidar`` desde los servicios.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import urlencode
+from rest_framework import status
+from rest_framework.response import Response
+
+from .replicas import en_primaria
+
+PREFIJO = 'respuestas'
+
+# Segundos que se conserva una respuesta aunque nada la invalide
+TTL_POR_DEFECTO = 300
+
+CLAVE_ACIERTOS = f'{PREFIJO}:aciertos'
+CLAVE_FALLOS = f'{PREFIJO}:fallos'
+
+
+def _etiqueta(modelo):
+    # Un modelo o el nombre de una generación propia, como 'libros.vista_previa'
+    return modelo if isinstance(modelo, str) else modelo._meta.label_lower
+
+
+def _clave_generacion(modelo):
+    return f'{PREFIJO}:generacion:{_etiqueta(modelo)}'
+
+
+def _incrementar(clave):
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        # Contador inexistente o expulsado de la caché. Para las generaciones
+        # se parte de la hora actual: un contador reiniciado nunca repite un
+        # valor anterior y no resucita entradas viejas.
+        cache.add(clave, time.time_ns() if ':generacion:' in clave else 0, None)
+        return cache.incr(clave)
+
+
+def generaciones(modelos):
+    """Generación actual de cada modelo, en el orden recibido."""
+    claves = [_clave_generacion(modelo) for modelo in modelos]
+    valores = cache.get_many(claves)
+    for clave in claves:
+        if clave not in valores:
+            cache.add(clave, time.time_ns(), None)
+            valores[clave] = cache.get(clave)
+    return [valores[clave] for clave in claves]
+
+
+async def ageneraciones(modelos):
+    """Versión asíncrona de ``generaciones``."""
+    claves = [_clave_generacion(modelo) for modelo in modelos]
+    valores = await cache.aget_many(claves)
+    for clave in claves:
+        if clave not in valores:
+            await cache.aadd(clave, time.time_ns(), None)
+            valores[clave] = await cache.aget(clave)
+    return [valores[clave] for clave in claves]
+
+
+def _clave_modificado(modelo):
+    return f'{PREFIJO}:modificado:{_etiqueta(modelo)}'
+
+
+def ultima_modificacion(modelos):
+    """
+    Instante (``time.time()``) del último ``invalidar`` de cualquiera de
+    ``modelos``. Una marca que falta (expulsada de la caché) se repone con la
+    hora actual: como mucho obliga a los clientes a descargar de nuevo.
+    """
+    claves = [_clave_modificado(modelo) for modelo in modelos]
+    valores = cache.get_many(claves)
+    for clave in claves:
+        if clave not in valores:
+            cache.add(clave, time.time(), None)
+            valores[clave] = cache.get(clave)
+    return max(valores.values())
+
+
+def invalidar(*modelos):
+    """
+    Invalida las respuestas que dependen de ``modelos``.
+
+    Se invalida de inmediato y otra vez al confirmar la transacción: una
+    lectura concurrente pudo guardar los datos anteriores con la generación
+    nueva antes del ``COMMIT``.
+    """
+    claves = [_clave_generacion(modelo) for modelo in modelos]
+    marcas = [_clave_modificado(modelo) for modelo in modelos]
+
+    def incrementar():
+        for clave in claves:
+            _incrementar(clave)
+        cache.set_many(dict.fromkeys(marcas, time.time()), None)
+
+    incrementar()
+    transaction.on_commit(incrementar)
+
+
+def estadisticas():
+    """Aciertos y fallos acumulados de la caché de respuestas."""
+    valores = cache.get_many([CLAVE_ACIERTOS, CLAVE_FALLOS])
+    return {
+        'aciertos': valores.get(CLAVE_ACIERTOS, 0),
+        'fallos': valores.get(CLAVE_FALLOS, 0),
+    }
+
+
+def clave_respuesta(request, vista, modelos):
+    """
+    Clave de caché de una petición: vista y acción, generaciones de
+    ``modelos`` y la URL con los parámetros ordenados.
+    """
+    return _clave(request, vista, generaciones(modelos))
+
+
+async def aclave_respuesta(request, vista, modelos):
+    """Versión asíncrona de ``clave_respuesta``."""
+    return _clave(request, vista, await ageneraciones(modelos))
+
+
+def _clave(request, vista, valores):
+    parametros = urlencode(sorted(request.query_params.lists()), doseq=True)
+    url = f'{request.get_host()}{request.path}?{parametros}'
+    resumen = hashlib.sha256(url.encode()).hexdigest()
+    version = '.'.join(str(generacion) for generacion in valores)
+    return f'{PREFIJO}:{vista}:{version}:{resumen}'
+
+
+class CacheRespuestasMixin:
+    """
+    Sirve ``list`` y ``retrieve`` desde la caché para peticiones anónimas.
+
+    ``cache_modelos`` enumera los modelos cuyos cambios invalidan las
+    respuestas de la vista. Solo se guardan las respuestas 200; la cabecera
+    ``X-Cache`` indica si hubo acierto (``HIT``) o fallo (``MISS``).
+    """
+    cache_modelos = ()
+
+    def list(self, request, *args, **kwargs):
+        return self._respuesta_cacheada(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._respuesta_cacheada(request, super().retrieve, *args, **kwargs)
+
+    def _respuesta_cacheada(self, request, obtener, *args, **kwargs):
+        if request.user.is_authenticated:
+            return obtener(request, *args, **kwargs)
+
+        clave = clave_respuesta(request, f'{self.basename}:{self.action}', self.cache_modelos)
+        datos = cache.get(clave)
+        if datos is not None:
+            _incrementar(CLAVE_ACIERTOS)
+            respuesta = Response(datos)
+            respuesta['X-Cache'] = 'HIT'
+            return respuesta
+
+        _incrementar(CLAVE_FALLOS)
+        # Lo que se guarda sale de la principal, no de una réplica atrasada
+        with en_primaria():
+            respuesta = obtener(request, *args, **kwargs)
+        if respuesta.status_code == status.HTTP_200_OK:
+            ttl = getattr(settings, 'CACHE_RESPUESTAS_TTL', TTL_POR_DEFECTO)
+            cache.set(clave, respuesta.data, ttl)
+        respuesta['X-Cache'] = 'MISS'
+        return respuesta
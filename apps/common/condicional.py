@@ -0,0 +1,65 @@
+"""
+Peticiones GET condicionales (``ETag`` / ``Last-Modified``) para la API.
+
+Los validadores salen de la caché, sin consultar la base de datos: el
+``ETag`` combina la URL con las generaciones de ``cache_respuestas`` de los
+modelos de los que depende la representación y ``Last-Modified`` es el
+último ``invalidar`` de esos modelos. Cualquier guardado, borrado o
+escritura por conjuntos que invalide la caché de respuestas cambia también
+el ``ETag`` (incluidos los borrados, que no dejan marca en las filas).
+
+Si el cliente envía ``If-None-Match`` o ``If-Modified-Since`` y nada ha
+cambiado se responde ``304 Not Modified`` sin construir la respuesta.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag, urlencode
+
+from . import cache_respuestas
+
+
+def _etag(request, valores):
+    # Misma representación, parámetros y formato: mismo cuerpo
+    parametros = urlencode(sorted(request.query_params.lists()), doseq=True)
+    contenido = '|'.join([
+        request.path, parametros, request.accepted_renderer.format, *(str(valor) for valor in valores),
+    ])
+    return quote_etag(hashlib.sha256(contenido.encode()).hexdigest()[:32])
+
+
+class CondicionalMixin:
+    """
+    Añade ``ETag`` y ``Last-Modified`` a ``list`` y ``retrieve`` y responde
+    ``304`` a las peticiones condicionales que no han cambiado.
+
+    Los modelos de los que depende la representación son ``cache_modelos``
+    (``CacheRespuestasMixin``) o, si la vista no los declara, el modelo de
+    su ``queryset``.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._respuesta_condicional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._respuesta_condicional(request, super().retrieve, *args, **kwargs)
+
+    def modelos_version(self):
+        return getattr(self, 'cache_modelos', ()) or (self.queryset.model,)
+
+    def _respuesta_condicional(self, request, obtener, *args, **kwargs):
+        modelos = self.modelos_version()
+        etag = _etag(request, cache_respuestas.generaciones(modelos))
+        # Last-Modified va en segundos
+        ultima = int(cache_respuestas.ultima_modificacion(modelos))
+
+        respuesta = get_conditional_response(request, etag=etag, last_modified=ultima)
+        if respuesta is None:
+            respuesta = obtener(request, *args, **kwargs)
+            if respuesta.status_code != 200:
+                return respuesta
+        respuesta['ETag'] = etag
+        respuesta['Last-Modified'] = http_date(ultima)
+        # Los clientes deben revalidar antes de reutilizar el cuerpo
+        patch_cache_control(respuesta, no_cache=True)
+        return respuesta
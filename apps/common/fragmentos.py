@@ -0,0 +1,73 @@
+"""
+Caché de fragmentos de plantilla por objeto.
+
+Cada objeto (una tarjeta de libro, una categoría del panel de inicio) se
+renderiza con su propia plantilla y se guarda bajo una clave que incluye su
+versión: al guardar el objeto cambia la versión y solo ese fragmento se
+vuelve a renderizar. Los fragmentos de una página se leen con un único
+``get_many`` y los que faltan se escriben con un único ``set_many``.
+
+Los fragmentos se comparten entre usuarios, así que no pueden contener nada
+propio de la petición. El token CSRF de los formularios se renderiza como
+``MARCA_CSRF`` y se sustituye por el de cada petición al servirlos.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+PREFIJO = 'fragmentos'
+
+# Segundos que se conserva un fragmento; su clave ya cambia con cada versión
+TTL_POR_DEFECTO = 3600
+
+MARCA_CSRF = 'TOKEN-CSRF-DEL-FRAGMENTO'
+
+
+def clave(plantilla, version):
+    """Clave de caché del fragmento de ``plantilla`` en la ``version`` dada."""
+    huella = hashlib.sha256(repr(tuple(version)).encode()).hexdigest()[:32]
+    return f'{PREFIJO}:{plantilla}:{huella}'
+
+
+def renderizar(request, plantilla, objetos, version, nombre='objeto'):
+    """
+    Renderiza un fragmento por objeto reutilizando los ya cacheados.
+
+    Args:
+        request: Petición en curso (aporta el token CSRF)
+        plantilla: Plantilla de un único objeto
+        objetos: Objetos a renderizar, en orden
+        version: Función que devuelve una tupla que identifica al objeto y
+            todo lo que muestra el fragmento y puede cambiar (normalmente su
+            ``pk`` y columnas ``modificado``)
+        nombre: Nombre del objeto en el contexto de la plantilla
+
+    Returns:
+        Lista de fragmentos HTML, en el orden de ``objetos``
+    """
+    claves = [clave(plantilla, version(objeto)) for objeto in objetos]
+    guardados = cache.get_many(claves)
+
+    nuevos = {}
+    fragmentos = []
+    for clave_fragmento, objeto in zip(claves, objetos):
+        html = guardados.get(clave_fragmento)
+        if html is None:
+            html = render_to_string(plantilla, {nombre: objeto, 'csrf_token': MARCA_CSRF})
+            nuevos[clave_fragmento] = html
+        fragmentos.append(html)
+    if nuevos:
+        cache.set_many(nuevos, getattr(settings, 'CACHE_FRAGMENTOS_TTL', TTL_POR_DEFECTO))
+
+    token = None
+    resultado = []
+    for html in fragmentos:
+        if MARCA_CSRF in html:
+            token = token or get_token(request)
+            html = html.replace(MARCA_CSRF, token)
+        resultado.append(mark_safe(html))
+    return resultado
@@ -0,0 +1,297 @@
+"""
+Subida de imágenes fuera de la petición.
+
+Los campos de imagen registrados con ``diferir_subida`` no se suben al
+guardar el modelo: una señal ``pre_save`` copia el archivo recibido al
+almacén local de pendientes (``IMAGENES_PENDIENTES_ROOT``), vacía el campo y
+marca ``<campo>_estado = 'pendiente'``. Así ni el worker de gunicorn ni la
+transacción esperan a la red. El comando ``procesar_imagenes`` recorre las
+imágenes pendientes, las sube con el destino configurado
+(``IMAGENES_DESTINO``) y guarda el valor del campo y su URL pública en
+``<campo>_url`` con el estado ``'lista'`` (o ``'fallida'`` si la subida
+falla).
+
+Sin ``IMAGENES_WORKER`` (ningún ``procesar_imagenes --continuo`` en marcha)
+la imagen se procesa y se sube en la propia petición en cuanto se confirma
+la transacción, como antes de diferir la subida: nunca queda pendiente para
+siempre. Con el worker, ``IMAGENES_PENDIENTES_ROOT`` debe estar en un disco
+que vean la web y el worker (mismo contenedor o volumen compartido).
+
+Antes de subirla, la imagen se procesa con Pillow: se aplica la orientación
+EXIF, se descartan los metadatos, se reduce a ``IMAGENES_LADO_MAXIMO`` y se
+recodifica en ``IMAGENES_FORMATO``. Además se generan las variantes de
+tamaño fijo registradas para el modelo (tarjeta, detalle, avatar), que se
+suben como imágenes independientes; sus URLs quedan en
+``<campo>_variantes`` y las plantillas no construyen URLs de
+transformación al renderizar.
+
+Cada modelo registrado declara, además del campo, ``<campo>_estado``,
+``<campo>_pendiente``, ``<campo>_url`` y ``<campo>_variantes``. Las
+plantillas muestran la imagen desde ``<campo>_variantes`` o ``<campo>_url``
+y un marcador mientras está pendiente.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import UploadedFile
+from django.db.models.fields.files import FieldFile
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps, features
+
+from . import cache_respuestas
+
+logger = logging.getLogger(__name__)
+
+PENDIENTE = 'pendiente'
+LISTA = 'lista'
+FALLIDA = 'fallida'
+
+ESTADOS = [
+    (PENDIENTE, 'Pendiente'),
+    (LISTA, 'Lista'),
+    (FALLIDA, 'Fallida'),
+]
+
+# Variantes de cada tipo de imagen: nombre -> (ancho, alto). Se recortan al
+# tamaño exacto desde el centro, como las muestran las plantillas
+VARIANTES_PORTADA = {'tarjeta': (300, 450), 'detalle': (600, 900)}
+VARIANTES_CATEGORIA = {'tarjeta': (160, 160)}
+VARIANTES_AVATAR = {'avatar': (240, 240), 'miniatura': (64, 64)}
+
+# Extensión de cada formato de salida
+EXTENSIONES = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+# Modelo -> (nombre de su campo de imagen, variantes)
+_registrados = {}
+
+
+def almacen_pendientes():
+    """Almacén local donde esperan las imágenes hasta subirse."""
+    return FileSystemStorage(location=settings.IMAGENES_PENDIENTES_ROOT)
+
+
+class DestinoCloudinary:
+    """Sube las imágenes como lo hacían los propios campos, a Cloudinary."""
+
+    def subir(self, instancia, campo, archivo):
+        """
+        Sube ``archivo`` para el ``campo`` de ``instancia``.
+
+        Returns:
+            Tupla ``(valor, url)``: el valor que se guarda en el campo y la URL pública
+        """
+        from cloudinary import uploader
+        from cloudinary.models import CloudinaryField
+
+        if isinstance(campo, CloudinaryField):
+            opciones = {'type': campo.type, 'resource_type': campo.resource_type}
+            opciones.update({
+                clave: valor(instancia) if callable(valor) else valor
+                for clave, valor in campo.options.items()
+            })
+            recurso = uploader.upload_resource(archivo, **opciones)
+            return recurso.get_prep_value(), recurso.build_url(secure=True)
+        nombre = campo.storage.save(campo.generate_filename(instancia, archivo.name), archivo)
+        return nombre, campo.storage.url(nombre)
+
+
+class DestinoLocal:
+    """
+    Guarda las imágenes en el sistema de archivos (``IMAGENES_LOCAL_ROOT``,
+    servidas en ``IMAGENES_LOCAL_URL``). Para desarrollo y tests.
+    """
+
+    def __init__(self):
+        self.almacen = FileSystemStorage(
+            location=settings.IMAGENES_LOCAL_ROOT, base_url=settings.IMAGENES_LOCAL_URL
+        )
+
+    def subir(self, instancia, campo, archivo):
+        carpeta = instancia._meta.label_lower.replace('.', '/')
+        nombre = self.almacen.save(f'{carpeta}/{os.path.basename(archivo.name)}', archivo)
+        return nombre, self.almacen.url(nombre)
+
+
+def destino():
+    """Destino de subida configurado en ``IMAGENES_DESTINO``."""
+    return import_string(settings.IMAGENES_DESTINO)()
+
+
+def diferir_subida(modelo, campo, variantes=None):
+    """
+    Registra ``modelo.campo`` para que sus imágenes se procesen y se suban
+    en segundo plano, junto con sus ``variantes`` (``{nombre: (ancho, alto)}``).
+    """
+    _registrados[modelo] = (campo, variantes or {})
+    pre_save.connect(
+        _apartar_imagen, sender=modelo, dispatch_uid=f'imagenes:{modelo._meta.label_lower}'
+    )
+    post_save.connect(
+        _subir_sin_worker, sender=modelo, dispatch_uid=f'imagenes:subir:{modelo._meta.label_lower}'
+    )
+
+
+def _archivo_nuevo(valor):
+    """El archivo recién recibido en el campo, o ``None`` si no hay uno nuevo."""
+    if isinstance(valor, UploadedFile):
+        return valor
+    if isinstance(valor, FieldFile) and valor and not valor._committed:
+        return valor.file
+    return None
+
+
+def _apartar_imagen(sender, instance, **kwargs):
+    campo, _ = _registrados[sender]
+    archivo = _archivo_nuevo(getattr(instance, campo))
+    if archivo is None:
+        return
+    if hasattr(archivo, 'seekable') and archivo.seekable():
+        archivo.seek(0)
+    carpeta = sender._meta.label_lower.replace('.', '/')
+    nombre = almacen_pendientes().save(f'{carpeta}/{os.path.basename(archivo.name)}', archivo)
+    setattr(instance, campo, None)
+    setattr(instance, f'{campo}_estado', PENDIENTE)
+    setattr(instance, f'{campo}_pendiente', nombre)
+    setattr(instance, f'{campo}_url', '')
+    setattr(instance, f'{campo}_variantes', {})
+    instance._imagen_apartada = True
+
+
+def _subir_sin_worker(sender, instance, **kwargs):
+    if not getattr(instance, '_imagen_apartada', False):
+        return
+    instance._imagen_apartada = False
+    if settings.IMAGENES_WORKER:
+        return
+    nombre_campo, variantes = _registrados[sender]
+    campo = sender._meta.get_field(nombre_campo)
+    transaction.on_commit(lambda: _procesar(sender, instance, campo, variantes, destino().subir))
+
+
+def _formato():
+    formato = settings.IMAGENES_FORMATO.upper()
+    if formato == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return formato
+
+
+def _codificar(imagen, formato, nombre):
+    if formato == 'JPEG' and imagen.mode != 'RGB':
+        fondo = Image.new('RGB', imagen.size, 'white')
+        fondo.paste(imagen, mask=imagen.getchannel('A') if 'A' in imagen.getbands() else None)
+        imagen = fondo
+    contenido = BytesIO()
+    # Sin exif= ni icc_profile=: Pillow no copia los metadatos del original
+    imagen.save(contenido, formato, quality=settings.IMAGENES_CALIDAD, optimize=formato == 'JPEG')
+    return ContentFile(contenido.getvalue(), name=f'{nombre}.{EXTENSIONES[formato]}')
+
+
+def preparar(archivo, variantes):
+    """
+    Procesa una imagen subida.
+
+    Args:
+        archivo: Archivo de imagen original
+        variantes: ``{nombre: (ancho, alto)}`` de las miniaturas a generar
+
+    Returns:
+        Tupla ``(principal, {nombre: archivo})`` con archivos ``ContentFile``
+        ya recodificados y sin metadatos
+
+    Raises:
+        PIL.UnidentifiedImageError: Si el archivo no es una imagen
+    """
+    formato = _formato()
+    base = os.path.splitext(os.path.basename(archivo.name))[0]
+    lado = settings.IMAGENES_LADO_MAXIMO
+
+    with Image.open(archivo) as original:
+        # JPEG: decodificar ya a escala reducida ahorra memoria y tiempo
+        original.draft('RGB', (lado, lado))
+        imagen = ImageOps.exif_transpose(original)
+        alfa = 'A' in imagen.getbands() or 'transparency' in imagen.info
+        imagen = imagen.convert('RGBA' if alfa else 'RGB')
+
+    imagen.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+    principal = _codificar(imagen, formato, base)
+    miniaturas = {
+        nombre: _codificar(
+            ImageOps.fit(imagen, tamano, Image.Resampling.LANCZOS), formato, f'{base}-{nombre}'
+        )
+        for nombre, tamano in variantes.items()
+    }
+    return principal, miniaturas
+
+
+def procesar_pendientes(reintentar=False, limite=None):
+    """
+    Sube las imágenes pendientes de todos los modelos registrados.
+
+    Cada subida ocurre fuera de cualquier transacción; el resultado se
+    guarda con un ``UPDATE`` condicionado a que la fila siga esperando ese
+    mismo archivo (si entretanto se envió otro, este se descarta).
+
+    Args:
+        reintentar: Incluir también las imágenes cuya subida falló
+        limite: Número máximo de imágenes por modelo
+
+    Returns:
+        Diccionario ``{'subidas': n, 'fallidas': n}``
+    """
+    estados = [PENDIENTE, FALLIDA] if reintentar else [PENDIENTE]
+    resultado = {'subidas': 0, 'fallidas': 0}
+    subir = destino().subir
+    for modelo, (nombre_campo, variantes) in _registrados.items():
+        campo = modelo._meta.get_field(nombre_campo)
+        pendientes = (
+            modelo.objects.filter(**{f'{nombre_campo}_estado__in': estados})
+            .exclude(**{f'{nombre_campo}_pendiente': ''})
+            .order_by('pk')
+        )
+        for instancia in pendientes[:limite]:
+            if _procesar(modelo, instancia, campo, variantes, subir):
+                resultado['subidas'] += 1
+            else:
+                resultado['fallidas'] += 1
+    return resultado
+
+
+def _procesar(modelo, instancia, campo, variantes, subir):
+    nombre = getattr(instancia, f'{campo.name}_pendiente')
+    filtro = {'pk': instancia.pk, f'{campo.name}_pendiente': nombre}
+    cambios = {}
+    if any(f.name == 'modificado' for f in modelo._meta.concrete_fields):
+        cambios['modificado'] = timezone.now()
+
+    try:
+        with almacen_pendientes().open(nombre) as archivo:
+            principal, miniaturas = preparar(archivo, variantes)
+        valor, url = subir(instancia, campo, principal)
+        urls_variantes = {
+            variante: subir(instancia, campo, miniatura)[1]
+            for variante, miniatura in miniaturas.items()
+        }
+    except Exception:
+        logger.exception('No se pudo subir la imagen %s de %s %s', nombre, modelo.__name__, instancia.pk)
+        modelo.objects.filter(**filtro).update(**{f'{campo.name}_estado': FALLIDA}, **cambios)
+        cache_respuestas.invalidar(modelo)
+        return False
+
+    actualizados = modelo.objects.filter(**filtro).update(**{
+        campo.attname: valor,
+        f'{campo.name}_estado': LISTA,
+        f'{campo.name}_pendiente': '',
+        f'{campo.name}_url': url,
+        f'{campo.name}_variantes': urls_variantes,
+    }, **cambios)
+    almacen_pendientes().delete(nombre)
+    if actualizados:
+        cache_respuestas.invalidar(modelo)
+    return True
@@ -0,0 +1,260 @@
+"""
+Lectura rápida para ``list`` y ``retrieve``.
+
+Un ``EsquemaLectura`` se compila una sola vez a partir de un
+``ModelSerializer`` (con sus serializadores anidados): obtiene las columnas
+del ORM que necesita cada campo de salida y la conversión a aplicar. Las
+respuestas se construyen después directamente desde filas de
+``values_list()``, sin instanciar modelos ni recorrer los campos del
+serializador por cada objeto, y con la misma forma JSON que el serializador.
+"""
+from types import SimpleNamespace
+
+from django.db.models import ForeignKey
+from django.http import Http404
+from django.utils.encoding import is_protected_type
+from rest_framework import fields as drf_fields
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+# Campos cuyo valor de la base de datos ya es su representación JSON
+_SIN_CONVERSION = (
+    drf_fields.CharField,
+    drf_fields.IntegerField,
+    drf_fields.BooleanField,
+    drf_fields.FloatField,
+    drf_fields.ChoiceField,
+    drf_fields.JSONField,
+)
+
+
+class EsquemaLectura:
+    """
+    Proyección precompilada de un ``ModelSerializer`` sobre filas del ORM.
+
+    Solo admite campos de modelo y serializadores anidados de relaciones
+    ``ForeignKey``; cualquier otro campo (``SerializerMethodField``,
+    relaciones múltiples...) produce un ``TypeError`` al compilar.
+    """
+
+    # Variantes de ?fields= / ?expand= compiladas que se conservan
+    MAX_VARIANTES = 64
+
+    def __init__(self, serializer_class, campos=None, expandir=frozenset()):
+        self.serializer_class = serializer_class
+        self.columnas = []
+        self._variantes = {}
+        self._construir = self._compilar(serializer_class(), '', False, campos, expandir)
+
+    def con_seleccion(self, fields=None, expand=None):
+        """
+        Variante del esquema restringida a ``fields`` y con las relaciones de
+        ``expand`` anidadas (ambos con el formato de ``?fields=`` y
+        ``?expand=``: nombres separados por comas, con puntos para los
+        niveles anidados).
+
+        Sin ``fields`` se devuelven todos los campos con sus relaciones
+        anidadas, como el serializador. Con ``fields``, cada relación se
+        devuelve como su ``id`` salvo que aparezca en ``expand`` o se pidan
+        campos suyos (``autor.nombre``). Solo se consultan las columnas y
+        los JOIN necesarios.
+
+        Raises:
+            ValueError: Si se pide un campo que el serializador no tiene
+        """
+        clave = (fields or '', expand or '')
+        if not any(clave):
+            return self
+        variante = self._variantes.get(clave)
+        if variante is None:
+            campos, expandir = _parsear_seleccion(fields, expand)
+            variante = EsquemaLectura(self.serializer_class, campos, expandir)
+            if len(self._variantes) >= self.MAX_VARIANTES:
+                self._variantes.pop(next(iter(self._variantes)))
+            self._variantes[clave] = variante
+        return variante
+
+    def filas(self, queryset):
+        """
+        QuerySet de filas con nombre (``values_list(named=True)``) con las
+        columnas del esquema, ``pk`` y los campos de orden del QuerySet, de
+        modo que la paginación por clave puede leerlos como atributos.
+        """
+        extra = ['pk']
+        for campo in queryset.query.order_by or queryset.model._meta.ordering:
+            if isinstance(campo, str):
+                nombre = campo.lstrip('-')
+                if nombre not in extra and nombre not in self.columnas:
+                    extra.append(nombre)
+        return queryset.values_list(*self.columnas, *extra, named=True)
+
+    def construir(self, fila):
+        return self._construir(fila)
+
+    def construir_lista(self, filas):
+        construir = self._construir
+        return [construir(fila) for fila in filas]
+
+    def _compilar(self, serializer, prefijo, opcional, campos, expandir):
+        """
+        Compila un nivel del esquema.
+
+        Args:
+            campos: Árbol ``{nombre: subárbol}`` de los campos pedidos en este
+                nivel, o ``None`` para todos
+            expandir: Rutas (relativas a este nivel) de las relaciones a anidar
+        """
+        modelo = serializer.Meta.model
+        legibles = {nombre: campo for nombre, campo in serializer.fields.items() if not campo.write_only}
+        desconocidos = (set(campos or ()) | {ruta.split('.')[0] for ruta in expandir}) - set(legibles)
+        if desconocidos:
+            raise ValueError(f'Campos desconocidos en {modelo.__name__}: {", ".join(sorted(desconocidos))}')
+
+        pasos = []
+        indice_pk = None
+        for nombre, campo in legibles.items():
+            expandido = nombre in expandir or (campos is not None and campos.get(nombre) is not None)
+            if campos is not None and nombre not in campos and not expandido:
+                continue
+
+            if isinstance(campo, serializers.BaseSerializer):
+                relacion = modelo._meta.get_field(campo.source)
+                if not isinstance(relacion, ForeignKey) or getattr(campo, 'many', False):
+                    raise TypeError(f'{modelo.__name__}.{nombre}: solo se admiten ForeignKey anidadas.')
+                if campos is None or expandido:
+                    anidado = self._compilar(
+                        campo, f'{prefijo}{campo.source}__', opcional or relacion.null,
+                        campos.get(nombre) if campos is not None else None,
+                        {ruta.split('.', 1)[1] for ruta in expandir if ruta.startswith(f'{nombre}.')},
+                    )
+                    pasos.append((nombre, None, anidado))
+                else:
+                    # Relación sin expandir: solo su id, sin JOIN
+                    pasos.append((nombre, self._columna(f'{prefijo}{relacion.attname}'), None))
+                continue
+
+            if isinstance(campo, drf_fields.ModelField):
+                ruta = campo.model_field.name
+                conversor = _conversor_model_field(campo.model_field)
+            elif isinstance(campo, drf_fields.ReadOnlyField) or isinstance(campo, _SIN_CONVERSION):
+                ruta = campo.source.replace('.', '__')
+                conversor = None
+            elif isinstance(campo, (drf_fields.DateField, drf_fields.DecimalField)):
+                ruta = campo.source.replace('.', '__')
+                conversor = campo.to_representation
+            else:
+                raise TypeError(f'{modelo.__name__}.{nombre}: campo no soportado ({type(campo).__name__}).')
+
+            indice = self._columna(f'{prefijo}{ruta}')
+            if ruta in ('id', 'pk', modelo._meta.pk.name):
+                indice_pk = indice
+            pasos.append((nombre, indice, conversor))
+
+        if opcional and indice_pk is None:
+            # Columna auxiliar para distinguir una relación vacía
+            indice_pk = self._columna(f'{prefijo}{modelo._meta.pk.name}')
+        return _constructor(pasos, indice_pk if opcional else None)
+
+    def _columna(self, ruta):
+        self.columnas.append(ruta)
+        return len(self.columnas) - 1
+
+
+def _parsear_seleccion(fields, expand):
+    """
+    Convierte ``?fields=`` y ``?expand=`` en el árbol de campos y el
+    conjunto de rutas a expandir que usa ``EsquemaLectura``.
+    """
+    campos = None
+    if fields:
+        campos = {}
+        for ruta in filter(None, (parte.strip() for parte in fields.split(','))):
+            nivel = campos
+            *padres, hoja = ruta.split('.')
+            for padre in padres:
+                if nivel.get(padre) is None:
+                    nivel[padre] = {}
+                nivel = nivel[padre]
+            nivel.setdefault(hoja, None)
+    expandir = set()
+    for ruta in filter(None, (parte.strip() for parte in (expand or '').split(','))):
+        partes = ruta.split('.')
+        # expand=libro.autor implica expandir también libro
+        expandir.update('.'.join(partes[:i]) for i in range(1, len(partes) + 1))
+    return campos, frozenset(expandir)
+
+
+def _conversor_model_field(model_field):
+    # Misma lógica que rest_framework.fields.ModelField.to_representation
+    def convertir(valor):
+        if is_protected_type(valor):
+            return valor
+        return model_field.value_to_string(SimpleNamespace(**{model_field.attname: valor}))
+    return convertir
+
+
+def _constructor(pasos, indice_nulo):
+    def construir(fila):
+        if indice_nulo is not None and fila[indice_nulo] is None:
+            # Relación opcional vacía (LEFT JOIN sin fila)
+            return None
+        datos = {}
+        for clave, indice, conversor in pasos:
+            if indice is None:
+                datos[clave] = conversor(fila)
+                continue
+            valor = fila[indice]
+            if conversor is not None and valor is not None:
+                valor = conversor(valor)
+            datos[clave] = valor
+        return datos
+    return construir
+
+
+class LecturaRapidaMixin:
+    """
+    Sustituye ``list`` y ``retrieve`` de un ``ModelViewSet`` por la lectura
+    rápida con ``esquema_lectura`` (paginación incluida), admitiendo
+    ``?fields=`` y ``?expand=`` (ver ``EsquemaLectura.con_seleccion``).
+
+    Las comprobaciones de permisos por objeto reciben la fila en lugar de la
+    instancia, así que el mixin solo es apto para vistas cuyos permisos no
+    inspeccionan el objeto.
+    """
+    esquema_lectura = None
+
+    def list(self, request, *args, **kwargs):
+        return self.respuesta_lectura(self.filter_queryset(self.get_queryset()))
+
+    def retrieve(self, request, *args, **kwargs):
+        esquema = self.esquema_solicitado()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        fila = esquema.filas(queryset.order_by()).first()
+        if fila is None:
+            raise Http404
+        self.check_object_permissions(request, fila)
+        return Response(esquema.construir(fila))
+
+    def esquema_solicitado(self):
+        """
+        Esquema de lectura para los parámetros ``?fields=`` y ``?expand=``.
+        """
+        try:
+            return self.esquema_lectura.con_seleccion(
+                self.request.query_params.get('fields'),
+                self.request.query_params.get('expand'),
+            )
+        except ValueError as e:
+            raise ValidationError({'fields': str(e)})
+
+    def respuesta_lectura(self, queryset, paginar=True):
+        esquema = self.esquema_solicitado()
+        filas = esquema.filas(queryset)
+        pagina = self.paginate_queryset(filas) if paginar else None
+        if pagina is not None:
+            return self.get_paginated_response(esquema.construir_lista(pagina))
+        return Response(esquema.construir_lista(filas))
@@ -0,0 +1,99 @@
+"""
+Utilidades para las operaciones por lotes de la API (``POST``/``PATCH`` con
+una lista de objetos).
+
+Cada elemento se valida con un serializador "de lote" que no consulta la
+base de datos; las comprobaciones que sí la necesitan (claves foráneas,
+unicidad) las hace el servicio con una consulta ``IN`` por lote. Los errores
+se devuelven por elemento, identificados por su posición en la lista.
+"""
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+# Máximo de elementos aceptados en una petición por lotes
+MAX_ELEMENTOS_LOTE = 1000
+
+
+def elementos_solicitud(request):
+    """
+    Devuelve la lista de elementos del cuerpo de la petición.
+
+    Raises:
+        ValidationError: Si el cuerpo no es una lista o supera
+            ``MAX_ELEMENTOS_LOTE`` elementos
+    """
+    elementos = request.data
+    if not isinstance(elementos, list) or not elementos:
+        raise ValidationError({'detail': 'Se esperaba una lista de objetos no vacía.'})
+    if len(elementos) > MAX_ELEMENTOS_LOTE:
+        raise ValidationError({'detail': f'El lote no puede superar {MAX_ELEMENTOS_LOTE} elementos.'})
+    return elementos
+
+
+def validar_elementos(serializer_class, elementos, instancias=None, context=None):
+    """
+    Valida cada elemento con ``serializer_class``.
+
+    Con ``instancias`` (diccionario ``{pk: instancia}``) se hace una
+    actualización parcial: cada elemento debe traer su ``id`` y cada ``id``
+    solo puede aparecer una vez (se acepta la primera aparición), porque los
+    elementos repetidos compartirían la misma instancia.
+
+    Returns:
+        Tupla ``(validos, errores)``: ``validos`` es una lista de
+        ``(indice, instancia, datos_validados)`` (``instancia`` es ``None``
+        al crear) y ``errores`` un diccionario ``{indice: errores}``
+    """
+    validos = []
+    errores = {}
+    vistos = set()
+    for indice, elemento in enumerate(elementos):
+        if not isinstance(elemento, dict):
+            errores[indice] = {'detail': ['Se esperaba un objeto.']}
+            continue
+
+        instancia = None
+        if instancias is not None:
+            instancia = instancias.get(elemento.get('id'))
+            if instancia is None:
+                errores[indice] = {'id': ['No existe un objeto con este id.']}
+                continue
+            if instancia.pk in vistos:
+                errores[indice] = {'id': ['Este id ya aparece antes en el lote.']}
+                continue
+            vistos.add(instancia.pk)
+
+        serializer = serializer_class(instancia, data=elemento, partial=instancia is not None, context=context)
+        if serializer.is_valid():
+            validos.append((indice, instancia, serializer.validated_data))
+        else:
+            errores[indice] = serializer.errors
+    return validos, errores
+
+
+def ids_solicitados(elementos):
+    """Ids (enteros) presentes en los elementos de una actualización por lotes."""
+    ids = set()
+    for elemento in elementos:
+        if isinstance(elemento, dict) and isinstance(elemento.get('id'), int):
+            ids.add(elemento['id'])
+    return ids
+
+
+def respuesta_lote(total, guardados, errores, status_exito=status.HTTP_200_OK):
+    """
+    Respuesta con un resultado por elemento, en el orden de la petición:
+    ``{'indice', 'id'}`` si se guardó o ``{'indice', 'errores'}`` si no.
+
+    Devuelve ``status_exito`` si se guardó al menos un elemento y 400 si no.
+    """
+    resultados = [
+        {'indice': indice, 'errores': errores[indice]} if indice in errores
+        else {'indice': indice, 'id': guardados[indice].pk}
+        for indice in range(total)
+    ]
+    return Response(
+        {'resultados': resultados},
+        status=status_exito if guardados else status.HTTP_400_BAD_REQUEST
+    )
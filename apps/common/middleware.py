@@ -0,0 +1,72 @@
+"""
+Middleware del proyecto.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import replicas
+
+
+class WhiteNoiseAsincrona(WhiteNoiseMiddleware):
+    """
+    ``WhiteNoiseMiddleware`` que también funciona en modo asíncrono.
+
+    El original solo es síncrono: bajo ASGI, Django ejecutaría toda la
+    cadena de cada petición en un hilo y las vistas asíncronas no ahorrarían
+    nada. Los estáticos se sirven igual; el resto de peticiones pasan a la
+    siguiente capa sin salir del bucle de eventos.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.asincrona = iscoroutinefunction(get_response)
+        if self.asincrona:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrona:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class ReplicasMiddleware:
+    """
+    Delimita cada petición para las lecturas en réplica (``apps.common.replicas``):
+    empieza sin lectura en réplica y, si la petición escribió, fija a su
+    usuario en la principal.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrona = iscoroutinefunction(get_response)
+        if self.asincrona:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrona:
+            return self.__acall__(request)
+        replicas.empezar_peticion()
+        response = self.get_response(request)
+        replicas.terminar_peticion(request)
+        return response
+
+    async def __acall__(self, request):
+        replicas.empezar_peticion()
+        response = await self.get_response(request)
+        if replicas.escrito():
+            # El usuario de la sesión se carga de la base de datos
+            await sync_to_async(replicas.terminar_peticion)(request)
+        return response
@@ -0,0 +1,248 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+def ordenacion_keyset(queryset):
+    """
+    Orden a usar para paginar por clave: el del QuerySet o, si no tiene,
+    ``Meta.ordering`` del modelo, completado con ``pk`` como desempate.
+    """
+    ordering = [campo for campo in queryset.query.order_by if isinstance(campo, str)]
+    if not ordering:
+        ordering = list(queryset.model._meta.ordering)
+    if not any(campo.lstrip('-') in ('pk', 'id') for campo in ordering):
+        ordering.append('pk')
+    return tuple(ordering)
+
+
+def codificar_cursor(ordering, instancia, reverse=False):
+    """
+    Cursor opaco con la posición de ``instancia`` dentro de ``ordering``.
+    """
+    datos = {
+        'o': list(ordering),
+        'p': [_valor_json(_valor(instancia, campo)) for campo in ordering],
+    }
+    if reverse:
+        datos['r'] = 1
+    return urlsafe_b64encode(json.dumps(datos, separators=(',', ':')).encode()).decode('ascii')
+
+
+def decodificar_cursor(model, ordering, codificado):
+    """
+    Devuelve ``(posicion, reverse)`` a partir de un cursor.
+
+    Raises:
+        ValueError: Si el cursor está mal formado o pertenece a otro orden
+    """
+    try:
+        datos = json.loads(urlsafe_b64decode(codificado.encode('ascii')))
+        if datos['o'] != list(ordering) or len(datos['p']) != len(ordering):
+            raise ValueError('El cursor no corresponde a este orden.')
+        posicion = [_a_python(model, campo, valor) for campo, valor in zip(ordering, datos['p'])]
+        return posicion, bool(datos.get('r'))
+    except (TypeError, KeyError, UnicodeError, ValidationError) as e:
+        raise ValueError('Cursor mal formado.') from e
+
+
+def pagina_keyset(queryset, ordering, posicion=None, tamano=10, reverse=False):
+    """
+    Obtiene una página de ``tamano`` elementos a continuación de ``posicion``.
+
+    Con ``reverse`` se recorre hacia atrás (página anterior) y el resultado
+    se devuelve igualmente en el orden natural.
+
+    Returns:
+        Tupla ``(elementos, hay_mas)``; ``hay_mas`` indica si quedan elementos
+        en el sentido del recorrido.
+    """
+    consulta = _consulta_keyset(queryset, ordering, posicion, tamano, reverse)
+    return _recortar(list(consulta), tamano, reverse)
+
+
+async def apagina_keyset(queryset, ordering, posicion=None, tamano=10, reverse=False):
+    """Versión de ``pagina_keyset`` con el ORM asíncrono."""
+    consulta = _consulta_keyset(queryset, ordering, posicion, tamano, reverse)
+    return _recortar([elemento async for elemento in consulta], tamano, reverse)
+
+
+def _consulta_keyset(queryset, ordering, posicion, tamano, reverse):
+    if reverse:
+        ordering = tuple(_invertir(campo) for campo in ordering)
+    queryset = queryset.order_by(*ordering)
+    if posicion is not None:
+        queryset = queryset.filter(_despues_de(ordering, posicion))
+    return queryset[:tamano + 1]
+
+
+def _recortar(elementos, tamano, reverse):
+    hay_mas = len(elementos) > tamano
+    elementos = elementos[:tamano]
+    if reverse:
+        elementos.reverse()
+    return elementos, hay_mas
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Paginación por clave (keyset) sin ``COUNT(*)`` ni ``OFFSET``.
+
+    El orden se toma del QuerySet (``OrderingFilter``, relevancia de búsqueda)
+    o, si no lo tiene, de ``Meta.ordering`` del modelo, y siempre se completa
+    con ``pk`` como desempate para que la posición sea única. El cursor es
+    opaco: codifica los valores de orden del último (o primer) elemento de la
+    página, de modo que cada página es un rango ``WHERE (campos) > (valores)``
+    que la base de datos resuelve con el índice correspondiente.
+
+    Los campos de orden deben ser columnas no nulas o anotaciones del modelo.
+    """
+    invalid_cursor_message = 'Cursor inválido.'
+    cursor_query_description = 'Cursor opaco de la página a obtener.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        posicion, reverse = None, False
+        codificado = request.query_params.get(self.cursor_query_param)
+        if codificado is not None:
+            try:
+                posicion, reverse = decodificar_cursor(queryset.model, self.ordering, codificado)
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+
+        self.page, hay_mas = pagina_keyset(queryset, self.ordering, posicion, self.page_size, reverse)
+        if reverse:
+            self.has_previous, self.has_next = hay_mas, True
+        else:
+            self.has_next, self.has_previous = hay_mas, posicion is not None
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        return ordenacion_keyset(queryset)
+
+    def encode_cursor(self, instancia, reverse):
+        codificado = codificar_cursor(self.ordering, instancia, reverse)
+        return replace_query_param(self.base_url, self.cursor_query_param, codificado)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+
+class BibliotecaPagination(BasePagination):
+    """
+    Paginación por defecto de la API.
+
+    Usa ``KeysetPagination``; los clientes antiguos pueden seguir pidiendo
+    páginas numeradas enviando ``?page=N`` o ``?paginacion=numerada``.
+    """
+    modo_query_param = 'paginacion'
+
+    def __init__(self):
+        self.cursor = KeysetPagination()
+        self.numerada = PageNumberPagination()
+        self.activa = self.cursor
+
+    def usa_numeracion(self, request):
+        return (
+            self.numerada.page_query_param in request.query_params
+            or request.query_params.get(self.modo_query_param) == 'numerada'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.activa = self.numerada if self.usa_numeracion(request) else self.cursor
+        return self.activa.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.activa.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.cursor.get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            *self.cursor.get_schema_operation_parameters(view),
+            *self.numerada.get_schema_operation_parameters(view),
+            {
+                'name': self.modo_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Usar "numerada" para la paginación clásica por número de página.',
+                'schema': {'type': 'string', 'enum': ['numerada']},
+            },
+        ]
+
+    def get_results(self, data):
+        return self.activa.get_results(data)
+
+    def to_html(self):
+        return self.activa.to_html()
+
+    @property
+    def display_page_controls(self):
+        return self.activa.display_page_controls
+
+
+def _a_python(model, campo, valor):
+    nombre = campo.lstrip('-')
+    try:
+        field = model._meta.pk if nombre == 'pk' else model._meta.get_field(nombre)
+    except FieldDoesNotExist:
+        # Anotaciones (p. ej. la relevancia de búsqueda)
+        return valor
+    return field.to_python(valor)
+
+
+def _invertir(campo):
+    return campo[1:] if campo.startswith('-') else f'-{campo}'
+
+
+def _valor(instancia, campo):
+    nombre = campo.lstrip('-')
+    if nombre == 'pk' or isinstance(instancia, tuple):
+        # Filas con nombre de values_list(named=True): columnas planas
+        return getattr(instancia, nombre)
+    for parte in nombre.split('__'):
+        instancia = getattr(instancia, parte)
+    return instancia
+
+
+def _valor_json(valor):
+    return valor.isoformat() if hasattr(valor, 'isoformat') else valor
+
+
+def _despues_de(ordering, posicion):
+    """
+    Condición "fila posterior a ``posicion``" para un orden compuesto:
+    ``(a > x) OR (a = x AND b > y) OR ...``, con ``<`` en los campos
+    descendentes. El primer término se repite como rango (``a >= x``) para
+    que el motor pueda usar el índice del primer campo.
+    """
+    condicion = Q()
+    iguales = Q()
+    for campo, valor in zip(ordering, posicion):
+        nombre = campo.lstrip('-')
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        condicion |= iguales & Q(**{f'{nombre}__{operador}': valor})
+        iguales &= Q(**{nombre: valor})
+
+    primero = ordering[0]
+    operador = 'lte' if primero.startswith('-') else 'gte'
+    return Q(**{f'{primero.lstrip("-")}__{operador}': posicion[0]}) & condicion
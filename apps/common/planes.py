@@ -0,0 +1,62 @@
+"""
+Inspección de planes de ejecución para detectar consultas sin índice.
+
+Se usa en la suite de regresión de planes (``test_planes_*``): cada consulta
+crítica se pasa por ``EXPLAIN`` y se comprueba que el motor no recorre la
+tabla completa ni ordena en una estructura temporal.
+"""
+import json
+import re
+
+from django.db import connections
+
+_SCAN_SQLITE = re.compile(r'\bSCAN (\w+)(.*)$')
+
+
+def problemas_plan(queryset):
+    """
+    Devuelve la lista de pasos del plan que indican un recorrido completo
+    de tabla o una ordenación sin índice; vacía si el plan es correcto.
+
+    Recorrer un índice entero en orden solo se admite si la consulta tiene
+    ``LIMIT`` (una página), porque el motor se detiene al completarla.
+
+    Soporta SQLite (``EXPLAIN QUERY PLAN``) y MySQL (``EXPLAIN FORMAT=JSON``).
+    """
+    vendor = connections[queryset.db].vendor
+    con_limite = queryset.query.high_mark is not None
+    if vendor == 'sqlite':
+        return _problemas_sqlite(queryset.explain(), con_limite)
+    if vendor == 'mysql':
+        return _problemas_mysql(json.loads(queryset.explain(format='JSON')), con_limite)
+    raise NotImplementedError(f'Análisis de planes no disponible para {vendor}.')
+
+
+def _problemas_sqlite(plan, con_limite):
+    problemas = []
+    for linea in plan.splitlines():
+        paso = linea.strip(' |-`')
+        coincidencia = _SCAN_SQLITE.search(paso)
+        if coincidencia and not (con_limite and 'INDEX' in coincidencia.group(2)):
+            # "SCAN tabla [USING INDEX ...]": recorrido completo
+            problemas.append(paso)
+        elif 'USE TEMP B-TREE' in paso:
+            problemas.append(paso)
+    return problemas
+
+
+def _problemas_mysql(nodo, con_limite, problemas=None):
+    if problemas is None:
+        problemas = []
+    if isinstance(nodo, dict):
+        acceso = nodo.get('access_type')
+        if acceso == 'ALL' or (acceso == 'index' and not con_limite):
+            problemas.append(f"{acceso} {nodo.get('table_name', '?')}")
+        if nodo.get('using_filesort'):
+            problemas.append('using_filesort')
+        for valor in nodo.values():
+            _problemas_mysql(valor, con_limite, problemas)
+    elif isinstance(nodo, list):
+        for valor in nodo:
+            _problemas_mysql(valor, con_limite, problemas)
+    return problemas
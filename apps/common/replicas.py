@@ -0,0 +1,157 @@
+"""
+Lecturas desde réplicas de la base de datos.
+
+``DATABASE_REPLICAS`` enumera los alias de ``DATABASES`` que son réplicas de
+solo lectura de ``default``. Solo leen de ellas las vistas que lo piden
+(``LecturaReplicaMixin`` en los viewsets, ``@lectura_replica`` en las vistas
+HTML); el resto del código, los servicios y toda escritura siguen en la
+principal. ``RouterReplicas`` elige una réplica al azar para cada lectura
+mientras está activa la lectura en réplica del contexto actual.
+
+Leer lo que uno acaba de escribir: la primera escritura de una petición la
+devuelve a la principal hasta que termina, y ``ReplicasMiddleware`` fija
+después al usuario en la principal durante ``REPLICAS_FIJACION`` segundos,
+el retraso máximo que se espera de la replicación. La fijación se guarda en
+la caché por usuario, así que vale para la sesión y para JWT y la comparten
+todos los workers.
+
+Lo que se guarda en las cachés compartidas se calcula en la principal
+(``en_primaria``): un valor leído de una réplica atrasada quedaría guardado
+con la generación ya invalidada y se serviría hasta su TTL.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+PREFIJO = 'replicas:fijado'
+
+# Segundos que un usuario lee de la principal tras escribir
+FIJACION_POR_DEFECTO = 5
+
+# Lecturas permitidas en réplica y escrituras hechas en la petición actual
+_en_replica = ContextVar('replicas_lectura', default=False)
+_escrito = ContextVar('replicas_escritura', default=False)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def _clave_fijacion(usuario):
+    return f'{PREFIJO}:{usuario.pk}'
+
+
+def fijado(usuario):
+    """Indica si ``usuario`` escribió hace poco y debe leer de la principal."""
+    return bool(usuario.is_authenticated and cache.get(_clave_fijacion(usuario)))
+
+
+def fijar(usuario):
+    segundos = getattr(settings, 'REPLICAS_FIJACION', FIJACION_POR_DEFECTO)
+    cache.set(_clave_fijacion(usuario), True, segundos)
+
+
+def activar(usuario):
+    """
+    Permite leer de una réplica hasta ``desactivar()`` salvo que no haya
+    réplicas o que ``usuario`` esté fijado en la principal.
+    """
+    if replicas() and not fijado(usuario):
+        _en_replica.set(True)
+
+
+def desactivar():
+    _en_replica.set(False)
+
+
+@contextmanager
+def en_primaria():
+    """Bloque cuyas lecturas van a la principal aunque haya lectura en réplica."""
+    anterior = _en_replica.get()
+    _en_replica.set(False)
+    try:
+        yield
+    finally:
+        _en_replica.set(anterior)
+
+
+def lectura_replica(vista):
+    """Decorador de vistas de función que leen de una réplica."""
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        activar(request.user)
+        try:
+            return vista(request, *args, **kwargs)
+        finally:
+            desactivar()
+    return envoltura
+
+
+class LecturaReplicaMixin:
+    """
+    Lee de una réplica en las acciones de ``acciones_replica`` una vez
+    autenticada la petición (``initial``), hasta ``finalize_response``.
+    """
+    acciones_replica = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.acciones_replica:
+            activar(request.user)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        desactivar()
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class RouterReplicas:
+    """Router de ``DATABASE_ROUTERS`` para las réplicas de ``default``."""
+
+    def db_for_read(self, model, **hints):
+        if _en_replica.get() and not _escrito.get():
+            alias = replicas()
+            if alias:
+                return random.choice(alias)
+        return None
+
+    def db_for_write(self, model, **hints):
+        _escrito.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Todas las bases son la misma: un objeto leído de una réplica puede
+        # relacionarse con uno de la principal
+        bases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema por la replicación
+        if db in replicas():
+            return False
+        return None
+
+
+def empezar_peticion():
+    """Sin lectura en réplica ni escrituras al empezar cada petición."""
+    _en_replica.set(False)
+    _escrito.set(False)
+
+
+def escrito():
+    """Indica si la petición actual ha escrito en la principal."""
+    return _escrito.get()
+
+
+def terminar_peticion(request):
+    """Fija en la principal al usuario de una petición que escribió."""
+    # DRF copia el usuario autenticado (JWT, Basic) en la petición de Django
+    usuario = getattr(request, 'user', None)
+    if _escrito.get() and replicas() and usuario is not None and usuario.is_authenticated:
+        fijar(usuario)
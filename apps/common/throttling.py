@@ -0,0 +1,135 @@
+"""
+Límites de peticiones compartidos por todos los workers del servidor.
+
+Los throttles de DRF guardan el historial de cada cliente en la caché por
+defecto, que sin ``CACHES`` es memoria local de cada proceso: con N workers
+de gunicorn un cliente disponía de N veces su cuota. Estas clases guardan el
+estado en un archivo SQLite local (``THROTTLE_DB_PATH``) que comparten todos
+los procesos del servidor.
+
+Cada cliente es un cubo de tokens con capacidad ``num_requests`` que se
+rellena a razón de ``num_requests / duration`` tokens por segundo,
+representado (GCRA) por un único número: el instante teórico ``tat`` en que
+el cubo volvería a estar lleno. Una petición se admite si, al sumarle su
+coste, ``tat`` no supera ``ahora + duration``. Por cliente se guarda una
+fila de tamaño fijo (en lugar de la lista de marcas de tiempo de DRF) y cada
+petición es una sola sentencia ``INSERT ... ON CONFLICT DO UPDATE ...
+RETURNING``, atómica en SQLite.
+
+Las filas con ``tat`` pasado equivalen a un cubo lleno y se borran cada
+``PURGA_CADA`` peticiones de un proceso. Si el archivo no está disponible la
+petición se admite y se registra el error: el límite no debe tumbar la API.
+"""
+import logging
+import os
+import sqlite3
+import threading
+
+from django.conf import settings
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+logger = logging.getLogger(__name__)
+
+# Cada cuántas peticiones de un proceso se borran las entradas caducadas
+PURGA_CADA = 1000
+
+# Segundos que se espera al bloqueo de escritura de otro proceso
+ESPERA_BLOQUEO = 5
+
+_TABLA = """
+CREATE TABLE IF NOT EXISTS limites (
+    clave TEXT PRIMARY KEY,
+    tat REAL NOT NULL,
+    permitido INTEGER NOT NULL
+) WITHOUT ROWID
+"""
+
+# En el UPDATE todas las expresiones ven los valores anteriores de la fila
+_CONSUMIR = """
+INSERT INTO limites (clave, tat, permitido) VALUES (:clave, :ahora + :intervalo, 1)
+ON CONFLICT (clave) DO UPDATE SET
+    tat = CASE WHEN max(tat, :ahora) + :intervalo - :ahora <= :rafaga
+               THEN max(tat, :ahora) + :intervalo ELSE tat END,
+    permitido = max(tat, :ahora) + :intervalo - :ahora <= :rafaga
+RETURNING permitido, tat
+"""
+
+_local = threading.local()
+
+
+def _conexion():
+    """Conexión del hilo al archivo configurado, abierta de nuevo tras un fork."""
+    ruta = settings.THROTTLE_DB_PATH
+    if getattr(_local, 'origen', None) != (os.getpid(), ruta):
+        # La conexión heredada del proceso padre no se cierra: sigue siendo suya
+        if getattr(_local, 'origen', (None,))[0] == os.getpid():
+            _local.conexion.close()
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        conexion = sqlite3.connect(ruta, timeout=ESPERA_BLOQUEO, isolation_level=None)
+        conexion.execute('PRAGMA journal_mode=WAL')
+        conexion.execute('PRAGMA synchronous=NORMAL')
+        conexion.execute(_TABLA)
+        _local.conexion = conexion
+        _local.origen = (os.getpid(), ruta)
+        _local.peticiones = 0
+    return _local.conexion
+
+
+def consumir(clave, ahora, intervalo, rafaga):
+    """
+    Gasta un token del cubo ``clave`` si le queda alguno.
+
+    Args:
+        clave: Identificador del cliente
+        ahora: Instante actual en segundos (``time.time()``)
+        intervalo: Segundos que tarda en reponerse un token
+        rafaga: Segundos de tokens que caben en el cubo (capacidad × intervalo)
+
+    Returns:
+        Tupla ``(permitido, tat)`` con el ``tat`` ya actualizado
+    """
+    conexion = _conexion()
+    permitido, tat = conexion.execute(_CONSUMIR, {
+        'clave': clave, 'ahora': ahora, 'intervalo': intervalo, 'rafaga': rafaga,
+    }).fetchone()
+
+    _local.peticiones += 1
+    if _local.peticiones % PURGA_CADA == 0:
+        conexion.execute('DELETE FROM limites WHERE tat < ?', (ahora,))
+    return bool(permitido), tat
+
+
+class ThrottleCompartido:
+    """
+    Sustituye el historial en caché de ``SimpleRateThrottle`` por un cubo de
+    tokens en ``THROTTLE_DB_PATH``. Conserva la tasa y la clave del throttle.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        self.intervalo = self.duration / self.num_requests
+        try:
+            permitido, self.tat = consumir(self.key, self.now, self.intervalo, self.duration)
+        except sqlite3.Error:
+            logger.exception('No se pudo consultar el límite de peticiones de %s', self.key)
+            return True
+        return permitido or self.throttle_failure()
+
+    def wait(self):
+        """Segundos hasta que se repone el siguiente token."""
+        return max(0.0, self.tat + self.intervalo - self.duration - self.now)
+
+
+class AnonThrottleCompartido(ThrottleCompartido, AnonRateThrottle):
+    """``AnonRateThrottle`` compartido entre workers (tasa ``anon``)."""
+
+
+class UserThrottleCompartido(ThrottleCompartido, UserRateThrottle):
+    """``UserRateThrottle`` compartido entre workers (tasa ``user``)."""
@@ -0,0 +1,16 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import cache_niveles
+
+
+class EstadisticasCacheView(APIView):
+    """
+    Aciertos (locales y compartidos), fallos y expulsiones de la caché por
+    espacio de claves, sumados entre todos los workers. Solo personal.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_niveles.estadisticas())
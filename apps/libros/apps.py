@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def instalar_indice_busqueda(sender, using='default', **kwargs):
+    from .search import instalar_indice
+    instalar_indice(using)
 
 
 class LibrosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.libros'
+
+    def ready(self):
+        from apps.common import imagenes
+        from . import signals  # noqa: F401
+        from .models import Categoria, Libro
+        imagenes.diferir_subida(Categoria, 'imagen', imagenes.VARIANTES_CATEGORIA)
+        imagenes.diferir_subida(Libro, 'imagen', imagenes.VARIANTES_PORTADA)
+        post_migrate.connect(instalar_indice_busqueda, sender=self)
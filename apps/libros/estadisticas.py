@@ -0,0 +1,156 @@
+"""
+Estadísticas del catálogo para el panel de inicio.
+
+Los recuentos se guardan en ``ContadorCatalogo`` y se actualizan de forma
+incremental en cada alta, baja o cambio de categoría o disponibilidad de un
+libro: las señales cubren los ``save()``/``delete()`` individuales y los
+servicios llaman a ``registrar_cambios`` en las escrituras por conjuntos.
+
+La parte compartida del panel (totales y categorías con su recuento) se
+cachea en los espacios ``libros`` y ``categorias`` de
+``apps.common.cache_niveles``; la vista previa de ``LIBROS_VISTA_PREVIA``
+libros de cada categoría se cachea aparte, porque los préstamos invalidan
+``libros`` pero no la cambian. La parte de cada usuario se resuelve aparte
+para reutilizarla entre todos.
+"""
+from django.db.models import F
+
+from apps.common import cache_niveles, cache_respuestas
+from apps.common.cache_niveles import cacheado
+
+from .models import Categoria, ContadorCatalogo, Libro
+
+# Libros que se muestran de cada categoría en el panel
+LIBROS_VISTA_PREVIA = 4
+
+# Generación de la vista previa (``cache_respuestas``) y campos de Libro de
+# los que depende
+VISTA_PREVIA = 'libros.vista_previa'
+CAMPOS_VISTA_PREVIA = {'titulo', 'categoria'}
+
+
+def _clave(categoria_id):
+    return categoria_id or ContadorCatalogo.SIN_CATEGORIA
+
+
+def registrar_cambios(cambios):
+    """
+    Aplica a los contadores los cambios de un conjunto de libros.
+
+    Args:
+        cambios: Iterable de ``(antes, despues)``, cada uno ``None`` (el
+            libro no existía o ya no existe) o ``(categoria_id, disponible)``
+    """
+    deltas = {}
+    for antes, despues in cambios:
+        for estado, signo in ((antes, -1), (despues, 1)):
+            if estado is None:
+                continue
+            categoria_id, disponible = estado
+            libros, disponibles = deltas.get(_clave(categoria_id), (0, 0))
+            deltas[_clave(categoria_id)] = (libros + signo, disponibles + (signo if disponible else 0))
+
+    for categoria, (libros, disponibles) in deltas.items():
+        _sumar(categoria, libros, disponibles)
+
+
+def vaciar_categoria(categoria_id):
+    """
+    Pasa los recuentos de una categoría que se va a borrar a la fila de los
+    libros sin categoría (``on_delete=SET_NULL`` no emite señales).
+    """
+    contador = ContadorCatalogo.objects.filter(categoria=categoria_id).first()
+    if contador is None:
+        return
+    _sumar(ContadorCatalogo.SIN_CATEGORIA, contador.libros, contador.disponibles)
+    contador.delete()
+
+
+def _sumar(categoria, libros, disponibles):
+    if not libros and not disponibles:
+        return
+    ContadorCatalogo.objects.get_or_create(categoria=categoria)
+    ContadorCatalogo.objects.filter(categoria=categoria).update(
+        libros=F('libros') + libros,
+        disponibles=F('disponibles') + disponibles
+    )
+
+
+def contar_catalogo():
+    """
+    Recuentos reales por categoría a partir de ``Libro``:
+    ``{clave: (libros, disponibles)}``. Solo para reconciliar.
+    """
+    reales = {}
+    for categoria_id, disponible in Libro.objects.values_list('categoria_id', 'disponible').iterator():
+        libros, disponibles = reales.get(_clave(categoria_id), (0, 0))
+        reales[_clave(categoria_id)] = (libros + 1, disponibles + int(disponible))
+    return reales
+
+
+@cacheado('libros', 'categorias')
+def panel_catalogo():
+    """
+    Datos compartidos del panel de inicio.
+
+    Returns:
+        Diccionario con ``total_libros``, ``libros_disponibles`` y
+        ``categorias`` (lista de ``{'categoria', 'total', 'libros'}``, donde
+        ``libros`` son como mucho ``LIBROS_VISTA_PREVIA`` libros)
+    """
+    return _calcular_panel()
+
+
+def _calcular_panel():
+    contadores = {
+        categoria: (libros, disponibles)
+        for categoria, libros, disponibles in ContadorCatalogo.objects.values_list('categoria', 'libros', 'disponibles')
+    }
+    previas = vista_previa()
+
+    return {
+        'total_libros': sum(libros for libros, _ in contadores.values()),
+        'libros_disponibles': sum(disponibles for _, disponibles in contadores.values()),
+        'categorias': [
+            {
+                'categoria': categoria,
+                'total': contadores.get(categoria.pk, (0, 0))[0],
+                'libros': previas.get(categoria.pk, []),
+            }
+            for categoria in Categoria.objects.only(
+                'id', 'nombre', 'imagen', 'imagen_estado', 'imagen_url', 'imagen_variantes', 'modificado'
+            )
+        ],
+    }
+
+
+def vista_previa():
+    """
+    Primeros ``LIBROS_VISTA_PREVIA`` libros por título de cada categoría con
+    libros: ``{categoria_id: [libro, ...]}``.
+
+    Se cachea aparte del resto del panel con la generación ``VISTA_PREVIA``,
+    que solo cambian las altas, bajas y ediciones de libros (y el espacio
+    ``categorias``): los préstamos y devoluciones, que cambian el stock e
+    invalidan ``libros``, no la recalculan.
+    """
+    generacion = cache_respuestas.generaciones([VISTA_PREVIA])[0]
+    return cache_niveles.obtener(('categorias',), f'vista_previa:{generacion}', _calcular_vista_previa)
+
+
+def _calcular_vista_previa():
+    # Solo categorías con libros; cada una lee sus primeros libros del
+    # índice (categoria, titulo) sin recorrer el resto del catálogo
+    categorias = ContadorCatalogo.objects.filter(libros__gt=0).exclude(
+        categoria=ContadorCatalogo.SIN_CATEGORIA
+    ).values_list('categoria', flat=True)
+    previas = {}
+    for categoria_id in categorias:
+        libros = list(
+            Libro.objects.filter(categoria_id=categoria_id)
+            .only('id', 'titulo', 'categoria_id')
+            .order_by('titulo', 'id')[:LIBROS_VISTA_PREVIA]
+        )
+        if libros:
+            previas[categoria_id] = libros
+    return previas
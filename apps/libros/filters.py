@@ -0,0 +1,35 @@
+from django_filters import rest_framework as django_filters
+from rest_framework import filters
+from .models import Libro
+from .search import LIMITE_RESULTADOS, buscar_libros, filtrar_libros
+
+
+class LibroFilter(django_filters.FilterSet):
+    """
+    Filtros de ``LibroViewSet``, compartidos con la exportación del catálogo.
+    """
+    class Meta:
+        model = Libro
+        fields = ['disponible', 'categoria', 'autor']
+
+
+class BusquedaLibroFilter(filters.SearchFilter):
+    """
+    Resuelve ``?search=`` contra el índice de texto completo del catálogo
+    en lugar de encadenar ``icontains`` sobre cada campo.
+
+    Sin ``?ordering=`` explícito, los resultados quedan ordenados por relevancia.
+    Las acciones de ``acciones_completas`` (la exportación) reciben todas las
+    coincidencias, sin relevancia ni límite de resultados.
+    """
+    search_description = (
+        'Texto a buscar en título, autor, categoría, descripción o ISBN. Devuelve como mucho '
+        f'los {LIMITE_RESULTADOS} libros más relevantes (cabecera X-Limite-Resultados).'
+    )
+    acciones_completas = ('exportar',)
+
+    def filter_queryset(self, request, queryset, view):
+        texto = request.query_params.get(self.search_param, '')
+        if getattr(view, 'action', None) in self.acciones_completas:
+            return filtrar_libros(queryset, texto)
+        return buscar_libros(queryset, texto)
@@ -0,0 +1,270 @@
+"""
+Importación masiva del catálogo desde CSV o NDJSON.
+
+Las filas se leen en streaming y se procesan por lotes: autores y categorías
+se resuelven con diccionarios en memoria cargados una sola vez, la unicidad
+de los ISBN se comprueba con una consulta por lote y los libros se insertan
+con ``bulk_create`` dentro de una transacción por lote. Si el lote choca
+con la base de datos (p. ej. un ISBN insertado por otro proceso después de
+comprobarlo), se reintenta fila a fila y solo se rechazan las que fallan.
+La memoria usada no depende del tamaño del fichero.
+"""
+import csv
+import json
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from apps.autores.models import Autor
+from apps.common import cache_respuestas
+
+from . import estadisticas
+from .models import Categoria, Libro
+from .search import reconstruir_indice
+
+FORMATOS = ('csv', 'ndjson')
+
+# Columnas que se guardan en Autor o Categoria: (columna, modelo, campo)
+LONGITUDES = (
+    ('autor', Autor, 'nombre'),
+    ('nacionalidad', Autor, 'nacionalidad'),
+    ('categoria', Categoria, 'nombre'),
+)
+
+# Nacionalidad asignada a los autores nuevos que no la indican
+NACIONALIDAD_DESCONOCIDA = 'Desconocida'
+
+
+def detectar_formato(ruta):
+    return 'ndjson' if str(ruta).lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+
+
+def leer_filas(ruta, formato=None):
+    """
+    Genera ``(numero_fila, datos)`` sin cargar el fichero en memoria.
+
+    ``datos`` es un diccionario, o ``None`` si la línea NDJSON no es un
+    objeto JSON válido.
+    """
+    formato = formato or detectar_formato(ruta)
+    with open(ruta, newline='', encoding='utf-8-sig') as fichero:
+        if formato == 'csv':
+            # La fila 1 es la cabecera
+            for numero, fila in enumerate(csv.DictReader(fichero), start=2):
+                yield numero, fila
+            return
+        for numero, linea in enumerate(fichero, start=1):
+            if not linea.strip():
+                continue
+            try:
+                datos = json.loads(linea)
+            except ValueError:
+                datos = None
+            yield numero, datos if isinstance(datos, dict) else None
+
+
+class ImportadorCatalogo:
+    """
+    Importa filas de catálogo por lotes.
+
+    Cada fila admite los campos ``titulo``, ``autor``, ``isbn``,
+    ``fecha_publicacion`` (AAAA-MM-DD) y, opcionalmente, ``categoria``,
+    ``descripcion``, ``paginas``, ``calificacion``, ``stock`` y
+    ``nacionalidad`` (del autor, si hay que crearlo).
+
+    Args:
+        tamano_lote: Filas por lote (y por transacción)
+        al_rechazar: Función ``(numero_fila, datos, errores)`` llamada por
+            cada fila rechazada
+        al_progresar: Función ``(procesadas, importadas, rechazadas)``
+            llamada al terminar cada lote
+    """
+
+    def __init__(self, tamano_lote=1000, al_rechazar=None, al_progresar=None):
+        self.tamano_lote = tamano_lote
+        self.al_rechazar = al_rechazar or (lambda numero, datos, errores: None)
+        self.al_progresar = al_progresar or (lambda procesadas, importadas, rechazadas: None)
+        self.procesadas = 0
+        self.importadas = 0
+        self.rechazadas = 0
+        # Claves en minúsculas: la unicidad de Autor no distingue mayúsculas
+        self.autores = {
+            nombre.casefold(): pk for pk, nombre in Autor.objects.values_list('pk', 'nombre')
+        }
+        self.categorias = {
+            nombre.casefold(): pk for pk, nombre in Categoria.objects.values_list('pk', 'nombre')
+        }
+
+    def importar(self, filas):
+        """
+        Procesa un iterable de ``(numero_fila, datos)`` y devuelve el número
+        de libros importados.
+        """
+        lote = []
+        for fila in filas:
+            lote.append(fila)
+            if len(lote) == self.tamano_lote:
+                self._procesar_lote(lote)
+                lote = []
+        if lote:
+            self._procesar_lote(lote)
+        return self.importadas
+
+    def _procesar_lote(self, lote):
+        validas = []
+        for numero, datos in lote:
+            if datos is None:
+                self._rechazar(numero, datos, {'fila': ['La línea no es un objeto JSON válido.']})
+                continue
+            try:
+                validas.append((numero, datos, self._construir_libro(datos)))
+            except ValidationError as e:
+                self._rechazar(numero, datos, e.message_dict)
+
+        # Unicidad de ISBN: una consulta por lote más los repetidos del lote
+        existentes = set(
+            Libro.objects.filter(isbn__in=[libro.isbn for _, _, libro in validas])
+            .values_list('isbn', flat=True)
+        )
+        libros = []
+        for numero, datos, libro in validas:
+            if libro.isbn in existentes:
+                self._rechazar(numero, datos, {'isbn': ['Ya existe un libro con este ISBN.']})
+                continue
+            existentes.add(libro.isbn)
+            libros.append((numero, datos, libro))
+
+        if libros:
+            try:
+                self._guardar(libros)
+            except IntegrityError as e:
+                if len(libros) == 1:
+                    self._rechazar_guardado(libros[0], e)
+                else:
+                    # Fila a fila: solo se rechazan las que chocan
+                    for fila in libros:
+                        try:
+                            self._guardar([fila])
+                        except IntegrityError as e:
+                            self._rechazar_guardado(fila, e)
+
+        self.procesadas += len(lote)
+        self.al_progresar(self.procesadas, self.importadas, self.rechazadas)
+
+    def _guardar(self, libros):
+        """
+        Inserta ``libros`` (lista de ``(numero_fila, datos, libro)``) en una
+        transacción. Si falla, olvida los autores y categorías creados en
+        ella, que se han revertido.
+        """
+        autores, categorias = dict(self.autores), dict(self.categorias)
+        try:
+            with transaction.atomic():
+                self._resolver_relaciones([(datos, libro) for _, datos, libro in libros])
+                Libro.objects.bulk_create([libro for _, _, libro in libros])
+                # bulk_create no emite post_save: se indexa el lote a mano
+                reconstruir_indice(
+                    Libro.objects.filter(isbn__in=[libro.isbn for _, _, libro in libros]),
+                    tamano_lote=self.tamano_lote
+                )
+                # bulk_create no emite post_save
+                estadisticas.registrar_cambios(
+                    (None, (libro.categoria_id, libro.disponible)) for _, _, libro in libros
+                )
+                cache_respuestas.invalidar(Libro, Autor, Categoria, estadisticas.VISTA_PREVIA)
+        except IntegrityError:
+            self.autores, self.categorias = autores, categorias
+            for _, _, libro in libros:
+                libro.pk = None
+            raise
+        self.importadas += len(libros)
+
+    def _construir_libro(self, datos):
+        autor = _texto(datos, 'autor')
+        if len(autor) < 2:
+            raise ValidationError({'autor': 'El autor es requerido y debe tener al menos 2 caracteres.'})
+        for campo, modelo, nombre_campo in LONGITUDES:
+            maximo = modelo._meta.get_field(nombre_campo).max_length
+            if len(_texto(datos, campo)) > maximo:
+                raise ValidationError({campo: f'No puede superar los {maximo} caracteres.'})
+        try:
+            fecha = date.fromisoformat(_texto(datos, 'fecha_publicacion'))
+        except ValueError:
+            raise ValidationError({'fecha_publicacion': 'La fecha debe tener el formato AAAA-MM-DD.'})
+
+        libro = Libro(
+            titulo=_texto(datos, 'titulo'),
+            isbn=_texto(datos, 'isbn'),
+            fecha_publicacion=fecha,
+            descripcion=_texto(datos, 'descripcion'),
+            paginas=_entero(datos, 'paginas'),
+            calificacion=_entero(datos, 'calificacion'),
+            stock=_entero(datos, 'stock', 1),
+            # Provisional: el id real se asigna en _resolver_relaciones
+            autor_id=self.autores.get(autor.casefold(), 0),
+        )
+        libro.disponible = libro.stock > 0
+        libro.validar_datos()
+        # Validadores de campo (longitudes, rangos), sin las claves foráneas,
+        # que consultarían la base de datos fila a fila
+        libro.clean_fields(exclude=['autor', 'categoria', 'imagen'])
+        return libro
+
+    def _resolver_relaciones(self, libros):
+        """
+        Asigna autor y categoría a cada libro, creando de una vez los que
+        aún no existen.
+        """
+        nuevos_autores = {}
+        nuevas_categorias = {}
+        for datos, _ in libros:
+            autor = _texto(datos, 'autor')
+            if autor.casefold() not in self.autores:
+                nuevos_autores.setdefault(autor.casefold(), Autor(
+                    nombre=autor,
+                    nacionalidad=_texto(datos, 'nacionalidad') or NACIONALIDAD_DESCONOCIDA,
+                ))
+            categoria = _texto(datos, 'categoria')
+            if categoria and categoria.casefold() not in self.categorias:
+                nuevas_categorias.setdefault(categoria.casefold(), Categoria(nombre=categoria))
+
+        # Se vuelven a leer porque MySQL no devuelve las PKs de bulk_create
+        if nuevos_autores:
+            Autor.objects.bulk_create(nuevos_autores.values())
+            nombres = [autor.nombre for autor in nuevos_autores.values()]
+            for pk, nombre in Autor.objects.filter(nombre__in=nombres).values_list('pk', 'nombre'):
+                self.autores[nombre.casefold()] = pk
+        if nuevas_categorias:
+            Categoria.objects.bulk_create(nuevas_categorias.values())
+            nombres = [categoria.nombre for categoria in nuevas_categorias.values()]
+            for pk, nombre in Categoria.objects.filter(nombre__in=nombres).values_list('pk', 'nombre'):
+                self.categorias[nombre.casefold()] = pk
+
+        for datos, libro in libros:
+            libro.autor_id = self.autores[_texto(datos, 'autor').casefold()]
+            categoria = _texto(datos, 'categoria')
+            libro.categoria_id = self.categorias[categoria.casefold()] if categoria else None
+
+    def _rechazar(self, numero, datos, errores):
+        self.rechazadas += 1
+        self.al_rechazar(numero, datos, errores)
+
+    def _rechazar_guardado(self, fila, error):
+        numero, datos, _ = fila
+        self._rechazar(numero, datos, {'fila': [f'No se pudo guardar el libro: {error}']})
+
+
+def _texto(datos, campo):
+    valor = datos.get(campo)
+    return '' if valor is None else str(valor).strip()
+
+
+def _entero(datos, campo, defecto=None):
+    valor = _texto(datos, campo)
+    if not valor:
+        return defecto
+    try:
+        return int(valor)
+    except ValueError:
+        raise ValidationError({campo: 'Debe ser un número entero.'})
@@ -0,0 +1,81 @@
+import random
+import statistics
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from apps.autores.models import Autor
+from apps.libros.models import Categoria, Libro
+from apps.libros.search import buscar_libros, reconstruir_indice
+
+SILABAS = ['ca', 'ción', 'mon', 'ta', 'ña', 'co', 'ra', 'zón', 'ár', 'bol', 'rí', 'o', 'mú', 'si', 'lá', 'gri', 'ma']
+CONSULTAS = ['cancion', 'corazon mon', 'garcia 12', '97800001234', 'arbol rio']
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la búsqueda por índice de texto completo con el filtro icontains anterior. '
+        'Los datos sintéticos se crean en una transacción que se revierte al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--libros', type=int, default=20000, help='Libros sintéticos a generar')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Ejecuciones por consulta')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._poblar(options['libros'])
+            self.stdout.write(f"{'consulta':<22}{'icontains (ms)':>16}{'índice (ms)':>14}")
+            for consulta in CONSULTAS:
+                anterior = self._medir(lambda: self._busqueda_icontains(consulta), options['repeticiones'])
+                indice = self._medir(
+                    lambda: buscar_libros(Libro.objects.all(), consulta), options['repeticiones']
+                )
+                self.stdout.write(f'{consulta:<22}{anterior:>16.2f}{indice:>14.2f}')
+            transaction.set_rollback(True)
+
+    def _poblar(self, total):
+        rnd = random.Random(42)
+        # Vocabulario sintético de miles de palabras con tildes
+        palabras = list({''.join(rnd.choices(SILABAS, k=rnd.randint(2, 4))) for _ in range(8000)})
+        palabras += ['canción', 'corazón', 'árbol', 'río']
+        # Se vuelven a leer porque MySQL no devuelve las PKs de bulk_create
+        Autor.objects.bulk_create(
+            Autor(nombre=f'Gabriel García {i}', nacionalidad='Colombia') for i in range(max(total // 20, 1))
+        )
+        autores = list(Autor.objects.filter(nombre__startswith='Gabriel García '))
+        Categoria.objects.bulk_create(Categoria(nombre=f'Categoría {i}') for i in range(20))
+        categorias = list(Categoria.objects.filter(nombre__startswith='Categoría '))
+        lote = []
+        for i in range(total):
+            lote.append(Libro(
+                titulo=' '.join(rnd.sample(palabras, 3)).capitalize(),
+                autor=rnd.choice(autores),
+                categoria=rnd.choice(categorias),
+                isbn=f'978{i:010d}',
+                fecha_publicacion=date(2000, 1, 1),
+                descripcion=' '.join(rnd.choices(palabras, k=30)),
+            ))
+            if len(lote) == 5000:
+                Libro.objects.bulk_create(lote)
+                lote = []
+        Libro.objects.bulk_create(lote)
+        reconstruir_indice()
+
+    def _busqueda_icontains(self, consulta):
+        return Libro.objects.filter(
+            Q(titulo__icontains=consulta) |
+            Q(autor__nombre__icontains=consulta) |
+            Q(isbn__icontains=consulta)
+        )
+
+    def _medir(self, construir, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            list(construir()[:20])
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos)
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.libros.models import Libro
+
+# Servidor -> (aplicación, argumentos extra de gunicorn, opción con la ruta a medir)
+SERVIDORES = {
+    'wsgi': ('biblioteca.wsgi:application', [], 'ruta_wsgi'),
+    'asgi': ('biblioteca.asgi:application', ['-k', 'uvicorn_worker.UvicornWorker'], 'ruta_asgi'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de carga del catálogo con gunicorn en modo WSGI (workers síncronos) y en modo ASGI '
+        '(workers de uvicorn) con el mismo número de workers, y compara rendimiento, latencias y '
+        'memoria. Usa la base de datos configurada, que debe tener libros y ser accesible desde '
+        'otros procesos (p. ej. TESTING=true tras migrate e importar_catalogo). Con --lento cada '
+        'cliente tarda ese tiempo en enviar su petición, como un cliente móvil lento.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Workers de cada servidor')
+        parser.add_argument('--concurrencia', type=int, default=50, help='Clientes simultáneos')
+        parser.add_argument('--peticiones', type=int, default=1000, help='Peticiones medidas por servidor')
+        parser.add_argument('--lento', type=float, default=0.0, help='Segundos que tarda cada cliente en enviar la petición')
+        parser.add_argument('--ruta-wsgi', default='/api/libros/', help='Ruta medida en el servidor WSGI')
+        parser.add_argument('--ruta-asgi', default='/api/async/libros/', help='Ruta medida en el servidor ASGI')
+
+    def handle(self, *args, **options):
+        if not Libro.objects.exists():
+            raise CommandError('No hay libros en la base de datos configurada; carga antes un catálogo.')
+
+        self.stdout.write(
+            f'{"servidor":<10}{"pet/s":>9}{"p50 (ms)":>10}{"p95 (ms)":>10}{"p99 (ms)":>10}'
+            f'{"máx (ms)":>10}{"errores":>9}{"memoria (MB)":>14}'
+        )
+        for nombre, (aplicacion, argumentos, opcion_ruta) in SERVIDORES.items():
+            resultado = self._medir_servidor(aplicacion, argumentos, options[opcion_ruta], options)
+            latencias = sorted(resultado['latencias'])
+            percentil = statistics.quantiles(latencias, n=100) if len(latencias) > 1 else latencias * 99
+            self.stdout.write(
+                f'{nombre:<10}{resultado["por_segundo"]:>9.1f}{percentil[49] * 1000:>10.1f}'
+                f'{percentil[94] * 1000:>10.1f}{percentil[98] * 1000:>10.1f}{latencias[-1] * 1000:>10.1f}'
+                f'{resultado["errores"]:>9}{resultado["memoria"]:>14.1f}'
+            )
+
+    def _medir_servidor(self, aplicacion, argumentos, ruta, options):
+        puerto = _puerto_libre()
+        with tempfile.TemporaryDirectory() as directorio:
+            entorno = {
+                **os.environ,
+                # La prueba no debe toparse con las cuotas de la API
+                'THROTTLE_ANON': '100000000/day',
+                'THROTTLE_USER': '100000000/day',
+                'THROTTLE_DB_PATH': os.path.join(directorio, 'throttle.sqlite3'),
+                'CACHE_DIR': os.path.join(directorio, 'cache'),
+            }
+            servidor = subprocess.Popen(
+                [
+                    sys.executable, '-m', 'gunicorn', aplicacion, *argumentos,
+                    '--workers', str(options['workers']), '--bind', f'127.0.0.1:{puerto}',
+                    '--log-level', 'warning',
+                ],
+                env=entorno,
+            )
+            try:
+                asyncio.run(self._esperar(puerto, ruta, servidor))
+                asyncio.run(_carga(puerto, ruta, options['concurrencia'], options['concurrencia'], 0))
+                inicio = time.perf_counter()
+                latencias, errores = asyncio.run(
+                    _carga(puerto, ruta, options['concurrencia'], options['peticiones'], options['lento'])
+                )
+                duracion = time.perf_counter() - inicio
+                memoria = _memoria_mb(servidor.pid)
+            finally:
+                servidor.send_signal(signal.SIGTERM)
+                servidor.wait(timeout=30)
+        return {
+            'latencias': latencias, 'errores': errores,
+            'por_segundo': len(latencias) / duracion, 'memoria': memoria,
+        }
+
+    async def _esperar(self, puerto, ruta, servidor, limite=30):
+        fin = time.monotonic() + limite
+        while time.monotonic() < fin:
+            if servidor.poll() is not None:
+                raise CommandError('El servidor terminó al arrancar.')
+            try:
+                if await _peticion(puerto, ruta, 0) == 200:
+                    return
+            except OSError:
+                pass
+            await asyncio.sleep(0.2)
+        raise CommandError(f'El servidor no respondió 200 en {ruta} tras {limite} s.')
+
+
+async def _peticion(puerto, ruta, lento):
+    """Hace un GET y devuelve el código de estado; con ``lento``, envía la petición en dos partes."""
+    lector, escritor = await asyncio.open_connection('127.0.0.1', puerto)
+    try:
+        escritor.write(f'GET {ruta} HTTP/1.1\r\n'.encode())
+        if lento:
+            await escritor.drain()
+            await asyncio.sleep(lento)
+        escritor.write(b'Host: localhost\r\nAccept: application/json\r\nConnection: close\r\n\r\n')
+        await escritor.drain()
+        respuesta = await lector.read()
+    finally:
+        escritor.close()
+    return int(respuesta.split(b' ', 2)[1]) if respuesta else 0
+
+
+async def _carga(puerto, ruta, concurrencia, total, lento):
+    """Lanza ``total`` peticiones con ``concurrencia`` clientes. Devuelve latencias y errores."""
+    latencias, errores = [], 0
+    pendientes = iter(range(total))
+
+    async def cliente():
+        nonlocal errores
+        for _ in pendientes:
+            inicio = time.perf_counter()
+            try:
+                codigo = await _peticion(puerto, ruta, lento)
+            except OSError:
+                codigo = 0
+            if codigo == 200:
+                latencias.append(time.perf_counter() - inicio)
+            else:
+                errores += 1
+
+    await asyncio.gather(*(cliente() for _ in range(concurrencia)))
+    return latencias, errores
+
+
+def _puerto_libre():
+    with socket.socket() as conexion:
+        conexion.bind(('127.0.0.1', 0))
+        return conexion.getsockname()[1]
+
+
+def _procesos(pid):
+    """El proceso ``pid`` y todos sus descendientes (Linux)."""
+    procesos = [pid]
+    for actual in procesos:
+        try:
+            with open(f'/proc/{actual}/task/{actual}/children') as archivo:
+                procesos.extend(int(hijo) for hijo in archivo.read().split())
+        except OSError:
+            pass
+    return procesos
+
+
+def _memoria_mb(pid):
+    """Memoria residente (VmRSS) del servidor y sus workers, en MB; 0 si no hay /proc."""
+    total = 0
+    for proceso in _procesos(pid):
+        try:
+            with open(f'/proc/{proceso}/status') as archivo:
+                for linea in archivo:
+                    if linea.startswith('VmRSS:'):
+                        total += int(linea.split()[1])
+        except OSError:
+            pass
+    return total / 1024
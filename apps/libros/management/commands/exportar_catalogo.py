@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.exportacion import FORMATOS, filtrar, generar_exportacion
+from apps.libros.filters import LibroFilter
+from apps.libros.models import Libro
+from apps.libros.search import filtrar_libros
+from apps.libros.serializers import CAMPOS_EXPORTACION
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta el catálogo en streaming a CSV o NDJSON. Admite los mismos filtros que '
+        '/api/libros/ (disponible, categoria, autor) y la búsqueda de texto (search).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=FORMATOS, default='csv')
+        parser.add_argument('--salida', help='Fichero de salida (por defecto, la salida estándar)')
+        parser.add_argument(
+            '--filtro', action='append', default=[], metavar='CAMPO=VALOR',
+            help='Filtro del listado de la API; se puede repetir (p. ej. --filtro disponible=true)'
+        )
+
+    def handle(self, *args, **options):
+        if any('=' not in filtro for filtro in options['filtro']):
+            raise CommandError('Los filtros deben tener la forma CAMPO=VALOR.')
+        parametros = dict(filtro.split('=', 1) for filtro in options['filtro'])
+        texto = parametros.pop('search', '')
+        try:
+            libros = filtrar(LibroFilter, Libro.objects.all(), parametros)
+        except ValueError as e:
+            raise CommandError(f'Filtros no válidos: {e}')
+        libros = filtrar_libros(libros, texto)
+
+        fragmentos = generar_exportacion(libros, CAMPOS_EXPORTACION, options['formato'])
+        if not options['salida']:
+            for fragmento in fragmentos:
+                self.stdout.write(fragmento, ending='')
+            return
+        with open(options['salida'], 'w', encoding='utf-8', newline='') as salida:
+            for fragmento in fragmentos:
+                salida.write(fragmento)
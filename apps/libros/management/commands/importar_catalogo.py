@@ -0,0 +1,57 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.libros.importacion import FORMATOS, ImportadorCatalogo, leer_filas
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa libros desde un fichero CSV (con cabecera) o NDJSON, por lotes y sin cargarlo en memoria. '
+        'Columnas: titulo, autor, isbn, fecha_publicacion y, opcionalmente, categoria, descripcion, '
+        'paginas, calificacion, stock y nacionalidad.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del fichero a importar')
+        parser.add_argument('--formato', choices=FORMATOS, help='Por defecto se deduce de la extensión')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por lote y por transacción')
+        parser.add_argument(
+            '--rechazados',
+            help='Fichero NDJSON donde guardar las filas rechazadas (por defecto se muestran en stderr)'
+        )
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('El tamaño de lote debe ser positivo.')
+
+        salida_rechazados = open(options['rechazados'], 'w', encoding='utf-8') if options['rechazados'] else None
+
+        def al_rechazar(numero, datos, errores):
+            registro = json.dumps({'fila': numero, 'errores': errores, 'datos': datos}, ensure_ascii=False)
+            if salida_rechazados:
+                salida_rechazados.write(registro + '\n')
+            else:
+                self.stderr.write(registro)
+
+        def al_progresar(procesadas, importadas, rechazadas):
+            self.stdout.write(f'{procesadas} filas procesadas: {importadas} importadas, {rechazadas} rechazadas')
+
+        try:
+            importador = ImportadorCatalogo(options['lote'], al_rechazar, al_progresar)
+            importador.importar(leer_filas(options['archivo'], options['formato']))
+        except OSError as e:
+            raise CommandError(f'No se pudo leer el fichero: {e}')
+        except UnicodeDecodeError as e:
+            # Los lotes anteriores al error ya están importados
+            raise CommandError(f'El fichero no está codificado en UTF-8: {e}')
+        finally:
+            if salida_rechazados:
+                salida_rechazados.close()
+
+        estilo = self.style.SUCCESS if not importador.rechazadas else self.style.WARNING
+        self.stdout.write(estilo(
+            f'Importación terminada: {importador.importadas} libros importados, '
+            f'{importador.rechazadas} filas rechazadas.'
+        ))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.common import imagenes
+
+
+class Command(BaseCommand):
+    help = (
+        'Sube al destino configurado las imágenes pendientes de libros, categorías y avatares. '
+        'Con --continuo se queda esperando imágenes nuevas (worker en segundo plano).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--continuo', action='store_true',
+            help='Repite el proceso indefinidamente cada --intervalo segundos'
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=5,
+            help='Segundos de espera entre pasadas en modo continuo (por defecto, 5)'
+        )
+        parser.add_argument(
+            '--reintentar', action='store_true',
+            help='Vuelve a intentar también las imágenes cuya subida falló'
+        )
+        parser.add_argument(
+            '--limite', type=int, default=None,
+            help='Máximo de imágenes por modelo en cada pasada'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            resultado = imagenes.procesar_pendientes(options['reintentar'], options['limite'])
+            if resultado['subidas'] or resultado['fallidas'] or not options['continuo']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{resultado['subidas']} imágenes subidas, {resultado['fallidas']} fallidas."
+                ))
+            if not options['continuo']:
+                return
+            time.sleep(options['intervalo'])
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.common import cache_respuestas
+from apps.libros.estadisticas import VISTA_PREVIA, contar_catalogo
+from apps.libros.models import ContadorCatalogo, Libro
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los contadores del catálogo del panel de inicio a partir de Libro.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Solo informa de las diferencias, sin corregirlas'
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        reales = contar_catalogo()
+
+        corregidos = []
+        for contador in ContadorCatalogo.objects.select_for_update().iterator():
+            libros, disponibles = reales.pop(contador.categoria, (0, 0))
+            if (contador.libros, contador.disponibles) != (libros, disponibles):
+                self.stdout.write(
+                    f'Categoría {contador.categoria}: {contador.disponibles}/{contador.libros} '
+                    f'-> {disponibles}/{libros}'
+                )
+                contador.libros, contador.disponibles = libros, disponibles
+                corregidos.append(contador)
+        nuevos = [
+            ContadorCatalogo(categoria=categoria, libros=libros, disponibles=disponibles)
+            for categoria, (libros, disponibles) in reales.items()
+        ]
+        for contador in nuevos:
+            self.stdout.write(
+                f'Categoría {contador.categoria}: sin contador -> {contador.disponibles}/{contador.libros}'
+            )
+
+        if options['dry_run']:
+            transaction.set_rollback(True)
+            self.stdout.write(f'{len(corregidos) + len(nuevos)} contadores con diferencias (sin cambios).')
+            return
+
+        ContadorCatalogo.objects.bulk_update(corregidos, ['libros', 'disponibles'], batch_size=1000)
+        ContadorCatalogo.objects.bulk_create(nuevos, batch_size=1000)
+        if corregidos or nuevos:
+            # El panel cacheado y su vista previa salen de estos contadores
+            cache_respuestas.invalidar(Libro, VISTA_PREVIA)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(corregidos)} contadores corregidos, {len(nuevos)} creados.'
+        ))
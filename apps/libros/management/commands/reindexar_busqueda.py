@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from apps.libros.search import instalar_indice, reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de texto completo del catálogo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Libros procesados por lote')
+        parser.add_argument('--database', default='default', help='Alias de la base de datos')
+
+    def handle(self, *args, **options):
+        instalar_indice(options['database'])
+        total = reconstruir_indice(tamano_lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'{total} libros indexados.'))
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def poblar_indice(apps, schema_editor):
+    from apps.libros.search import normalizar
+
+    Libro = apps.get_model('libros', 'Libro')
+    IndiceBusquedaLibro = apps.get_model('libros', 'IndiceBusquedaLibro')
+    alias = schema_editor.connection.alias
+    libros = Libro.objects.using(alias).select_related('autor', 'categoria')
+    lote = []
+    for libro in libros.iterator(chunk_size=1000):
+        lote.append(IndiceBusquedaLibro(
+            libro_id=libro.pk,
+            titulo=normalizar(libro.titulo),
+            autor=normalizar(libro.autor.nombre),
+            categoria=normalizar(libro.categoria.nombre) if libro.categoria_id else '',
+            descripcion=normalizar(libro.descripcion),
+            isbn=libro.isbn,
+        ))
+        if len(lote) == 1000:
+            IndiceBusquedaLibro.objects.using(alias).bulk_create(lote)
+            lote = []
+    IndiceBusquedaLibro.objects.using(alias).bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('libros', '0005_categoria_imagen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndiceBusquedaLibro',
+            fields=[
+                ('libro', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='indice_busqueda', serialize=False, to='libros.libro')),
+                ('titulo', models.CharField(max_length=200)),
+                ('autor', models.CharField(max_length=100)),
+                ('categoria', models.CharField(blank=True, max_length=100)),
+                ('descripcion', models.TextField(blank=True)),
+                ('isbn', models.CharField(max_length=13)),
+            ],
+            options={
+                'verbose_name': 'Índice de búsqueda',
+                'verbose_name_plural': 'Índice de búsqueda',
+            },
+        ),
+        migrations.RunPython(poblar_indice, migrations.RunPython.noop),
+    ]
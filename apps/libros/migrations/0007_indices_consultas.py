@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autores', '0003_indices_consultas'),
+        ('libros', '0006_indicebusquedalibro'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='libro',
+            index=models.Index(fields=['titulo'], name='libro_titulo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='libro',
+            index=models.Index(fields=['-fecha_publicacion'], name='libro_fecha_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='libro',
+            index=models.Index(fields=['disponible', 'titulo'], name='libro_disponible_titulo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='libro',
+            index=models.Index(fields=['categoria', 'titulo'], name='libro_categoria_titulo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='libro',
+            index=models.Index(fields=['autor', 'titulo'], name='libro_autor_titulo_idx'),
+        ),
+    ]
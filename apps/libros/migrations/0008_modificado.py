@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('libros', '0007_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='modificado',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='libro',
+            name='modificado',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
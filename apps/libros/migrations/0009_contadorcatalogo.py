@@ -0,0 +1,46 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:10
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def poblar_contadores(apps, schema_editor):
+    Libro = apps.get_model('libros', 'Libro')
+    ContadorCatalogo = apps.get_model('libros', 'ContadorCatalogo')
+    alias = schema_editor.connection.alias
+    filas = (
+        Libro.objects.using(alias)
+        .values(clave=Coalesce('categoria_id', 0))
+        .annotate(total=models.Count('id'), disponibles=models.Count('id', filter=models.Q(disponible=True)))
+        .order_by()
+    )
+    ContadorCatalogo.objects.using(alias).bulk_create(
+        [
+            ContadorCatalogo(categoria=fila['clave'], libros=fila['total'], disponibles=fila['disponibles'])
+            for fila in filas
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('libros', '0008_modificado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorCatalogo',
+            fields=[
+                ('categoria', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('libros', models.PositiveIntegerField(default=0)),
+                ('disponibles', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contador del catálogo',
+                'verbose_name_plural': 'Contadores del catálogo',
+            },
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
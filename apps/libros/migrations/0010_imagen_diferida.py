@@ -0,0 +1,59 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:01
+
+from django.db import migrations, models
+
+
+def marcar_imagenes_subidas(apps, schema_editor):
+    """Las imágenes ya subidas quedan listas, con su URL si se puede calcular."""
+    alias = schema_editor.connection.alias
+    for nombre in ('Categoria', 'Libro'):
+        modelo = apps.get_model('libros', nombre)
+        con_imagen = modelo.objects.using(alias).exclude(imagen__isnull=True).exclude(imagen='')
+        for instancia in con_imagen.iterator():
+            try:
+                url = instancia.imagen.url
+            except Exception:
+                # Sin credenciales de Cloudinary: las plantillas usan el campo
+                url = ''
+            modelo.objects.using(alias).filter(pk=instancia.pk).update(imagen_estado='lista', imagen_url=url)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('libros', '0009_contadorcatalogo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='imagen_estado',
+            field=models.CharField(blank=True, choices=[('pendiente', 'Pendiente'), ('lista', 'Lista'), ('fallida', 'Fallida')], max_length=10),
+        ),
+        migrations.AddField(
+            model_name='categoria',
+            name='imagen_pendiente',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='categoria',
+            name='imagen_url',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='libro',
+            name='imagen_estado',
+            field=models.CharField(blank=True, choices=[('pendiente', 'Pendiente'), ('lista', 'Lista'), ('fallida', 'Fallida')], max_length=10),
+        ),
+        migrations.AddField(
+            model_name='libro',
+            name='imagen_pendiente',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='libro',
+            name='imagen_url',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.RunPython(marcar_imagenes_subidas, migrations.RunPython.noop),
+    ]
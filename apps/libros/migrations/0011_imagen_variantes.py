@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('libros', '0010_imagen_diferida'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='imagen_variantes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='libro',
+            name='imagen_variantes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
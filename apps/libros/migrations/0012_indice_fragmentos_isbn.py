@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+def indexar_fragmentos_isbn(apps, schema_editor):
+    from apps.libros.search import fragmentos_isbn, instalar_indice
+
+    IndiceBusquedaLibro = apps.get_model('libros', 'IndiceBusquedaLibro')
+    alias = schema_editor.connection.alias
+    documentos = IndiceBusquedaLibro.objects.using(alias).select_related('libro').only('libro__isbn', 'isbn')
+    lote = []
+    for documento in documentos.iterator(chunk_size=1000):
+        documento.isbn = fragmentos_isbn(documento.libro.isbn)
+        lote.append(documento)
+        if len(lote) == 1000:
+            IndiceBusquedaLibro.objects.using(alias).bulk_update(lote, ['isbn'])
+            lote = []
+    IndiceBusquedaLibro.objects.using(alias).bulk_update(lote, ['isbn'])
+    # En SQLite AlterField rehace la tabla y con ella los triggers de FTS5
+    instalar_indice(alias, reconstruir=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('libros', '0011_imagen_variantes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='indicebusquedalibro',
+            name='isbn',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.RunPython(indexar_fragmentos_isbn, migrations.RunPython.noop),
+    ]
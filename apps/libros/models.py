@@ -4,6 +4,7 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from cloudinary.models import CloudinaryField
+from apps.common import imagenes
 
 # Create your models here.
 
@@ -17,6 +18,13 @@ class Categoria(models.Model):
         null=True,
         blank=True
     )
+    # Subida en segundo plano (apps.common.imagenes)
+    imagen_estado = models.CharField(max_length=10, choices=imagenes.ESTADOS, blank=True)
+    imagen_pendiente = models.CharField(max_length=255, blank=True)
+    imagen_url = models.CharField(max_length=500, blank=True)
+    imagen_variantes = models.JSONField(default=dict, blank=True)
+    # Versión para ETag / Last-Modified de la API
+    modificado = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['nombre']
@@ -40,6 +48,11 @@ class Libro(models.Model):
         null=True,
         blank=True
     )
+    # Subida en segundo plano (apps.common.imagenes)
+    imagen_estado = models.CharField(max_length=10, choices=imagenes.ESTADOS, blank=True)
+    imagen_pendiente = models.CharField(max_length=255, blank=True)
+    imagen_url = models.CharField(max_length=500, blank=True)
+    imagen_variantes = models.JSONField(default=dict, blank=True)
     descripcion = models.TextField(blank=True)
     paginas = models.PositiveIntegerField(validators=[MinValueValidator(1)], null=True, blank=True)
     calificacion = models.PositiveIntegerField(
@@ -48,32 +61,52 @@ class Libro(models.Model):
         blank=True
     )
     stock = models.PositiveIntegerField(default=1, validators=[MinValueValidator(0)])
+    # Versión para ETag / Last-Modified de la API. auto_now no actúa en
+    # update() ni bulk_update(): quien los use debe fijarlo también
+    modificado = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['titulo']
         verbose_name = 'Libro'
         verbose_name_plural = 'Libros'
+        indexes = [
+            # Orden por defecto y paginación por clave (titulo, id)
+            models.Index(fields=['titulo'], name='libro_titulo_idx'),
+            # Listados más recientes primero (?ordering=-fecha_publicacion)
+            models.Index(fields=['-fecha_publicacion'], name='libro_fecha_pub_idx'),
+            # Filtros de LibroViewSet combinados con el orden por título
+            models.Index(fields=['disponible', 'titulo'], name='libro_disponible_titulo_idx'),
+            models.Index(fields=['categoria', 'titulo'], name='libro_categoria_titulo_idx'),
+            models.Index(fields=['autor', 'titulo'], name='libro_autor_titulo_idx'),
+        ]
 
     def __str__(self):
         return self.titulo
 
     def clean(self):
+        self.validar_datos()
+        # Unicidad de ISBN
+        if Libro.objects.exclude(pk=self.pk).filter(isbn=self.isbn).exists():
+            raise ValidationError({'isbn': 'Ya existe un libro con este ISBN.'})
+
+    def validar_datos(self):
+        """
+        Reglas de negocio que no consultan la base de datos; la importación
+        masiva las aplica fila a fila y comprueba la unicidad por lotes.
+        """
         # Título requerido
         if not self.titulo or len(self.titulo) < 2:
             raise ValidationError({'titulo': 'El título es requerido y debe tener al menos 2 caracteres.'})
         # ISBN requerido y longitud
         if not self.isbn or len(self.isbn) != 13 or not self.isbn.isdigit():
             raise ValidationError({'isbn': 'El ISBN debe tener 13 dígitos numéricos.'})
-        # Unicidad de ISBN
-        if Libro.objects.exclude(pk=self.pk).filter(isbn=self.isbn).exists():
-            raise ValidationError({'isbn': 'Ya existe un libro con este ISBN.'})
         # Fecha de publicación requerida y no futura
         if not self.fecha_publicacion:
             raise ValidationError({'fecha_publicacion': 'La fecha de publicación es requerida.'})
         if self.fecha_publicacion > timezone.now().date():
             raise ValidationError({'fecha_publicacion': 'La fecha de publicación no puede ser futura.'})
         # Autor requerido
-        if not self.autor:
+        if self.autor_id is None:
             raise ValidationError({'autor': 'El autor es requerido.'})
         # Stock no puede ser negativo
         if self.stock < 0:
@@ -81,4 +114,56 @@ class Libro(models.Model):
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class IndiceBusquedaLibro(models.Model):
+    """
+    Documento de búsqueda desnormalizado de un libro.
+
+    Guarda el texto ya tokenizable (minúsculas y sin tildes) de los campos
+    buscables. Sobre esta tabla se monta el índice FULLTEXT (MySQL) o la
+    tabla virtual FTS5 (SQLite); ver ``apps.libros.search``.
+    """
+    libro = models.OneToOneField(
+        Libro,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='indice_busqueda'
+    )
+    titulo = models.CharField(max_length=200)
+    autor = models.CharField(max_length=100)
+    categoria = models.CharField(max_length=100, blank=True)
+    descripcion = models.TextField(blank=True)
+    # El ISBN y sus sufijos, para buscar fragmentos (search.fragmentos_isbn)
+    isbn = models.CharField(max_length=100)
+
+    class Meta:
+        verbose_name = 'Índice de búsqueda'
+        verbose_name_plural = 'Índice de búsqueda'
+
+    def __str__(self):
+        return self.titulo
+
+
+class ContadorCatalogo(models.Model):
+    """
+    Número de libros y de libros disponibles de cada categoría (la fila
+    ``SIN_CATEGORIA`` agrupa los libros sin categoría), mantenido de forma
+    incremental por ``apps.libros.estadisticas``.
+
+    Los totales del catálogo son la suma de esta tabla, que tiene una fila
+    por categoría, de modo que el panel de inicio nunca cuenta ``Libro``. Se
+    puede reconstruir con ``manage.py reconciliar_estadisticas``.
+    """
+    SIN_CATEGORIA = 0
+
+    categoria = models.PositiveIntegerField(primary_key=True)
+    libros = models.PositiveIntegerField(default=0)
+    disponibles = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Contador del catálogo'
+        verbose_name_plural = 'Contadores del catálogo'
+
+    def __str__(self):
+        return f'Categoría {self.categoria}: {self.disponibles}/{self.libros}'
@@ -0,0 +1,342 @@
+"""
+Búsqueda de texto completo sobre el catálogo de libros.
+
+El texto buscable de cada libro (título, autor, categoría, descripción e ISBN)
+se guarda normalizado en ``IndiceBusquedaLibro``: en minúsculas y sin tildes,
+de modo que "García" y "garcia" producen el mismo token. Sobre esa tabla se
+monta el índice invertido del motor configurado:
+
+- SQLite: tabla virtual FTS5 con contenido externo y triggers de sincronización.
+- MySQL: índices FULLTEXT (InnoDB) sobre las columnas del documento.
+
+Cualquier otro motor usa un filtro ``contains`` sobre el documento normalizado.
+
+El índice solo encuentra prefijos. Para que un fragmento del medio del ISBN
+también se encuentre, la columna ``isbn`` del documento guarda el ISBN y
+todos sus sufijos de al menos ``MIN_FRAGMENTO_ISBN`` dígitos: cualquier
+fragmento de esa longitud es prefijo de alguno. Los guiones entre dígitos
+de la consulta se ignoran ("978-0-307" busca "9780307").
+"""
+import re
+import unicodedata
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import IndiceBusquedaLibro, Libro
+
+# Peso de cada columna del documento en el cálculo de relevancia
+PESOS = {
+    'titulo': 10.0,
+    'autor': 5.0,
+    'categoria': 2.0,
+    'descripcion': 1.0,
+    'isbn': 8.0,
+}
+COLUMNAS = tuple(PESOS)
+
+# Máximo de resultados devueltos por una búsqueda, ya ordenados por relevancia.
+# La API lo anuncia en la cabecera X-Limite-Resultados de las búsquedas.
+LIMITE_RESULTADOS = 1000
+
+# Longitud mínima de los fragmentos de ISBN que se encuentran en cualquier posición
+MIN_FRAGMENTO_ISBN = 4
+
+# Campos de Libro cuyo cambio obliga a regenerar su documento
+CAMPOS_INDEXADOS = frozenset({'titulo', 'autor', 'categoria', 'descripcion', 'isbn'})
+
+_TOKEN_RE = re.compile(r'\w+')
+_GUION_ENTRE_DIGITOS_RE = re.compile(r'(?<=\d)-(?=\d)')
+
+
+def _tabla_fts():
+    return f'{IndiceBusquedaLibro._meta.db_table}_fts'
+
+
+def normalizar(texto):
+    """
+    Pasa el texto a minúsculas y elimina tildes y diacríticos.
+    """
+    if not texto:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', str(texto))
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def tokenizar(texto):
+    return _TOKEN_RE.findall(_GUION_ENTRE_DIGITOS_RE.sub('', normalizar(texto)))
+
+
+def fragmentos_isbn(isbn):
+    """
+    Texto indexado de un ISBN: el ISBN y sus sufijos de al menos
+    ``MIN_FRAGMENTO_ISBN`` dígitos.
+    """
+    return ' '.join(isbn[inicio:] for inicio in range(max(len(isbn) - MIN_FRAGMENTO_ISBN + 1, 1)))
+
+
+def documento_para(libro):
+    """
+    Construye (sin guardar) el documento de búsqueda de un libro.
+    """
+    return IndiceBusquedaLibro(
+        libro_id=libro.pk,
+        titulo=normalizar(libro.titulo),
+        autor=normalizar(libro.autor.nombre),
+        categoria=normalizar(libro.categoria.nombre) if libro.categoria_id else '',
+        descripcion=normalizar(libro.descripcion),
+        isbn=fragmentos_isbn(libro.isbn),
+    )
+
+
+def indexar_libro(libro):
+    """
+    Crea o actualiza el documento de búsqueda de un libro.
+    """
+    documento = documento_para(libro)
+    IndiceBusquedaLibro.objects.update_or_create(
+        libro_id=libro.pk,
+        defaults={columna: getattr(documento, columna) for columna in COLUMNAS},
+    )
+
+
+def reindexar_autor(autor):
+    """
+    Propaga el nombre de un autor a los documentos de todos sus libros.
+    """
+    return IndiceBusquedaLibro.objects.filter(libro__autor=autor).update(
+        autor=normalizar(autor.nombre)
+    )
+
+
+def reindexar_categoria(categoria, nombre=None):
+    """
+    Propaga el nombre de una categoría a los documentos de sus libros.
+    """
+    if nombre is None:
+        nombre = categoria.nombre
+    return IndiceBusquedaLibro.objects.filter(libro__categoria=categoria).update(
+        categoria=normalizar(nombre)
+    )
+
+
+def reconstruir_indice(libros=None, tamano_lote=1000):
+    """
+    Regenera los documentos de búsqueda por lotes.
+
+    Args:
+        libros: QuerySet de libros a indexar (por defecto, todo el catálogo)
+        tamano_lote: Número de libros procesados por lote
+
+    Returns:
+        Número de documentos escritos
+    """
+    if libros is None:
+        libros = Libro.objects.all()
+    libros = (
+        libros.select_related('autor', 'categoria')
+        .only('id', 'titulo', 'descripcion', 'isbn', 'autor__nombre', 'categoria__nombre')
+        .order_by('pk')
+    )
+
+    total = 0
+    ultimo_pk = 0
+    while True:
+        lote = list(libros.filter(pk__gt=ultimo_pk)[:tamano_lote])
+        if not lote:
+            break
+        ids = [libro.pk for libro in lote]
+        IndiceBusquedaLibro.objects.filter(libro_id__in=ids).delete()
+        IndiceBusquedaLibro.objects.bulk_create([documento_para(libro) for libro in lote])
+        total += len(lote)
+        ultimo_pk = ids[-1]
+    return total
+
+
+def instalar_indice(using='default', reconstruir=False):
+    """
+    Crea, si no existen, las estructuras de texto completo del motor.
+
+    Es idempotente: se ejecuta en cada ``post_migrate``. Con ``reconstruir``
+    la tabla FTS5 se regenera desde los documentos (tras escribirlos sin
+    triggers, p. ej. en una migración que rehace la tabla).
+    """
+    connection = connections[using]
+    tabla = IndiceBusquedaLibro._meta.db_table
+    if tabla not in connection.introspection.table_names():
+        return
+
+    if connection.vendor == 'sqlite':
+        _instalar_fts5(connection, tabla, reconstruir)
+    elif connection.vendor == 'mysql':
+        _instalar_fulltext(connection, tabla)
+
+
+def _instalar_fts5(connection, tabla, reconstruir=False):
+    fts = _tabla_fts()
+    columnas = ', '.join(COLUMNAS)
+    nuevas = ', '.join(f'new.{c}' for c in COLUMNAS)
+    viejas = ', '.join(f'old.{c}' for c in COLUMNAS)
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [fts])
+        existia = cursor.fetchone() is not None
+
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{columnas}, content='{tabla}', content_rowid='libro_id', "
+            f"tokenize='unicode61 remove_diacritics 2')"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabla} BEGIN "
+            f"INSERT INTO {fts}(rowid, {columnas}) VALUES (new.libro_id, {nuevas}); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabla} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {columnas}) VALUES ('delete', old.libro_id, {viejas}); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {tabla} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {columnas}) VALUES ('delete', old.libro_id, {viejas}); "
+            f"INSERT INTO {fts}(rowid, {columnas}) VALUES (new.libro_id, {nuevas}); END"
+        )
+        if reconstruir or not existia:
+            # La tabla de contenido puede tener filas previas a la tabla virtual
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _instalar_fulltext(connection, tabla):
+    indices = {
+        f'{tabla}_ft': COLUMNAS,
+        f'{tabla}_titulo_ft': ('titulo',),
+    }
+    with connection.cursor() as cursor:
+        existentes = connection.introspection.get_constraints(cursor, tabla)
+        for nombre, columnas in indices.items():
+            if nombre not in existentes:
+                cursor.execute(
+                    f"ALTER TABLE {tabla} ADD FULLTEXT INDEX {nombre} ({', '.join(columnas)})"
+                )
+
+
+def _consulta(connection, tokens):
+    # Cada palabra como prefijo y todas obligatorias
+    if connection.vendor == 'sqlite':
+        return ' '.join(f'"{token}"*' for token in tokens)
+    return ' '.join(f'+{token}*' for token in tokens)
+
+
+def _filtro_contains(queryset, tokens):
+    # Motores sin índice de texto completo
+    for token in tokens:
+        condicion = Q()
+        for columna in COLUMNAS:
+            condicion |= Q(**{f'indice_busqueda__{columna}__contains': token})
+        queryset = queryset.filter(condicion)
+    return queryset
+
+
+def _ranking(connection, tokens, candidatos):
+    """
+    Ejecuta la consulta de texto completo y devuelve ``[(libro_id, puntuacion)]``
+    ordenado de mayor a menor relevancia, como mucho ``LIMITE_RESULTADOS``.
+
+    ``candidatos`` es un par ``(sql, params)`` con los ids a los que restringir
+    la búsqueda, o ``None`` para buscar en todo el catálogo.
+    """
+    def restriccion(columna_id):
+        if candidatos is None:
+            return '', []
+        sql, params = candidatos
+        return f' AND {columna_id} IN ({sql})', list(params)
+
+    consulta = _consulta(connection, tokens)
+    if connection.vendor == 'sqlite':
+        fts = _tabla_fts()
+        pesos = ', '.join(str(PESOS[c]) for c in COLUMNAS)
+        filtro, params_filtro = restriccion('rowid')
+        sql = (
+            f'SELECT rowid, -bm25({fts}, {pesos}) AS puntuacion FROM {fts} '
+            f'WHERE {fts} MATCH %s{filtro} '
+            f'ORDER BY puntuacion DESC LIMIT {LIMITE_RESULTADOS}'
+        )
+        params = [consulta, *params_filtro]
+    else:
+        tabla = IndiceBusquedaLibro._meta.db_table
+        columnas = ', '.join(COLUMNAS)
+        filtro, params_filtro = restriccion('libro_id')
+        sql = (
+            f'SELECT libro_id, {PESOS["titulo"]} * MATCH(titulo) AGAINST (%s IN BOOLEAN MODE) '
+            f'+ MATCH({columnas}) AGAINST (%s IN BOOLEAN MODE) AS puntuacion FROM {tabla} '
+            f'WHERE MATCH({columnas}) AGAINST (%s IN BOOLEAN MODE){filtro} '
+            f'ORDER BY puntuacion DESC LIMIT {LIMITE_RESULTADOS}'
+        )
+        params = [consulta, consulta, consulta, *params_filtro]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def buscar_libros(queryset, texto):
+    """
+    Filtra un QuerySet de libros por texto y lo ordena por relevancia.
+
+    Cada palabra de la consulta se trata como prefijo y todas deben aparecer
+    en el documento del libro; los fragmentos de ISBN de al menos
+    ``MIN_FRAGMENTO_ISBN`` dígitos se encuentran en cualquier posición. El índice se consulta una sola vez, restringido
+    a los libros del QuerySet recibido, y se conservan los ``LIMITE_RESULTADOS``
+    más relevantes. El QuerySet devuelto queda anotado con ``relevancia``
+    (mayor es mejor) y admite más filtros, ordenación y paginación.
+    """
+    tokens = tokenizar(texto)
+    if not tokens:
+        return queryset
+
+    connection = connections[queryset.db]
+    if connection.vendor not in ('sqlite', 'mysql'):
+        return _filtro_contains(queryset, tokens).annotate(
+            relevancia=Value(0.0, output_field=FloatField())
+        ).order_by('-relevancia', *Libro._meta.ordering)
+
+    candidatos = None
+    if queryset.query.where:
+        candidatos = queryset.order_by().values('pk').query.get_compiler(queryset.db).as_sql()
+    ranking = _ranking(connection, tokens, candidatos)
+    if not ranking:
+        return queryset.none()
+
+    # Un CASE simple en SQL crudo: compilar mil expresiones When del ORM
+    # cuesta más que la propia consulta al índice.
+    columna_id = f'{connection.ops.quote_name(Libro._meta.db_table)}.id'
+    casos = ' '.join(['WHEN %s THEN %s'] * len(ranking))
+    params = [valor for fila in ranking for valor in fila]
+    return queryset.filter(pk__in=[libro_id for libro_id, _ in ranking]).annotate(
+        relevancia=RawSQL(f'CASE {columna_id} {casos} END', params, output_field=FloatField())
+    ).order_by('-relevancia', *Libro._meta.ordering)
+
+
+def filtrar_libros(queryset, texto):
+    """
+    Filtra un QuerySet de libros por texto igual que ``buscar_libros`` pero
+    sin ordenar por relevancia ni ``LIMITE_RESULTADOS``: las coincidencias
+    del índice quedan como subconsulta, así que el QuerySet se puede
+    recorrer entero por clave (exportaciones).
+    """
+    tokens = tokenizar(texto)
+    if not tokens:
+        return queryset
+
+    connection = connections[queryset.db]
+    if connection.vendor not in ('sqlite', 'mysql'):
+        return _filtro_contains(queryset, tokens)
+
+    consulta = _consulta(connection, tokens)
+    if connection.vendor == 'sqlite':
+        fts = _tabla_fts()
+        sql = f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s'
+    else:
+        tabla = IndiceBusquedaLibro._meta.db_table
+        sql = f'SELECT libro_id FROM {tabla} WHERE MATCH({", ".join(COLUMNAS)}) AGAINST (%s IN BOOLEAN MODE)'
+    return queryset.filter(pk__in=RawSQL(sql, [consulta]))
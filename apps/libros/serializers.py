@@ -29,10 +29,11 @@ class LibroSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'titulo', 'autor', 'autor_id', 'isbn',
             'categoria', 'categoria_id', 'fecha_publicacion',
-            'disponible', 'imagen', 'descripcion', 'paginas',
-            'calificacion', 'stock'
+            'disponible', 'imagen', 'imagen_estado', 'imagen_url', 'imagen_variantes',
+            'descripcion', 'paginas', 'calificacion', 'stock'
         ]
-        read_only_fields = ['disponible']
+        # La imagen se sube en segundo plano (apps.common.imagenes)
+        read_only_fields = ['disponible', 'imagen_estado', 'imagen_url', 'imagen_variantes']
         extra_kwargs = {
             'titulo': {'help_text': 'Título completo de la obra'},
             'isbn': {'help_text': 'Código ISBN de 13 dígitos'},
@@ -49,3 +50,41 @@ class LibroSerializer(serializers.ModelSerializer):
         if len(value) != 13 or not value.isdigit():
             raise serializers.ValidationError('El ISBN debe tener 13 dígitos numéricos.')
         return value
+
+
+class LibroLoteSerializer(LibroSerializer):
+    """
+    Variante de ``LibroSerializer`` para las operaciones por lotes: no hace
+    consultas por elemento. Autor, categoría y unicidad del ISBN los comprueba
+    ``LibroService`` con una consulta por lote.
+    """
+    autor_id = serializers.IntegerField(write_only=True, help_text='ID del autor')
+    categoria_id = serializers.IntegerField(
+        write_only=True,
+        required=False,
+        allow_null=True,
+        help_text='ID de la categoría'
+    )
+
+    class Meta(LibroSerializer.Meta):
+        # La imagen se sube por separado, no en lotes JSON
+        fields = [campo for campo in LibroSerializer.Meta.fields if not campo.startswith('imagen')]
+        extra_kwargs = {
+            **LibroSerializer.Meta.extra_kwargs,
+            'isbn': {**LibroSerializer.Meta.extra_kwargs['isbn'], 'validators': []},
+        }
+
+
+# Columnas de la exportación del catálogo: (columna, campo del ORM)
+CAMPOS_EXPORTACION = (
+    ('id', 'id'),
+    ('titulo', 'titulo'),
+    ('isbn', 'isbn'),
+    ('autor', 'autor__nombre'),
+    ('categoria', 'categoria__nombre'),
+    ('fecha_publicacion', 'fecha_publicacion'),
+    ('disponible', 'disponible'),
+    ('stock', 'stock'),
+    ('paginas', 'paginas'),
+    ('calificacion', 'calificacion'),
+)
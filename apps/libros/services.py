@@ -1,6 +1,12 @@
 from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
 from django.core.exceptions import ValidationError
-from .models import Libro
+from django.utils import timezone
+from apps.autores.models import Autor
+from apps.common import cache_respuestas
+from .models import Categoria, Libro
+from . import estadisticas
+from .search import CAMPOS_INDEXADOS, reconstruir_indice
 
 class LibroService:
     @staticmethod
@@ -8,22 +14,21 @@ class LibroService:
     def crear_libro(datos, imagen=None):
         """
         Crea un nuevo libro encapsulando la lógica de persistencia.
+
+        La imagen no se sube aquí: queda pendiente y la sube el worker
+        ``procesar_imagenes`` o, sin worker, la propia petición al confirmar
+        la transacción (``apps.common.imagenes``).
         """
-        libro = Libro.objects.create(
+        return Libro.objects.create(
             titulo=datos['titulo'],
             autor_id=datos['autor'],
             categoria_id=datos['categoria'],
             isbn=datos['isbn'],
             descripcion=datos.get('descripcion', ''),
             fecha_publicacion=datos['fecha_publicacion'],
-            stock=datos.get('stock', 1)
+            stock=datos.get('stock', 1),
+            imagen=imagen or None
         )
-        
-        if imagen:
-            libro.imagen = imagen
-            libro.save()
-            
-        return libro
     
     @staticmethod
     @transaction.atomic
@@ -38,15 +43,226 @@ class LibroService:
         Raises:
             ValidationError: Si el stock resultante sería negativo
         """
-        nuevo_stock = libro.stock + cantidad
-        
-        if nuevo_stock < 0:
+        # Actualización condicional en la base de datos: el UPDATE bloquea la
+        # fila y solo se aplica si el stock alcanza, sin leer-modificar-escribir.
+        actualizados = Libro.objects.filter(pk=libro.pk, stock__gte=-cantidad).update(
+            stock=F('stock') + cantidad, modificado=timezone.now()
+        )
+        if not actualizados:
+            stock_actual = Libro.objects.filter(pk=libro.pk).values_list('stock', flat=True).first()
             raise ValidationError(
-                f'Stock insuficiente. Stock actual: {libro.stock}, cantidad solicitada: {abs(cantidad)}'
+                f'Stock insuficiente. Stock actual: {stock_actual}, cantidad solicitada: {abs(cantidad)}'
             )
-        
-        libro.stock = nuevo_stock
-        libro.disponible = nuevo_stock > 0
-        libro.save()
-        
+
+        LibroService._actualizar_disponibilidad([libro.pk])
+        libro.refresh_from_db(fields=['stock', 'disponible', 'modificado'])
+        # update() no emite post_save
+        cache_respuestas.invalidar(Libro)
+
         return libro
+
+    @staticmethod
+    @transaction.atomic
+    def actualizar_stock_lote(cantidades):
+        """
+        Ajusta el stock de varios libros con actualizaciones por conjuntos:
+        un UPDATE por cada cantidad distinta y otro para la disponibilidad.
+
+        Args:
+            cantidades: Diccionario ``{libro_id: cantidad}`` con la cantidad
+                a sumar (positiva) o restar (negativa) a cada libro
+
+        Raises:
+            ValidationError: Si algún stock resultante sería negativo; en ese
+                caso no se aplica ningún cambio
+        """
+        ahora = timezone.now()
+        por_cantidad = {}
+        for libro_id, cantidad in cantidades.items():
+            por_cantidad.setdefault(cantidad, []).append(libro_id)
+
+        for cantidad, ids in por_cantidad.items():
+            actualizados = Libro.objects.filter(pk__in=ids, stock__gte=-cantidad).update(
+                stock=F('stock') + cantidad, modificado=ahora
+            )
+            if actualizados != len(ids):
+                # Revierte también los grupos ya aplicados (transacción atómica)
+                raise ValidationError(f'Stock insuficiente para alguno de los libros {sorted(ids)}.')
+
+        LibroService._actualizar_disponibilidad(list(cantidades))
+        cache_respuestas.invalidar(Libro)
+
+    @staticmethod
+    def _actualizar_disponibilidad(ids):
+        """
+        Recalcula ``disponible`` a partir del stock y ajusta los contadores
+        del catálogo de los libros que cambian. Se ejecuta tras los UPDATE de
+        stock, con las filas ya bloqueadas.
+        """
+        cambian = list(
+            Libro.objects.filter(pk__in=ids)
+            .filter(Q(disponible=True, stock=0) | Q(disponible=False, stock__gt=0))
+            .values_list('pk', 'categoria_id', 'disponible')
+        )
+        if not cambian:
+            return
+        Libro.objects.filter(pk__in=[pk for pk, _, _ in cambian]).update(
+            disponible=Case(When(stock__gt=0, then=Value(True)), default=Value(False))
+        )
+        estadisticas.registrar_cambios(
+            ((categoria_id, disponible), (categoria_id, not disponible))
+            for _, categoria_id, disponible in cambian
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def crear_libros_lote(elementos):
+        """
+        Crea varios libros con un único ``bulk_create``.
+
+        Args:
+            elementos: Lista de ``(indice, datos)`` ya validados por
+                ``LibroLoteSerializer``
+
+        Returns:
+            Tupla ``(creados, errores)``: diccionarios por índice con el libro
+            creado o los errores del elemento
+        """
+        errores = LibroService._validar_lote([(indice, None, datos) for indice, datos in elementos])
+
+        creados = {}
+        for indice, datos in elementos:
+            if indice in errores:
+                continue
+            libro = Libro(**datos)
+            libro.disponible = libro.stock > 0
+            try:
+                libro.validar_datos()
+            except ValidationError as e:
+                errores[indice] = e.message_dict
+                continue
+            creados[indice] = libro
+
+        if creados:
+            Libro.objects.bulk_create(creados.values())
+            if next(iter(creados.values())).pk is None:
+                # MySQL no devuelve las PKs de bulk_create: se leen por ISBN
+                pks = dict(Libro.objects.filter(
+                    isbn__in=[libro.isbn for libro in creados.values()]
+                ).values_list('isbn', 'pk'))
+                for libro in creados.values():
+                    libro.pk = pks[libro.isbn]
+            # bulk_create no emite post_save: se indexa el lote a mano
+            reconstruir_indice(Libro.objects.filter(pk__in=[libro.pk for libro in creados.values()]))
+            estadisticas.registrar_cambios(
+                (None, (libro.categoria_id, libro.disponible)) for libro in creados.values()
+            )
+            cache_respuestas.invalidar(Libro, estadisticas.VISTA_PREVIA)
+
+        return creados, errores
+
+    @staticmethod
+    @transaction.atomic
+    def actualizar_libros_lote(elementos):
+        """
+        Aplica actualizaciones parciales a varios libros con un único
+        ``bulk_update`` sobre la unión de los campos modificados.
+
+        Los libros se vuelven a leer bloqueados, en orden de ``id``: los
+        cambios se aplican sobre sus valores actuales y no sobre los de
+        ``elementos``, que pueden haber quedado atrasados (p. ej. el stock
+        tras un préstamo), y ningún ``UPDATE`` simultáneo se pierde hasta el
+        final de la transacción.
+
+        Args:
+            elementos: Lista de ``(indice, libro, datos)`` ya validados por
+                ``LibroLoteSerializer``
+
+        Returns:
+            Tupla ``(actualizados, errores)`` por índice
+        """
+        bloqueados = {
+            libro.pk: libro
+            for libro in Libro.objects.select_for_update().filter(
+                pk__in=[libro.pk for _, libro, _ in elementos]
+            ).order_by('pk')
+        }
+        errores = {
+            indice: {'id': ['No existe un objeto con este id.']}
+            for indice, libro, _ in elementos if libro.pk not in bloqueados
+        }
+        elementos = [
+            (indice, bloqueados[libro.pk], datos)
+            for indice, libro, datos in elementos if indice not in errores
+        ]
+        errores.update(LibroService._validar_lote(elementos))
+
+        actualizados = {}
+        campos = set()
+        # Estado previo de cada libro para los contadores del catálogo
+        antes = {}
+        for indice, libro, datos in elementos:
+            if indice in errores:
+                continue
+            antes[libro.pk] = (libro.categoria_id, libro.disponible)
+            for campo, valor in datos.items():
+                setattr(libro, campo, valor)
+            if 'stock' in datos:
+                libro.disponible = libro.stock > 0
+            try:
+                libro.validar_datos()
+            except ValidationError as e:
+                errores[indice] = e.message_dict
+                continue
+            actualizados[indice] = libro
+            campos.update(Libro._meta.get_field(campo).name for campo in datos)
+            if 'stock' in datos:
+                campos.add('disponible')
+
+        if actualizados:
+            ahora = timezone.now()
+            for libro in actualizados.values():
+                libro.modificado = ahora
+            campos.add('modificado')
+            Libro.objects.bulk_update(actualizados.values(), sorted(campos))
+            if campos & CAMPOS_INDEXADOS:
+                reconstruir_indice(Libro.objects.filter(pk__in=[libro.pk for libro in actualizados.values()]))
+            estadisticas.registrar_cambios(
+                (antes[libro.pk], (libro.categoria_id, libro.disponible)) for libro in actualizados.values()
+            )
+            cache_respuestas.invalidar(Libro)
+            if campos & estadisticas.CAMPOS_VISTA_PREVIA:
+                cache_respuestas.invalidar(estadisticas.VISTA_PREVIA)
+
+        return actualizados, errores
+
+    @staticmethod
+    def _validar_lote(elementos):
+        """
+        Comprueba autores, categorías e ISBN de un lote con una consulta por
+        tipo. Devuelve los errores por índice.
+        """
+        autores = {datos['autor_id'] for _, _, datos in elementos if 'autor_id' in datos}
+        categorias = {datos['categoria_id'] for _, _, datos in elementos if datos.get('categoria_id')}
+        isbns = {datos['isbn'] for _, _, datos in elementos if 'isbn' in datos}
+        autores_existentes = set(Autor.objects.filter(pk__in=autores).values_list('pk', flat=True))
+        categorias_existentes = set(Categoria.objects.filter(pk__in=categorias).values_list('pk', flat=True))
+        isbn_ocupados = dict(Libro.objects.filter(isbn__in=isbns).values_list('isbn', 'pk'))
+
+        errores = {}
+        for indice, libro, datos in elementos:
+            error = {}
+            if 'autor_id' in datos and datos['autor_id'] not in autores_existentes:
+                error['autor_id'] = ['El autor especificado no existe.']
+            if datos.get('categoria_id') and datos['categoria_id'] not in categorias_existentes:
+                error['categoria_id'] = ['La categoría especificada no existe.']
+            if 'isbn' in datos:
+                propietario = isbn_ocupados.get(datos['isbn'])
+                if propietario is not None and (libro is None or propietario != libro.pk):
+                    error['isbn'] = ['Ya existe un libro con este ISBN.']
+                else:
+                    # Reservado para este elemento: detecta repetidos en el lote
+                    isbn_ocupados[datos['isbn']] = libro.pk if libro else -indice - 1
+            if error:
+                errores[indice] = error
+        return errores
@@ -0,0 +1,90 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from apps.autores.models import Autor
+from apps.common import cache_respuestas
+from .models import Categoria, Libro
+from . import estadisticas, search
+
+
+@receiver(post_save, sender=Libro)
+def indexar_libro(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Mantiene al día el documento de búsqueda del libro guardado."""
+    if raw:
+        return
+    if update_fields is not None and not search.CAMPOS_INDEXADOS.intersection(update_fields):
+        return
+    search.indexar_libro(instance)
+
+
+@receiver(post_save, sender=Autor)
+def reindexar_autor(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.reindexar_autor(instance)
+
+
+@receiver(post_save, sender=Categoria)
+def reindexar_categoria(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.reindexar_categoria(instance)
+
+
+@receiver(pre_delete, sender=Categoria)
+def desindexar_categoria(sender, instance, **kwargs):
+    # on_delete=SET_NULL actualiza los libros sin disparar post_save
+    search.reindexar_categoria(instance, nombre='')
+    Libro.objects.filter(categoria=instance).update(modificado=timezone.now())
+    estadisticas.vaciar_categoria(instance.pk)
+
+
+@receiver(pre_save, sender=Libro)
+@receiver(pre_delete, sender=Libro)
+def recordar_estado_libro(sender, instance, raw=False, **kwargs):
+    """
+    Guarda la categoría y disponibilidad de la base de datos para los
+    contadores: la instancia puede estar desactualizada (el stock cambia
+    con ``update()``).
+    """
+    if raw or instance._state.adding:
+        return
+    instance._estado_contadores = (
+        Libro.objects.filter(pk=instance.pk).values_list('categoria_id', 'disponible').first()
+    )
+
+
+@receiver(post_save, sender=Libro)
+def contar_libro(sender, instance, raw=False, created=False, **kwargs):
+    if raw:
+        return
+    antes = None if created else instance.__dict__.pop('_estado_contadores', None)
+    estadisticas.registrar_cambios([(antes, (instance.categoria_id, instance.disponible))])
+
+
+@receiver(post_delete, sender=Libro)
+def descontar_libro(sender, instance, **kwargs):
+    antes = instance.__dict__.pop('_estado_contadores', None) or (instance.categoria_id, instance.disponible)
+    estadisticas.registrar_cambios([(antes, None)])
+
+
+@receiver(post_save, sender=Libro)
+@receiver(post_delete, sender=Libro)
+@receiver(post_save, sender=Autor)
+@receiver(post_delete, sender=Autor)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def invalidar_respuestas(sender, raw=False, **kwargs):
+    """Invalida las respuestas cacheadas de la API que dependen del modelo."""
+    if raw:
+        return
+    cache_respuestas.invalidar(sender)
+
+
+@receiver(post_save, sender=Libro)
+@receiver(post_delete, sender=Libro)
+def invalidar_vista_previa(sender, raw=False, **kwargs):
+    """Altas, bajas y ediciones cambian la vista previa del panel; el stock no."""
+    if raw:
+        return
+    cache_respuestas.invalidar(estadisticas.VISTA_PREVIA)
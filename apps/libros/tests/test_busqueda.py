@@ -0,0 +1,70 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from apps.libros.models import Libro, Categoria, IndiceBusquedaLibro
+from apps.autores.models import Autor
+from rest_framework.test import APIClient
+from apps.libros.search import LIMITE_RESULTADOS, buscar_libros, filtrar_libros, normalizar, reconstruir_indice
+
+@pytest.mark.django_db
+class TestBusquedaLibros:
+    @pytest.fixture
+    def setup_data(self):
+        autor = Autor.objects.create(nombre="Gabriel García Márquez", nacionalidad="Colombia")
+        otro_autor = Autor.objects.create(nombre="Autor Test", nacionalidad="Test")
+        categoria = Categoria.objects.create(nombre="Novela")
+        cien_anos = Libro.objects.create(
+            titulo="Cien años de soledad", autor=autor, categoria=categoria,
+            isbn="9780307474728", fecha_publicacion="1967-05-30"
+        )
+        mencion = Libro.objects.create(
+            titulo="Crónica de lectura", autor=otro_autor, categoria=categoria,
+            isbn="9780000000001", fecha_publicacion="2001-01-01",
+            descripcion="Ensayo sobre la soledad en la novela latinoamericana"
+        )
+        return autor, cien_anos, mencion
+
+    def test_normalizar_elimina_tildes(self):
+        assert normalizar("Canción ÁRBOL Pingüino") == "cancion arbol pinguino"
+
+    def test_busqueda_sin_tildes_y_por_prefijo(self, setup_data):
+        _, cien_anos, _ = setup_data
+        resultados = list(buscar_libros(Libro.objects.all(), "garcia marq"))
+        assert resultados == [cien_anos]
+
+    def test_busqueda_por_isbn(self, setup_data):
+        _, cien_anos, _ = setup_data
+        assert list(buscar_libros(Libro.objects.all(), "9780307")) == [cien_anos]
+
+    def test_busqueda_por_fragmento_de_isbn(self, setup_data):
+        _, cien_anos, mencion = setup_data
+        with CaptureQueriesContext(connection) as consultas:
+            assert list(buscar_libros(Libro.objects.all(), "0307474")) == [cien_anos]
+        # Servido por el índice, sin recorrer la tabla con LIKE
+        assert not [q for q in consultas if 'LIKE' in q['sql']]
+        assert set(buscar_libros(Libro.objects.all(), "978-0")) == {cien_anos, mencion}
+        assert list(filtrar_libros(Libro.objects.all(), "474728")) == [cien_anos]
+        # Por debajo de MIN_FRAGMENTO_ISBN solo cuenta como prefijo
+        assert not buscar_libros(Libro.objects.all(), "728").exists()
+
+    def test_limite_anunciado_en_la_api(self, setup_data):
+        response = APIClient().get('/api/libros/', {'search': 'soledad'})
+        assert response['X-Limite-Resultados'] == str(LIMITE_RESULTADOS)
+        assert 'X-Limite-Resultados' not in APIClient().get('/api/libros/')
+
+    def test_relevancia_prioriza_titulo(self, setup_data):
+        _, cien_anos, mencion = setup_data
+        resultados = list(buscar_libros(Libro.objects.all(), "soledad"))
+        assert resultados == [cien_anos, mencion]
+
+    def test_indice_se_actualiza_al_renombrar_autor(self, setup_data):
+        autor, cien_anos, _ = setup_data
+        autor.nombre = "Gabo"
+        autor.save()
+        assert list(buscar_libros(Libro.objects.all(), "gabo")) == [cien_anos]
+        assert not buscar_libros(Libro.objects.all(), "marquez").exists()
+
+    def test_reconstruir_indice(self, setup_data):
+        IndiceBusquedaLibro.objects.all().delete()
+        assert reconstruir_indice(tamano_lote=1) == 2
+        assert buscar_libros(Libro.objects.all(), "cronica").count() == 1
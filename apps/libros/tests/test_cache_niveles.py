@@ -0,0 +1,120 @@
+import threading
+import time
+from unittest import mock
+import pytest
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from apps.common import cache_niveles
+from apps.common.cache_niveles import CacheDosNiveles, cacheado
+from apps.libros.models import Categoria, Libro
+from apps.autores.models import Autor
+
+def worker(nombre, **opciones):
+    """Caché de dos niveles con su propia LRU, como la de otro proceso."""
+    cache = CacheDosNiveles(nombre, {'OPTIONS': {'COMPARTIDA': 'compartida', **opciones}})
+    cache.clear()
+    return cache
+
+calculos = []
+
+@cacheado('libros')
+def titulos():
+    calculos.append(1)
+    return sorted(Libro.objects.values_list('titulo', flat=True))
+
+@cacheado('autores', ttl=60)
+def lento(valor):
+    calculos.append(valor)
+    time.sleep(0.2)
+    return valor * 2
+
+@pytest.fixture(autouse=True)
+def sin_calculos():
+    calculos.clear()
+
+class TestCacheDosNiveles:
+    def test_lru_acotada_y_estadisticas(self):
+        cache = worker('prueba-lru', MAX_ENTRADAS=2, TTL_LOCAL=60)
+        for clave in ('libros:a', 'libros:b', 'autores:c'):
+            cache.set(clave, clave.upper())
+        assert cache.get('autores:c') == 'AUTORES:C'
+        # 'libros:a' salió de la LRU pero sigue en la caché compartida
+        assert cache.get('libros:a') == 'LIBROS:A'
+        assert cache.get('libros:x') is None
+
+        estadisticas = cache.estadisticas()
+        assert estadisticas['local'] == {'entradas': 2, 'max_entradas': 2}
+        assert estadisticas['espacios']['libros'] == {
+            'aciertos_locales': 0, 'aciertos_compartidos': 1, 'fallos': 1, 'expulsiones': 2,
+        }
+        assert estadisticas['espacios']['autores']['aciertos_locales'] == 1
+
+    def test_copia_local_caduca_tras_ttl_local(self):
+        primero, segundo = worker('prueba-a', TTL_LOCAL=5), worker('prueba-b', TTL_LOCAL=5)
+        primero.set('respuestas:generacion', 1)
+        assert segundo.get('respuestas:generacion') == 1
+
+        primero.incr('respuestas:generacion')
+        assert primero.get('respuestas:generacion') == 2
+        assert segundo.get('respuestas:generacion') == 1
+        ahora = time.monotonic()
+        with mock.patch.object(cache_niveles.time, 'monotonic', return_value=ahora + 6):
+            assert segundo.get('respuestas:generacion') == 2
+
+    def test_valores_no_compartidos_por_referencia(self):
+        cache = worker('prueba-copias', TTL_LOCAL=60)
+        cache.set('libros:lista', [1, 2])
+        cache.get('libros:lista').append(3)
+        assert cache.get('libros:lista') == [1, 2]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestEspacios:
+    def test_invalidacion_por_espacio(self):
+        autor = Autor.objects.create(nombre="Autor Test", nacionalidad="Test")
+        Libro.objects.create(titulo="Uno", autor=autor, isbn="9780000000001", fecha_publicacion="2020-01-01")
+        assert titulos() == titulos() == ["Uno"]
+        assert len(calculos) == 1
+
+        Libro.objects.create(titulo="Dos", autor=autor, isbn="9780000000002", fecha_publicacion="2020-01-01")
+        assert titulos() == ["Dos", "Uno"]
+        assert len(calculos) == 2
+
+    def test_un_solo_calculo_con_peticiones_simultaneas(self):
+        resultados = []
+        hilos = [threading.Thread(target=lambda: resultados.append(lento(21))) for _ in range(5)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        assert resultados == [42] * 5
+        assert calculos == [21]
+
+    def test_endpoint_de_estadisticas(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="lector"))
+        assert client.get('/api/admin/cache/').status_code == 403
+
+        titulos()
+        titulos()
+        client.force_authenticate(User.objects.create_user(username="admin", is_staff=True))
+        response = client.get('/api/admin/cache/')
+        assert response.status_code == 200
+        libros = response.data['espacios']['libros']
+        assert libros['fallos'] >= 1
+        assert libros['aciertos_locales'] + libros['aciertos_compartidos'] >= 1
+
+    def test_categorias_compartidas_entre_usuarios(self):
+        Categoria.objects.create(nombre="Novela")
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="lector"))
+        with mock.patch('apps.libros.views.CategoriaViewSet.get_queryset', autospec=True,
+                        side_effect=lambda vista: Categoria.objects.all()) as consulta:
+            assert [c['nombre'] for c in client.get('/api/categorias/').data['results']] == ["Novela"]
+            client.force_authenticate(User.objects.create_user(username="otro"))
+            client.get('/api/categorias/')
+            assert consulta.call_count == 1
+
+            Categoria.objects.create(nombre="Ensayo")
+            assert len(client.get('/api/categorias/').data['results']) == 2
+        assert client.get('/api/categorias/999999/').status_code == 404
@@ -0,0 +1,96 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.common import cache_respuestas
+from apps.libros.models import Categoria, Libro
+from apps.libros.services import LibroService
+from apps.autores.models import Autor
+from apps.autores.services import AutorService
+from apps.prestamos.services import PrestamoService
+
+@pytest.mark.django_db
+class TestCacheRespuestas:
+    @pytest.fixture
+    def libro(self):
+        autor = Autor.objects.create(nombre="Autor Test", nacionalidad="Test")
+        return Libro.objects.create(
+            titulo="Libro Test", autor=autor, isbn="9780000000001",
+            fecha_publicacion="2020-01-01", stock=1
+        )
+
+    def _get(self, url, client=None):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = (client or APIClient()).get(url)
+        return respuesta, len(consultas)
+
+    def test_segunda_lectura_anonima_desde_cache(self, libro):
+        primera, _ = self._get('/api/libros/?disponible=true&fields=id,titulo')
+        # El orden de los parámetros no cambia la clave
+        segunda, consultas = self._get('/api/libros/?fields=id,titulo&disponible=true')
+        assert primera['X-Cache'] == 'MISS'
+        assert segunda['X-Cache'] == 'HIT'
+        assert segunda.json() == primera.json()
+        # El ETag (CondicionalMixin) sale de la caché: ninguna consulta
+        assert consultas == 0
+        assert cache_respuestas.estadisticas() == {'aciertos': 1, 'fallos': 1}
+
+    def test_usuarios_autenticados_no_usan_la_cache(self, libro):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="lector", password="pass"))
+        self._get('/api/libros/', client)
+        respuesta, _ = self._get('/api/libros/', client)
+        assert 'X-Cache' not in respuesta
+
+    def test_guardar_autor_invalida_libros_y_autores(self, libro):
+        self._get(f'/api/libros/{libro.pk}/')
+        self._get('/api/autores/')
+        libro.autor.nombre = "Autor Renombrado"
+        libro.autor.save()
+        respuesta, _ = self._get(f'/api/libros/{libro.pk}/')
+        assert respuesta['X-Cache'] == 'MISS'
+        assert respuesta.json()['autor']['nombre'] == "Autor Renombrado"
+        assert self._get('/api/autores/')[0]['X-Cache'] == 'MISS'
+
+    def test_categoria_no_invalida_autores(self, libro):
+        self._get('/api/autores/')
+        Categoria.objects.create(nombre="Novela")
+        assert self._get('/api/autores/')[0]['X-Cache'] == 'HIT'
+        assert self._get('/api/libros/')[0]['X-Cache'] == 'MISS'
+
+    def test_borrar_libro_invalida(self, libro):
+        self._get('/api/libros/')
+        libro.delete()
+        respuesta, _ = self._get('/api/libros/')
+        assert respuesta['X-Cache'] == 'MISS'
+        assert respuesta.json()['results'] == []
+
+    def test_cambios_de_stock_de_prestamos_invalidan(self, libro):
+        self._get(f'/api/libros/{libro.pk}/')
+        user = User.objects.create_user(username="lector", password="pass")
+        PrestamoService.crear_prestamo(user, libro)
+        respuesta, _ = self._get(f'/api/libros/{libro.pk}/')
+        assert respuesta['X-Cache'] == 'MISS'
+        assert respuesta.json()['stock'] == 0
+        assert respuesta.json()['disponible'] is False
+
+    def test_escrituras_por_lotes_invalidan(self, libro):
+        self._get('/api/autores/')
+        AutorService.crear_autores_lote([(0, {'nombre': "Autor Nuevo", 'nacionalidad': "Test"})])
+        assert self._get('/api/autores/')[0]['X-Cache'] == 'MISS'
+
+        self._get('/api/libros/')
+        LibroService.actualizar_libros_lote([(0, libro, {'titulo': "Título Nuevo"})])
+        assert self._get('/api/libros/')[0].json()['results'][0]['titulo'] == "Título Nuevo"
+
+    def test_no_cachea_errores(self, libro):
+        self._get('/api/libros/999999/')
+        assert cache_respuestas.estadisticas()['fallos'] == 1
+        assert self._get('/api/libros/999999/')[0].status_code == 404
+        assert cache_respuestas.estadisticas() == {'aciertos': 0, 'fallos': 2}
+
+    def test_ttl_configurable(self, libro, settings):
+        settings.CACHE_RESPUESTAS_TTL = 0
+        self._get('/api/libros/')
+        assert self._get('/api/libros/')[0]['X-Cache'] == 'MISS'
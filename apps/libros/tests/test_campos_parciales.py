@@ -0,0 +1,87 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.common.lectura import EsquemaLectura
+from apps.libros.models import Categoria, Libro
+from apps.libros.serializers import LibroSerializer
+from apps.autores.models import Autor
+from apps.prestamos.services import PrestamoService
+
+@pytest.mark.django_db
+class TestCamposParciales:
+    @pytest.fixture
+    def libro(self):
+        autor = Autor.objects.create(nombre="Autor Test", nacionalidad="Test", biografia="Bio")
+        categoria = Categoria.objects.create(nombre="Novela")
+        Libro.objects.create(
+            titulo="Sin categoría", autor=autor, isbn="9780000000002", fecha_publicacion="2021-06-15"
+        )
+        return Libro.objects.create(
+            titulo="Con categoría", autor=autor, categoria=categoria, isbn="9780000000001",
+            fecha_publicacion="2020-01-01", stock=2
+        )
+
+    def _sql(self, client, url):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = client.get(url)
+        assert respuesta.status_code == 200
+        return respuesta, [consulta['sql'] for consulta in consultas if 'libros_libro' in consulta['sql']]
+
+    def test_sin_parametros_mantiene_la_forma_completa(self, libro):
+        respuesta = APIClient().get(f'/api/libros/{libro.pk}/')
+        assert respuesta.json() == LibroSerializer(libro).data
+
+    def test_fields_recorta_columnas_y_evita_joins(self, libro):
+        respuesta, consultas = self._sql(APIClient(), '/api/libros/?fields=id,titulo,autor')
+        assert respuesta.json()['results'][0] == {'id': libro.pk, 'titulo': 'Con categoría', 'autor': libro.autor_id}
+        assert 'JOIN' not in consultas[-1]
+        assert 'descripcion' not in consultas[-1]
+
+    def test_expand_y_subcampos(self, libro):
+        respuesta, consultas = self._sql(
+            APIClient(), f'/api/libros/{libro.pk}/?fields=titulo,autor.nombre,categoria&expand=categoria'
+        )
+        assert respuesta.json() == {
+            'titulo': 'Con categoría',
+            'autor': {'nombre': 'Autor Test'},
+            'categoria': {'id': libro.categoria_id, 'nombre': 'Novela', 'descripcion': ''},
+        }
+        assert 'biografia' not in consultas[-1]
+
+    def test_relacion_opcional_vacia_sin_id_seleccionado(self, libro):
+        esquema = EsquemaLectura(LibroSerializer).con_seleccion('titulo,categoria.nombre')
+        filas = esquema.filas(Libro.objects.order_by('isbn'))
+        assert esquema.construir_lista(filas) == [
+            {'titulo': 'Con categoría', 'categoria': {'nombre': 'Novela'}},
+            {'titulo': 'Sin categoría', 'categoria': None},
+        ]
+
+    def test_expand_anidado_en_prestamos(self, libro):
+        user = User.objects.create_user(username="lector", password="pass")
+        PrestamoService.crear_prestamo(user, libro)
+        client = APIClient()
+        client.force_authenticate(user)
+        datos = client.get('/api/prestamos/?fields=id,libro&expand=libro.autor').json()['results'][0]
+        assert datos['libro']['titulo'] == 'Con categoría'
+        assert datos['libro']['autor']['nombre'] == 'Autor Test'
+        assert 'usuario' not in datos
+
+        datos = client.get('/api/prestamos/?fields=libro,usuario').json()['results'][0]
+        assert datos == {'libro': libro.pk, 'usuario': user.pk}
+
+    def test_autores_admiten_fields(self, libro):
+        datos = APIClient().get('/api/autores/?fields=nombre').json()
+        assert datos['results'] == [{'nombre': 'Autor Test'}]
+
+    def test_campo_desconocido_devuelve_400(self, libro):
+        respuesta = APIClient().get('/api/libros/?fields=titulo,precio')
+        assert respuesta.status_code == 400
+        assert 'precio' in respuesta.json()['fields']
+        assert APIClient().get('/api/libros/?expand=autor.editorial').status_code == 400
+
+    def test_variantes_compiladas_se_reutilizan(self):
+        esquema = EsquemaLectura(LibroSerializer)
+        assert esquema.con_seleccion() is esquema
+        assert esquema.con_seleccion('id,titulo') is esquema.con_seleccion('id,titulo')
@@ -0,0 +1,40 @@
+import pytest
+from django.contrib.auth.models import User
+from django.test import Client
+from apps.libros.models import Libro, Categoria
+from apps.libros.views import LIBROS_POR_PAGINA
+from apps.autores.models import Autor
+
+@pytest.mark.django_db
+class TestCatalogoHTML:
+    @pytest.fixture
+    def client(self):
+        client = Client()
+        client.force_login(User.objects.create_user(username="lector", password="pass"))
+        return client
+
+    @pytest.fixture
+    def libros(self):
+        autor = Autor.objects.create(nombre="Autor Test", nacionalidad="Test")
+        categoria = Categoria.objects.create(nombre="Cat Test")
+        return [
+            Libro.objects.create(
+                titulo=f"Libro {i:03d}", autor=autor, categoria=categoria,
+                isbn=f"9780000000{i:03d}", fecha_publicacion="2020-01-01"
+            )
+            for i in range(LIBROS_POR_PAGINA + 5)
+        ]
+
+    def test_primera_pagina_acotada(self, client, libros, django_assert_max_num_queries):
+        with django_assert_max_num_queries(8):
+            response = client.get('/libros/')
+        assert len(response.context['libros']) == LIBROS_POR_PAGINA
+        assert response.context['url_siguiente']
+
+    def test_fragmento_con_la_pagina_siguiente(self, client, libros):
+        url = client.get('/libros/').context['url_siguiente']
+        response = client.get(url)
+        assert response.status_code == 200
+        assert 'X-Siguiente' not in response
+        assert [l.titulo for l in response.context['libros']] == [l.titulo for l in libros[LIBROS_POR_PAGINA:]]
+        assert b'<html' not in response.content
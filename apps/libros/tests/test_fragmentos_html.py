@@ -0,0 +1,91 @@
+import re
+from unittest import mock
+import pytest
+from django.contrib.auth.models import User
+from django.test import Client
+from apps.common import fragmentos
+from apps.libros.models import Categoria, Libro
+from apps.autores.models import Autor
+
+def renderizados():
+    """Cuenta las plantillas de fragmento renderizadas (las que no venían de la caché)."""
+    return mock.patch.object(fragmentos, 'render_to_string', wraps=fragmentos.render_to_string)
+
+@pytest.mark.django_db
+class TestFragmentosHTML:
+    @pytest.fixture
+    def libros(self):
+        autor = Autor.objects.create(nombre="Autor Test", nacionalidad="Test")
+        categoria = Categoria.objects.create(nombre="Novela")
+        return [
+            Libro.objects.create(
+                titulo=f"Libro {i}", autor=autor, categoria=categoria,
+                isbn=f"978000000000{i}", fecha_publicacion="2020-01-01"
+            )
+            for i in range(5)
+        ]
+
+    def _client(self, username, **kwargs):
+        client = Client(**kwargs)
+        client.force_login(User.objects.create_user(username=username))
+        return client
+
+    def test_solo_se_renderizan_las_tarjetas_cambiadas(self, libros):
+        client = self._client("lector")
+        with renderizados() as render:
+            client.get('/libros/')
+        assert render.call_count == len(libros)
+
+        libros[2].titulo = "Título nuevo"
+        libros[2].save()
+        with renderizados() as render:
+            response = client.get('/libros/')
+        assert render.call_count == 1
+        assert "Título nuevo" in response.content.decode()
+
+        # Cambiar el autor invalida todas sus tarjetas
+        libros[0].autor.nombre = "Autor Renombrado"
+        libros[0].autor.save()
+        with renderizados() as render:
+            response = client.get('/libros/')
+        assert render.call_count == len(libros)
+        assert response.content.decode().count("Autor Renombrado") == len(libros)
+
+    def test_prestamo_cambia_la_tarjeta(self, libros):
+        client = self._client("lector")
+        client.get('/libros/')
+        client.post('/prestamos/crear/', {'libro': libros[0].pk})
+        with renderizados() as render:
+            client.get('/libros/')
+        assert render.call_count == 1
+
+    def test_token_csrf_propio_de_cada_peticion(self, libros):
+        self._client("primero").get('/libros/')
+
+        client = self._client("segundo", enforce_csrf_checks=True)
+        with renderizados() as render:
+            html = client.get('/libros/').content.decode()
+        assert render.call_count == 0
+        assert fragmentos.MARCA_CSRF not in html
+        assert 'segundo' in html
+
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', html).group(1)
+        response = client.post('/prestamos/crear/', {'libro': libros[0].pk, 'csrfmiddlewaretoken': token})
+        assert response.status_code == 302
+        assert Libro.objects.get(pk=libros[0].pk).stock == libros[0].stock - 1
+
+    def test_categorias_del_inicio(self, libros):
+        client = self._client("lector")
+        otra = Categoria.objects.create(nombre="Ensayo")
+        with renderizados() as render:
+            client.get('/')
+        assert render.call_count == 2
+
+        Libro.objects.create(
+            titulo="Ensayo 1", autor=libros[0].autor, categoria=otra,
+            isbn="9780000000099", fecha_publicacion="2020-01-01"
+        )
+        with renderizados() as render:
+            html = self._client("otro").get('/').content.decode()
+        assert render.call_count == 1
+        assert "Ensayo 1" in html
@@ -0,0 +1,102 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.libros.models import Categoria, Libro
+from apps.libros.services import LibroService
+from apps.autores.models import Autor
+from apps.prestamos.services import PrestamoService
+
+@pytest.mark.django_db
+class TestGetCondicional:
+    @pytest.fixture
+    def libro(self):
+        autor = Autor.objects.create(nombre="Autor Test", nacionalidad="Test")
+        categoria = Categoria.objects.create(nombre="Novela")
+        return Libro.objects.create(
+            titulo="Libro Test", autor=autor, categoria=categoria, isbn="9780000000001",
+            fecha_publicacion="2020-01-01", stock=1
+        )
+
+    def _revalidar(self, url, respuesta):
+        with CaptureQueriesContext(connection) as consultas:
+            segunda = APIClient().get(url, HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        return segunda, len(consultas)
+
+    @pytest.mark.parametrize('url', ['/api/libros/', '/api/libros/?disponible=true', '/api/autores/'])
+    def test_lista_sin_cambios_responde_304_sin_consultas(self, libro, url):
+        respuesta = APIClient().get(url)
+        assert respuesta.status_code == 200
+        assert 'Last-Modified' in respuesta
+        assert 'no-cache' in respuesta['Cache-Control']
+
+        segunda, consultas = self._revalidar(url, respuesta)
+        assert segunda.status_code == 304
+        assert segunda['ETag'] == respuesta['ETag']
+        assert not segunda.content
+        assert consultas == 0
+
+    def test_acierto_de_cache_sin_consultas(self, libro):
+        APIClient().get('/api/libros/?search=libro')
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = APIClient().get('/api/libros/?search=libro')
+        assert respuesta['X-Cache'] == 'HIT'
+        assert 'ETag' in respuesta
+        assert len(consultas) == 0
+
+    def test_detalle_304_y_if_modified_since(self, libro):
+        url = f'/api/libros/{libro.pk}/'
+        respuesta = APIClient().get(url)
+        assert self._revalidar(url, respuesta)[0].status_code == 304
+        segunda = APIClient().get(url, HTTP_IF_MODIFIED_SINCE=respuesta['Last-Modified'])
+        assert segunda.status_code == 304
+
+    def test_cambio_de_stock_por_prestamo_cambia_el_etag(self, libro):
+        url = f'/api/libros/{libro.pk}/'
+        respuesta = APIClient().get(url)
+        PrestamoService.crear_prestamo(User.objects.create_user(username="lector", password="pass"), libro)
+        segunda, _ = self._revalidar(url, respuesta)
+        assert segunda.status_code == 200
+        assert segunda.json()['stock'] == 0
+        assert segunda['ETag'] != respuesta['ETag']
+
+    def test_cambios_en_relaciones_y_lotes_cambian_el_etag(self, libro):
+        url = '/api/libros/'
+        respuesta = APIClient().get(url)
+        libro.categoria.descripcion = "Nueva"
+        libro.categoria.save()
+        respuesta_categoria, _ = self._revalidar(url, respuesta)
+        assert respuesta_categoria.status_code == 200
+
+        LibroService.actualizar_libros_lote([(0, libro, {'titulo': "Título Nuevo"})])
+        assert self._revalidar(url, respuesta_categoria)[0].status_code == 200
+
+    def test_borrados_cambian_el_etag_de_la_lista(self, libro):
+        otro = Libro.objects.create(
+            titulo="Otro", autor=libro.autor, isbn="9780000000002", fecha_publicacion="2020-01-01"
+        )
+        respuesta = APIClient().get('/api/libros/')
+        otro.delete()
+        assert self._revalidar('/api/libros/', respuesta)[0].status_code == 200
+
+        respuesta = APIClient().get('/api/libros/')
+        libro.categoria.delete()
+        segunda, _ = self._revalidar('/api/libros/', respuesta)
+        assert segunda.status_code == 200
+        assert segunda.json()['results'][0]['categoria'] is None
+
+    def test_parametros_distintos_dan_etag_distinto(self, libro):
+        completa = APIClient().get('/api/libros/')
+        parcial = APIClient().get('/api/libros/?fields=id')
+        assert completa['ETag'] != parcial['ETag']
+
+    def test_detalle_inexistente_sigue_dando_404(self):
+        assert APIClient().get('/api/libros/999999/').status_code == 404
+
+    def test_categorias_condicionales(self, libro):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="lector", password="pass"))
+        respuesta = client.get('/api/categorias/')
+        assert respuesta.status_code == 200
+        assert client.get('/api/categorias/', HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code == 304
@@ -0,0 +1,174 @@
+import io
+import os
+from unittest import mock
+import pytest
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client
+from PIL import Image
+from apps.common import imagenes
+from apps.libros.models import Libro
+from apps.libros.services import LibroService
+from apps.autores.models import Autor
+from apps.usuarios.models import PerfilUsuario
+
+def png(nombre="portada.png"):
+    contenido = io.BytesIO()
+    Image.new('RGB', (4, 4), 'red').save(contenido, 'PNG')
+    return SimpleUploadedFile(nombre, contenido.getvalue(), content_type='image/png')
+
+def pendientes():
+    raiz = settings.IMAGENES_PENDIENTES_ROOT
+    return [nombre for _, _, nombres in os.walk(raiz) for nombre in nombres]
+
+class DestinoRoto:
+    def subir(self, instancia, campo, archivo):
+        raise ConnectionError("sin red")
+
+@pytest.mark.django_db
+class TestImagenesDiferidas:
+    @pytest.fixture
+    def autor(self):
+        return Autor.objects.create(nombre="Autor Test", nacionalidad="Test")
+
+    @pytest.fixture
+    def client(self):
+        client = Client()
+        client.force_login(User.objects.create_user(username="lector"))
+        return client
+
+    def _crear_libro(self, autor):
+        return LibroService.crear_libro({
+            'titulo': "Con portada", 'autor': autor.pk, 'categoria': None,
+            'isbn': "9780000000001", 'fecha_publicacion': "2020-01-01",
+        }, png())
+
+    def test_crear_libro_no_sube_en_la_peticion(self, autor, client):
+        with mock.patch('cloudinary.uploader.upload_resource') as subida:
+            libro = self._crear_libro(autor)
+        subida.assert_not_called()
+        libro.refresh_from_db()
+        assert libro.imagen_estado == imagenes.PENDIENTE
+        assert not libro.imagen and not libro.imagen_url
+        assert pendientes() == ["portada.png"]
+        assert "PROCESANDO PORTADA" in client.get('/libros/').content.decode()
+
+        assert imagenes.procesar_pendientes() == {'subidas': 1, 'fallidas': 0}
+        libro.refresh_from_db()
+        assert libro.imagen_estado == imagenes.LISTA
+        assert libro.imagen_url == '/media/imagenes/libros/libro/portada.webp'
+        assert libro.imagen_variantes == {
+            'tarjeta': '/media/imagenes/libros/libro/portada-tarjeta.webp',
+            'detalle': '/media/imagenes/libros/libro/portada-detalle.webp',
+        }
+        assert os.path.exists(os.path.join(settings.IMAGENES_LOCAL_ROOT, 'libros/libro/portada.webp'))
+        assert pendientes() == []
+
+        html = client.get('/libros/').content.decode()
+        assert libro.imagen_variantes['tarjeta'] in html
+        assert "PROCESANDO PORTADA" not in html
+
+    def test_sin_worker_se_sube_al_confirmar(self, autor, settings, django_capture_on_commit_callbacks):
+        settings.IMAGENES_WORKER = False
+        with django_capture_on_commit_callbacks(execute=True):
+            libro = self._crear_libro(autor)
+        libro.refresh_from_db()
+        assert libro.imagen_estado == imagenes.LISTA
+        assert libro.imagen_url == '/media/imagenes/libros/libro/portada.webp'
+        assert pendientes() == []
+
+    def test_fallo_y_reintento(self, autor, settings):
+        libro = self._crear_libro(autor)
+        settings.IMAGENES_DESTINO = f'{__name__}.DestinoRoto'
+        assert imagenes.procesar_pendientes() == {'subidas': 0, 'fallidas': 1}
+        libro.refresh_from_db()
+        assert libro.imagen_estado == imagenes.FALLIDA
+        assert pendientes() == ["portada.png"]
+
+        settings.IMAGENES_DESTINO = 'apps.common.imagenes.DestinoLocal'
+        assert imagenes.procesar_pendientes() == {'subidas': 0, 'fallidas': 0}
+        salida = io.StringIO()
+        call_command('procesar_imagenes', reintentar=True, stdout=salida)
+        assert '1 imágenes subidas, 0 fallidas' in salida.getvalue()
+        assert Libro.objects.get(pk=libro.pk).imagen_estado == imagenes.LISTA
+
+    def test_imagen_sustituida_antes_de_subirse(self, autor):
+        libro = self._crear_libro(autor)
+        primera = Libro.objects.get(pk=libro.pk)
+        libro.imagen = png("otra.png")
+        libro.save()
+
+        # Un worker que leyó la fila antes del cambio no pisa la imagen nueva
+        subir = imagenes.destino().subir
+        imagenes._procesar(Libro, primera, Libro._meta.get_field('imagen'), {}, subir)
+        libro.refresh_from_db()
+        assert libro.imagen_estado == imagenes.PENDIENTE
+        assert pendientes() == ["otra.png"]
+
+        imagenes.procesar_pendientes()
+        assert Libro.objects.get(pk=libro.pk).imagen_url.endswith('otra.webp')
+
+    def test_avatar_desde_editar_perfil(self, client):
+        with mock.patch('cloudinary_storage.storage.MediaCloudinaryStorage._save') as subida:
+            response = client.post('/usuarios/editar-perfil/', {'email': 'lector@example.com', 'avatar': png("avatar.png")})
+        assert response.status_code == 302
+        subida.assert_not_called()
+        perfil = PerfilUsuario.objects.get(user__username="lector")
+        assert perfil.avatar_estado == imagenes.PENDIENTE
+        assert "Procesando avatar" in client.get('/usuarios/perfil/').content.decode()
+
+        imagenes.procesar_pendientes()
+        perfil.refresh_from_db()
+        assert perfil.avatar_estado == imagenes.LISTA
+        assert perfil.avatar_variantes['avatar'] in client.get('/usuarios/perfil/').content.decode()
+
+    def test_imagen_invalida_queda_fallida(self, autor):
+        libro = LibroService.crear_libro({
+            'titulo': "Rota", 'autor': autor.pk, 'categoria': None,
+            'isbn': "9780000000002", 'fecha_publicacion': "2020-01-01",
+        }, SimpleUploadedFile("rota.jpg", b"no es una imagen", content_type='image/jpeg'))
+        assert imagenes.procesar_pendientes() == {'subidas': 0, 'fallidas': 1}
+        assert Libro.objects.get(pk=libro.pk).imagen_estado == imagenes.FALLIDA
+
+
+class TestPrepararImagen:
+    def _foto(self, tamano=(2400, 1200), orientacion=None):
+        exif = Image.Exif()
+        exif[0x010F] = "Camara"
+        if orientacion:
+            exif[0x0112] = orientacion
+        contenido = io.BytesIO()
+        Image.new('RGB', tamano, 'blue').save(contenido, 'JPEG', exif=exif)
+        return SimpleUploadedFile("foto.jpg", contenido.getvalue(), content_type='image/jpeg')
+
+    def test_reduce_recodifica_y_quita_metadatos(self, settings):
+        settings.IMAGENES_LADO_MAXIMO = 800
+        principal, variantes = imagenes.preparar(self._foto(), imagenes.VARIANTES_PORTADA)
+        assert principal.name == "foto.webp"
+        with Image.open(principal) as imagen:
+            assert imagen.format == 'WEBP'
+            assert imagen.size == (800, 400)
+            assert not imagen.getexif()
+        for nombre, tamano in imagenes.VARIANTES_PORTADA.items():
+            assert variantes[nombre].name == f"foto-{nombre}.webp"
+            with Image.open(variantes[nombre]) as imagen:
+                assert imagen.size == tamano
+
+    def test_aplica_orientacion_y_admite_jpeg(self, settings):
+        settings.IMAGENES_FORMATO = 'JPEG'
+        # Orientación 6: la cámara estaba girada 90°
+        principal, variantes = imagenes.preparar(self._foto((1200, 600), orientacion=6), {'avatar': (64, 64)})
+        with Image.open(principal) as imagen:
+            assert imagen.format == 'JPEG'
+            assert imagen.size == (600, 1200)
+            assert not imagen.getexif()
+        assert variantes['avatar'].name == "foto-avatar.jpg"
+
+    def test_png_con_transparencia(self):
+        contenido = io.BytesIO()
+        Image.new('RGBA', (50, 50), (255, 0, 0, 0)).save(contenido, 'PNG')
+        principal, _ = imagenes.preparar(SimpleUploadedFile("logo.png", contenido.getvalue()), {})
+        with Image.open(principal) as imagen:
+            assert imagen.mode == 'RGBA'
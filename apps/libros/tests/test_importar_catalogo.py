@@ -0,0 +1,107 @@
+import io
+import json
+from unittest import mock
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from apps.libros.importacion import ImportadorCatalogo
+from apps.libros.models import Categoria, Libro
+from apps.libros.search import buscar_libros
+from apps.autores.models import Autor
+
+CSV = """titulo,autor,isbn,fecha_publicacion,categoria,stock
+Cien años de soledad,Gabriel García Márquez,9780000000001,1967-05-30,Novela,3
+El otoño del patriarca,gabriel garcía márquez,9780000000002,1975-01-01,Novela,0
+Ficciones,Jorge Luis Borges,9780000000003,1944-01-01,Cuentos,
+Repetido,Jorge Luis Borges,9780000000003,1944-01-01,,1
+ISBN corto,Jorge Luis Borges,123,1944-01-01,,1
+Fecha mala,Jorge Luis Borges,9780000000004,ayer,,1
+Existente,Autor Previo,9780000000099,2000-01-01,,1
+"""
+
+@pytest.mark.django_db
+class TestImportarCatalogo:
+    @pytest.fixture
+    def previo(self):
+        autor = Autor.objects.create(nombre="Autor Previo", nacionalidad="Test")
+        return Libro.objects.create(
+            titulo="Ya en catálogo", autor=autor, isbn="9780000000099", fecha_publicacion="2000-01-01"
+        )
+
+    def test_importa_csv_y_rechaza_filas_invalidas(self, tmp_path, previo):
+        archivo = tmp_path / "catalogo.csv"
+        archivo.write_text(CSV, encoding="utf-8")
+        rechazados = tmp_path / "rechazados.ndjson"
+        salida = io.StringIO()
+
+        call_command('importar_catalogo', str(archivo), lote=2, rechazados=str(rechazados), stdout=salida)
+
+        assert "3 libros importados, 4 filas rechazadas" in salida.getvalue()
+        assert set(Libro.objects.values_list('isbn', flat=True)) == {
+            "9780000000001", "9780000000002", "9780000000003", "9780000000099"
+        }
+        # Autores y categorías se crean una sola vez, sin distinguir mayúsculas
+        assert Autor.objects.filter(nombre__iexact="Gabriel García Márquez").count() == 1
+        assert Categoria.objects.count() == 2
+        agotado = Libro.objects.get(isbn="9780000000002")
+        assert (agotado.stock, agotado.disponible) == (0, False)
+        assert Libro.objects.get(isbn="9780000000003").stock == 1
+        # Los libros importados quedan indexados para la búsqueda
+        assert buscar_libros(Libro.objects.all(), "soledad").get().isbn == "9780000000001"
+
+        filas = [json.loads(linea) for linea in rechazados.read_text(encoding="utf-8").splitlines()]
+        assert [(f['fila'], list(f['errores'])) for f in filas] == [
+            (5, ['isbn']), (6, ['isbn']), (7, ['fecha_publicacion']), (8, ['isbn'])
+        ]
+
+    def test_ndjson_por_lotes_con_consultas_constantes(self, tmp_path):
+        archivo = tmp_path / "catalogo.ndjson"
+        with archivo.open("w", encoding="utf-8") as f:
+            for i in range(40):
+                f.write(json.dumps({
+                    "titulo": f"Libro {i}", "autor": f"Autor {i % 3}", "isbn": f"97800000001{i:02d}",
+                    "fecha_publicacion": "2001-01-01", "categoria": "General",
+                }) + "\n")
+            f.write("no es json\n")
+
+        with CaptureQueriesContext(connection) as consultas:
+            call_command('importar_catalogo', str(archivo), lote=20, stdout=io.StringIO(), stderr=io.StringIO())
+
+        assert Libro.objects.count() == 40
+        assert Autor.objects.count() == 3
+        inserts = [q for q in consultas.captured_queries if q['sql'].startswith('INSERT INTO "libros_libro"')]
+        assert len(inserts) == 2
+        # Sin consultas de unicidad por fila
+        assert len(consultas.captured_queries) < 40
+
+    def test_lote_que_choca_se_reintenta_fila_a_fila(self, tmp_path, previo):
+        archivo = tmp_path / "catalogo.csv"
+        archivo.write_text(CSV, encoding="utf-8")
+        rechazados = tmp_path / "rechazados.ndjson"
+        resolver = ImportadorCatalogo._resolver_relaciones
+
+        def chocar(importador, libros):
+            # Como si otro proceso hubiera insertado el ISBN tras comprobarlo
+            resolver(importador, libros)
+            if any(libro.isbn == "9780000000002" for _, libro in libros):
+                raise IntegrityError("UNIQUE constraint failed: libros_libro.isbn")
+
+        with mock.patch.object(ImportadorCatalogo, '_resolver_relaciones', chocar):
+            call_command('importar_catalogo', str(archivo), lote=2, rechazados=str(rechazados), stdout=io.StringIO())
+
+        assert set(Libro.objects.values_list('isbn', flat=True)) == {
+            "9780000000001", "9780000000003", "9780000000099"
+        }
+        # El autor creado en el lote revertido se vuelve a crear, una sola vez
+        libro = Libro.objects.get(isbn="9780000000001")
+        assert Autor.objects.filter(pk=libro.autor_id, nombre="Gabriel García Márquez").exists()
+        assert Categoria.objects.filter(pk=libro.categoria_id, nombre="Novela").exists()
+        filas = [json.loads(linea) for linea in rechazados.read_text(encoding="utf-8").splitlines()]
+        assert [(f['fila'], list(f['errores'])) for f in filas][0] == (3, ['fila'])
+
+    def test_fichero_que_no_es_utf8(self, tmp_path):
+        archivo = tmp_path / "catalogo.csv"
+        archivo.write_bytes(CSV.encode("latin-1"))
+        with pytest.raises(CommandError, match="UTF-8"):
+            call_command('importar_catalogo', str(archivo), stdout=io.StringIO())
@@ -0,0 +1,108 @@
+from unittest import mock
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+from apps.common.middleware import WhiteNoiseAsincrona
+from apps.common.throttling import AnonThrottleCompartido
+from apps.libros.models import Categoria, Libro
+from apps.autores.models import Autor
+
+def get_async(url, client=None, **headers):
+    return async_to_sync((client or AsyncClient()).get)(url, headers=headers)
+
+def sin_enlaces(datos):
+    return {**datos, 'next': None, 'previous': None}
+
+@pytest.mark.django_db
+class TestLecturaAsincrona:
+    @pytest.fixture
+    def libros(self):
+        autor = Autor.objects.create(nombre="Autor Test", nacionalidad="Test")
+        categoria = Categoria.objects.create(nombre="Novela")
+        return [
+            Libro.objects.create(
+                titulo=f"Libro {i:02d}", autor=autor, categoria=categoria if i % 2 else None,
+                isbn=f"97800000000{i:02d}", fecha_publicacion="2020-01-01", stock=i % 3
+            )
+            for i in range(13)
+        ]
+
+    @pytest.mark.parametrize('parametros', [
+        '', '?search=libro', '?disponible=true', '?ordering=-titulo', '?fields=titulo,autor.nombre',
+    ])
+    def test_lista_igual_que_la_sincrona(self, libros, parametros):
+        sincrona = APIClient().get(f'/api/libros/{parametros}').json()
+        asincrona = get_async(f'/api/async/libros/{parametros}')
+        assert asincrona.status_code == 200
+        assert asincrona['X-Cache'] == 'MISS'
+        assert sin_enlaces(asincrona.json()) == sin_enlaces(sincrona)
+
+    def test_cursores_intercambiables(self, libros):
+        primera = get_async('/api/async/libros/').json()
+        assert primera['previous'] is None
+        cursor = primera['next'].split('cursor=')[1]
+        segunda = get_async(f'/api/async/libros/?cursor={cursor}').json()
+        assert segunda['results'] == APIClient().get(f'/api/libros/?cursor={cursor}').json()['results']
+        assert segunda['next'] is None
+        assert get_async(segunda['previous']).json()['results'] == primera['results']
+        assert get_async('/api/async/libros/?cursor=roto').status_code == 404
+
+    def test_detalle_y_cache_anonima(self, libros):
+        url = f'/api/async/libros/{libros[1].pk}/'
+        respuesta = get_async(url)
+        assert respuesta.json() == APIClient().get(f'/api/libros/{libros[1].pk}/').json()
+        assert get_async(url)['X-Cache'] == 'HIT'
+
+        libros[1].titulo = "Cambiado"
+        libros[1].save()
+        assert get_async(url).json()['titulo'] == "Cambiado"
+        assert get_async('/api/async/libros/999999/').status_code == 404
+
+    def test_acierto_sin_filtros_ni_consultas(self, libros):
+        get_async('/api/async/libros/?search=libro')
+        with mock.patch('apps.common.asincrono._consultar') as consultar:
+            respuesta = get_async('/api/async/libros/?search=libro')
+        assert respuesta['X-Cache'] == 'HIT'
+        consultar.assert_not_called()
+
+    def test_autores_y_categorias(self, libros):
+        assert get_async('/api/async/autores/').json()['results'] == APIClient().get('/api/autores/').json()['results']
+        assert get_async('/api/async/categorias/').status_code == 401
+
+        usuario = User.objects.create_user(username="lector")
+        client, sincrono = AsyncClient(), APIClient()
+        client.force_login(usuario)
+        sincrono.force_authenticate(usuario)
+        respuesta = get_async('/api/async/categorias/', client)
+        assert respuesta.status_code == 200
+        assert 'X-Cache' not in respuesta
+        assert respuesta.json()['results'] == sincrono.get('/api/categorias/').json()['results']
+
+    def test_casos_de_la_via_sincrona(self, libros):
+        numerada = get_async('/api/async/libros/?page=2').json()
+        assert numerada['count'] == len(libros)
+
+        respuesta = get_async(f'/api/async/libros/{libros[0].pk}/')
+        assert 'ETag' not in respuesta
+        # Con If-None-Match responde el viewset, con su ETag
+        etag = get_async(f'/api/async/libros/{libros[0].pk}/', if_none_match='"otro"')['ETag']
+        assert get_async(f'/api/async/libros/{libros[0].pk}/', if_none_match=etag).status_code == 304
+        assert async_to_sync(AsyncClient().post)('/api/async/libros/').status_code == 405
+
+    def test_throttle_compartido(self, libros):
+        with mock.patch.dict(AnonThrottleCompartido.THROTTLE_RATES, {'anon': '1/min'}):
+            assert get_async('/api/async/autores/').status_code == 200
+            respuesta = get_async('/api/async/autores/')
+        assert respuesta.status_code == 429
+        assert 'Retry-After' in respuesta
+
+
+def test_whitenoise_no_bloquea_la_cadena_asincrona():
+    async def siguiente(request):
+        return HttpResponse()
+
+    assert iscoroutinefunction(WhiteNoiseAsincrona(siguiente))
+    assert not iscoroutinefunction(WhiteNoiseAsincrona(lambda request: HttpResponse()))
@@ -0,0 +1,104 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.libros.models import Categoria, ContadorCatalogo, Libro
+from apps.libros.search import buscar_libros
+from apps.autores.models import Autor
+
+@pytest.mark.django_db
+class TestLotesAPI:
+    @pytest.fixture
+    def client(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="editor", password="pass"))
+        return client
+
+    @pytest.fixture
+    def autor(self):
+        return Autor.objects.create(nombre="Autor Test", nacionalidad="Test")
+
+    def _libro(self, i, autor, **extra):
+        return {
+            "titulo": f"Libro {i}", "autor_id": autor.pk, "isbn": f"97800000000{i:02d}",
+            "fecha_publicacion": "2020-01-01", "stock": 2, **extra,
+        }
+
+    def test_crea_libros_con_errores_por_elemento(self, client, autor):
+        categoria = Categoria.objects.create(nombre="Novela")
+        Libro.objects.create(titulo="Previo", autor=autor, isbn="9780000000099", fecha_publicacion="2020-01-01")
+        datos = [self._libro(i, autor, categoria_id=categoria.pk) for i in range(20)]
+        datos += [
+            self._libro(20, autor, autor_id=9999),
+            self._libro(21, autor, isbn="9780000000099"),
+            self._libro(22, autor, isbn="9780000000001"),
+            self._libro(23, autor, fecha_publicacion="2999-01-01"),
+        ]
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = client.post('/api/libros/lote/', datos, format='json')
+
+        assert response.status_code == 201
+        resultados = response.json()['resultados']
+        assert all('id' in r for r in resultados[:20])
+        assert list(resultados[20]['errores']) == ['autor_id']
+        assert list(resultados[21]['errores']) == ['isbn']
+        assert list(resultados[22]['errores']) == ['isbn']
+        assert list(resultados[23]['errores']) == ['fecha_publicacion']
+        assert Libro.objects.filter(categoria=categoria).count() == 20
+        assert buscar_libros(Libro.objects.all(), "novela").count() == 20
+        # Consultas constantes: no dependen del número de elementos
+        assert len(consultas.captured_queries) < 20
+
+    def test_actualiza_libros_parcialmente(self, client, autor):
+        libros = [Libro.objects.create(**self._libro(i, autor)) for i in range(3)]
+        datos = [
+            {"id": libros[0].pk, "stock": 0},
+            {"id": libros[1].pk, "titulo": "Título nuevo"},
+            {"id": libros[2].pk, "isbn": libros[0].isbn},
+            {"id": 9999, "stock": 1},
+        ]
+        response = client.patch('/api/libros/lote/', datos, format='json')
+
+        assert response.status_code == 200
+        resultados = response.json()['resultados']
+        assert [list(r) for r in resultados] == [['indice', 'id'], ['indice', 'id'], ['indice', 'errores'], ['indice', 'errores']]
+        libros[0].refresh_from_db()
+        assert (libros[0].stock, libros[0].disponible) == (0, False)
+        assert buscar_libros(Libro.objects.all(), "nuevo").get().pk == libros[1].pk
+
+    def test_rechaza_ids_repetidos(self, client, autor):
+        libro = Libro.objects.create(**self._libro(1, autor))
+        response = client.patch('/api/libros/lote/', [
+            {"id": libro.pk, "stock": 0},
+            {"id": libro.pk, "stock": 5},
+        ], format='json')
+
+        resultados = response.json()['resultados']
+        assert resultados[0] == {'indice': 0, 'id': libro.pk}
+        assert list(resultados[1]['errores']) == ['id']
+        libro.refresh_from_db()
+        assert (libro.stock, libro.disponible) == (0, False)
+        assert ContadorCatalogo.objects.get(categoria=0).disponibles == 0
+
+    def test_autores_por_lote(self, client, autor):
+        response = client.post('/api/autores/lote/', [
+            {"nombre": "Julio Cortázar", "nacionalidad": "Argentina"},
+            {"nombre": "autor test", "nacionalidad": "Test"},
+            {"nombre": "JULIO CORTÁZAR", "nacionalidad": "Argentina"},
+            {"nombre": "X", "nacionalidad": "Test"},
+        ], format='json')
+
+        assert response.status_code == 201
+        resultados = response.json()['resultados']
+        assert 'id' in resultados[0]
+        assert [list(r['errores']) for r in resultados[1:]] == [['nombre'], ['nombre'], ['nombre']]
+
+        response = client.patch('/api/autores/lote/', [{"id": autor.pk, "nacionalidad": "Chile"}], format='json')
+        assert response.status_code == 200
+        autor.refresh_from_db()
+        assert autor.nacionalidad == "Chile"
+
+    def test_rechaza_cuerpo_que_no_es_lista(self, client):
+        assert client.post('/api/libros/lote/', {"titulo": "x"}, format='json').status_code == 400
@@ -0,0 +1,56 @@
+import pytest
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from apps.libros.models import Libro
+from apps.autores.models import Autor
+
+@pytest.mark.django_db
+class TestPaginacionKeyset:
+    @pytest.fixture
+    def client(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="lector", password="pass"))
+        return client
+
+    @pytest.fixture
+    def libros(self):
+        autor = Autor.objects.create(nombre="Autor Test", nacionalidad="Test")
+        # Títulos repetidos para ejercitar el desempate por pk
+        return [
+            Libro.objects.create(
+                titulo=f"Libro {i // 3}", autor=autor, isbn=f"97800000000{i:02d}",
+                fecha_publicacion=f"20{i:02d}-01-01"
+            )
+            for i in range(25)
+        ]
+
+    def _recorrer(self, client, url):
+        ids = []
+        while url:
+            data = client.get(url).json()
+            assert 'count' not in data
+            ids += [libro['id'] for libro in data['results']]
+            url = data['next']
+        return ids
+
+    def test_recorrido_completo_sin_duplicados(self, client, libros):
+        ids = self._recorrer(client, '/api/libros/')
+        esperado = [l.pk for l in sorted(libros, key=lambda l: (l.titulo, l.pk))]
+        assert ids == esperado
+
+    def test_respeta_ordering_filter(self, client, libros):
+        ids = self._recorrer(client, '/api/libros/?ordering=-fecha_publicacion')
+        assert ids == [l.pk for l in reversed(libros)]
+
+    def test_pagina_anterior(self, client, libros):
+        primera = client.get('/api/libros/').json()
+        segunda = client.get(primera['next']).json()
+        assert client.get(segunda['previous']).json()['results'] == primera['results']
+
+    def test_cursor_invalido(self, client, libros):
+        assert client.get('/api/libros/?cursor=no-valido').status_code == 404
+
+    def test_paginacion_numerada_opcional(self, client, libros):
+        data = client.get('/api/libros/?page=2').json()
+        assert data['count'] == 25
+        assert len(data['results']) == 10
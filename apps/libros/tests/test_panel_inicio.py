@@ -0,0 +1,136 @@
+import io
+from datetime import date
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from apps.libros import estadisticas
+from apps.libros.models import Categoria, ContadorCatalogo, Libro
+from apps.libros.services import LibroService
+from apps.autores.models import Autor
+from apps.prestamos.services import PrestamoService
+
+def contadores():
+    return {
+        c.categoria: (c.libros, c.disponibles)
+        for c in ContadorCatalogo.objects.all() if c.libros or c.disponibles
+    }
+
+@pytest.mark.django_db
+class TestPanelInicio:
+    @pytest.fixture
+    def autor(self):
+        return Autor.objects.create(nombre="Autor Test", nacionalidad="Test")
+
+    @pytest.fixture
+    def categoria(self):
+        return Categoria.objects.create(nombre="Novela")
+
+    def _libro(self, i, autor, **extra):
+        return Libro.objects.create(
+            titulo=f"Libro {i:02d}", autor=autor, isbn=f"97800000000{i:02d}",
+            fecha_publicacion="2020-01-01", **extra
+        )
+
+    def test_contadores_siguen_altas_bajas_y_stock(self, autor, categoria):
+        libro = self._libro(1, autor, categoria=categoria)
+        sin_categoria = self._libro(2, autor)
+        assert contadores() == estadisticas.contar_catalogo() == {categoria.pk: (1, 1), 0: (1, 1)}
+
+        user = User.objects.create_user(username="lector", password="pass")
+        prestamo = PrestamoService.crear_prestamo(user, libro)
+        assert contadores()[categoria.pk] == (1, 0)
+        PrestamoService.devolver_prestamos_lote([prestamo.pk])
+        assert contadores()[categoria.pk] == (1, 1)
+
+        sin_categoria.categoria = categoria
+        sin_categoria.save()
+        assert contadores() == {categoria.pk: (2, 2)}
+
+        libro.delete()
+        assert contadores() == estadisticas.contar_catalogo() == {categoria.pk: (1, 1)}
+
+    def test_contadores_en_escrituras_por_lotes(self, autor, categoria):
+        creados, _ = LibroService.crear_libros_lote([
+            (i, {'titulo': f"Lote {i}", 'autor_id': autor.pk, 'isbn': f"97811111111{i:02d}",
+                 'fecha_publicacion': date(2020, 1, 1), 'stock': i})
+            for i in range(3)
+        ])
+        assert contadores() == {0: (3, 2)}
+
+        LibroService.actualizar_libros_lote([(0, creados[0], {'stock': 2, 'categoria_id': categoria.pk})])
+        assert contadores() == estadisticas.contar_catalogo() == {0: (2, 2), categoria.pk: (1, 1)}
+
+    def test_lote_sobre_un_libro_atrasado(self, autor, categoria):
+        libro = self._libro(1, autor)
+        # Un préstamo agota el stock después de que la vista leyera el libro
+        LibroService.actualizar_stock(Libro.objects.get(pk=libro.pk), -1)
+        actualizados, _ = LibroService.actualizar_libros_lote([(0, libro, {'categoria_id': categoria.pk})])
+        assert (actualizados[0].stock, actualizados[0].disponible) == (0, False)
+        assert contadores() == estadisticas.contar_catalogo() == {categoria.pk: (1, 0)}
+
+    def test_borrar_categoria_y_autor(self, autor, categoria):
+        self._libro(1, autor, categoria=categoria)
+        self._libro(2, autor, categoria=categoria, stock=0, disponible=False)
+        categoria.delete()
+        assert contadores() == estadisticas.contar_catalogo() == {0: (2, 1)}
+        autor.delete()
+        assert contadores() == {}
+
+    def test_inicio_sin_recuentos_ni_libros_completos(self, autor, categoria):
+        for i in range(10):
+            self._libro(i, autor, categoria=categoria)
+        user = User.objects.create_user(username="lector", password="pass")
+        client = Client()
+        client.force_login(user)
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = client.get('/')
+        assert response.status_code == 200
+        assert response.context['total_libros'] == 10
+        assert response.context['libros_disponibles'] == 10
+        item = response.context['categorias_con_libros'][0]
+        assert item['total'] == 10
+        assert [l.titulo for l in item['libros']] == [f"Libro {i:02d}" for i in range(estadisticas.LIBROS_VISTA_PREVIA)]
+        assert not [q for q in consultas if 'COUNT(' in q['sql']]
+
+        # La parte compartida se reutiliza entre usuarios
+        otro = User.objects.create_user(username="otro", password="pass")
+        client.force_login(otro)
+        with CaptureQueriesContext(connection) as consultas:
+            client.get('/')
+        assert not [q for q in consultas if 'libros_' in q['sql']]
+
+    def test_panel_se_invalida_con_los_cambios(self, autor, categoria):
+        libro = self._libro(1, autor, categoria=categoria)
+        assert estadisticas.panel_catalogo()['libros_disponibles'] == 1
+        PrestamoService.crear_prestamo(User.objects.create_user(username="lector", password="pass"), libro)
+        assert estadisticas.panel_catalogo()['libros_disponibles'] == 0
+
+    def test_prestamos_no_recalculan_la_vista_previa(self, autor, categoria):
+        libro = self._libro(1, autor, categoria=categoria)
+        estadisticas.panel_catalogo()
+        PrestamoService.crear_prestamo(User.objects.create_user(username="lector", password="pass"), libro)
+        with CaptureQueriesContext(connection) as consultas:
+            panel = estadisticas.panel_catalogo()
+        assert panel['libros_disponibles'] == 0
+        assert not [q for q in consultas if 'FROM "libros_libro"' in q['sql']]
+
+        libro.titulo = "Renombrado"
+        libro.save()
+        assert [l.titulo for l in estadisticas.panel_catalogo()['categorias'][0]['libros']] == ["Renombrado"]
+
+    def test_reconciliar_estadisticas(self, autor, categoria):
+        self._libro(1, autor, categoria=categoria)
+        ContadorCatalogo.objects.filter(categoria=categoria.pk).update(libros=7)
+        ContadorCatalogo.objects.filter(categoria=0).delete()
+        Libro.objects.bulk_create([Libro(
+            titulo="Sin contar", autor=autor, isbn="9780000000099", fecha_publicacion="2020-01-01"
+        )])
+
+        salida = io.StringIO()
+        call_command('reconciliar_estadisticas', stdout=salida)
+        assert '1 contadores corregidos, 1 creados' in salida.getvalue()
+        assert contadores() == estadisticas.contar_catalogo()
@@ -0,0 +1,48 @@
+import pytest
+from apps.common.pagination import _despues_de, ordenacion_keyset
+from apps.common.planes import problemas_plan
+from apps.libros.models import Libro
+from apps.autores.models import Autor
+
+TAMANO_PAGINA = 11
+
+
+def _catalogo():
+    return Libro.objects.select_related('autor', 'categoria')
+
+
+def _pagina(queryset, posicion=None):
+    ordering = ordenacion_keyset(queryset)
+    queryset = queryset.order_by(*ordering)
+    if posicion is not None:
+        queryset = queryset.filter(_despues_de(ordering, posicion))
+    return queryset[:TAMANO_PAGINA]
+
+
+CONSULTAS = {
+    'lista': lambda: _pagina(_catalogo()),
+    'lista_siguiente_pagina': lambda: _pagina(_catalogo(), ['Libro', 1]),
+    'filtro_categoria': lambda: _pagina(_catalogo().filter(categoria_id=1)),
+    'filtro_autor': lambda: _pagina(_catalogo().filter(autor_id=1)),
+    'filtro_autor_siguiente_pagina': lambda: _pagina(_catalogo().filter(autor_id=1), ['Libro', 1]),
+    'recientes': lambda: _pagina(_catalogo().order_by('-fecha_publicacion')),
+    'recientes_siguiente_pagina': lambda: _pagina(
+        _catalogo().order_by('-fecha_publicacion'), ['2020-01-01', 1]
+    ),
+    'isbn_unico': lambda: Libro.objects.exclude(pk=1).filter(isbn='9780000000001'),
+    'autores': lambda: Autor.objects.order_by('nombre', 'pk')[:TAMANO_PAGINA],
+}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('nombre', CONSULTAS)
+def test_consulta_usa_indices(nombre):
+    queryset = CONSULTAS[nombre]()
+    assert problemas_plan(queryset) == [], queryset.explain()
+
+
+@pytest.mark.django_db
+def test_detecta_recorrido_completo():
+    # Sin índice sobre descripcion ni LIMIT: el recorrido por titulo es completo
+    assert problemas_plan(Libro.objects.filter(descripcion='x'))
+    assert problemas_plan(Libro.objects.order_by('stock')[:10])
@@ -0,0 +1,124 @@
+import sqlite3
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import AsyncClient, Client
+from rest_framework.test import APIClient
+from apps.common import replicas
+from apps.common.replicas import RouterReplicas
+from apps.libros.models import Categoria, Libro
+from apps.autores.models import Autor
+
+@pytest.fixture
+def replica(settings, tmp_path):
+    """
+    Segundo archivo SQLite como réplica de la principal. La replicación es
+    manual: ``replicar()`` copia la principal y, entre copias, la réplica va
+    atrasada.
+    """
+    ruta = str(tmp_path / 'replica.sqlite3')
+    # Conexión creada al vuelo, sin alias en DATABASES: Django la permite en las pruebas
+    connections.settings['replica'] = {**connections.settings['default'], 'NAME': ruta}
+    connections['replica'] = connections.create_connection('replica')
+    del connections.settings['replica']
+    settings.DATABASE_REPLICAS = ['replica']
+
+    def replicar():
+        connections['replica'].close()
+        destino = sqlite3.connect(ruta)
+        connections['default'].ensure_connection()
+        connections['default'].connection.backup(destino)
+        destino.close()
+
+    replicar()
+    yield replicar
+    connections['replica'].close()
+    del connections['replica']
+
+def crear_libro(titulo, isbn):
+    autor = Autor.objects.get_or_create(nombre="Autor Test", nacionalidad="Test")[0]
+    return Libro.objects.create(titulo=titulo, autor=autor, isbn=isbn, fecha_publicacion="2020-01-01")
+
+def titulos(respuesta):
+    return [libro['titulo'] for libro in respuesta.json()['results']]
+
+def titulos_categorias(client):
+    return [categoria['nombre'] for categoria in client.get('/api/categorias/').json()['results']]
+
+@pytest.mark.django_db(transaction=True)
+class TestReplicas:
+    @pytest.fixture
+    def lector(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="lector"))
+        return client
+
+    def test_lecturas_desde_la_replica(self, replica, lector):
+        crear_libro("En la réplica", "9780000000001")
+        replica()
+        crear_libro("Solo en la principal", "9780000000002")
+
+        assert titulos(lector.get('/api/libros/')) == ["En la réplica"]
+        assert lector.get('/api/autores/').status_code == 200
+        assert lector.get(f'/api/libros/{Libro.objects.get(isbn="9780000000002").pk}/').status_code == 404
+        replica()
+        assert len(titulos(lector.get('/api/libros/'))) == 2
+
+    def test_quien_escribe_lee_de_la_principal(self, replica, lector):
+        autor = Autor.objects.create(nombre="Autor Test", nacionalidad="Test")
+        replica()
+        respuesta = lector.post('/api/libros/', {
+            'titulo': "Recién creado", 'autor_id': autor.pk, 'isbn': "9780000000003",
+            'fecha_publicacion': "2020-01-01",
+        }, format='json')
+        assert respuesta.status_code == 201
+        assert titulos(lector.get('/api/libros/')) == ["Recién creado"]
+
+        otro = APIClient()
+        otro.force_authenticate(User.objects.create_user(username="otro"))
+        assert titulos(otro.get('/api/libros/')) == []
+
+        # Pasada la fijación vuelve a la réplica (todavía atrasada)
+        replicas.cache.delete(replicas._clave_fijacion(respuesta.wsgi_request.user))
+        assert titulos(lector.get('/api/libros/')) == []
+
+    def test_categorias_cacheadas_desde_la_principal(self, replica, lector):
+        Categoria.objects.create(nombre="Solo en la principal")
+        assert titulos_categorias(lector) == ["Solo en la principal"]
+
+    def test_cache_anonima_se_llena_desde_la_principal(self, replica):
+        crear_libro("Solo en la principal", "9780000000002")
+        assert titulos(APIClient().get('/api/libros/')) == ["Solo en la principal"]
+
+    def test_vistas_html(self, replica):
+        crear_libro("En la réplica", "9780000000001")
+        replica()
+        crear_libro("Solo en la principal", "9780000000002")
+        client = Client()
+        client.force_login(User.objects.create_user(username="lector"))
+
+        assert [libro.titulo for libro in client.get('/libros/').context['libros']] == ["En la réplica"]
+        # inicio muestra el panel cacheado, calculado en la principal
+        assert client.get('/').context['total_libros'] == 2
+
+    def test_vista_asincrona(self, replica):
+        Categoria.objects.create(nombre="Solo en la principal")
+        client = AsyncClient()
+        client.force_login(User.objects.create_user(username="lector"))
+        respuesta = async_to_sync(client.get)('/api/async/categorias/')
+        assert respuesta.json()['results'] == []
+
+
+def test_sin_replicas_todo_va_a_la_principal(settings):
+    settings.DATABASE_REPLICAS = []
+    router = RouterReplicas()
+    replicas._en_replica.set(True)
+    try:
+        assert router.db_for_read(Libro) is None
+        assert router.db_for_write(Libro) == 'default'
+    finally:
+        replicas.empezar_peticion()
+    settings.DATABASE_REPLICAS = ['replica']
+    assert router.allow_migrate('replica', 'libros') is False
+    assert router.allow_migrate('default', 'libros') is None
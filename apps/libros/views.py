@@ -1,107 +1,220 @@
 from django.shortcuts import render, redirect
+from django.http import Http404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from rest_framework import viewsets, filters
+from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
 from .models import Categoria, Libro
 from apps.autores.models import Autor
-from .serializers import CategoriaSerializer, LibroSerializer
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from .serializers import CAMPOS_EXPORTACION, CategoriaSerializer, LibroLoteSerializer, LibroSerializer
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from apps.prestamos.models import Prestamo
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from django.db.models import Q
+from .filters import BusquedaLibroFilter, LibroFilter
+from .search import LIMITE_RESULTADOS, buscar_libros
+from . import estadisticas
+from apps.common.cache_niveles import CacheNivelesMixin
+from apps.common.cache_respuestas import CacheRespuestasMixin
+from apps.common.condicional import CondicionalMixin
+from apps.common import fragmentos
+from apps.common.exportacion import formato_solicitado, respuesta_exportacion
+from apps.common.lectura import EsquemaLectura, LecturaRapidaMixin
+from apps.common.replicas import LecturaReplicaMixin, lectura_replica
+from apps.common.lotes import elementos_solicitud, ids_solicitados, respuesta_lote, validar_elementos
+from apps.common.pagination import (
+    codificar_cursor, decodificar_cursor, ordenacion_keyset, pagina_keyset
+)
 
 @login_required
+@lectura_replica
 def inicio(request):
     """
     Vista de inicio que muestra un resumen de la biblioteca y las categorías con sus libros.
+
+    La parte común a todos los usuarios sale de los contadores del catálogo
+    y se cachea (``estadisticas.panel_catalogo``); los préstamos activos del
+    usuario se leen de su contador. Cada categoría se renderiza como un
+    fragmento cacheado que solo cambia con ella, su recuento o su vista previa.
     """
-    # Obtener estadísticas de libros
-    total_libros = Libro.objects.count()
-    libros_disponibles = Libro.objects.filter(disponible=True).count()
-
-    # Obtener préstamos activos del usuario actual
-    if request.user.is_authenticated:
-        prestamos_activos = Prestamo.objects.filter(
-            usuario=request.user,
-            fecha_devolucion__isnull=True
-        ).count()
-    else:
-        prestamos_activos = 0
-
-    # Obtener categorías y sus libros
-    from apps.libros.models import Categoria
-    categorias = Categoria.objects.prefetch_related('libro_set').all()
-    categorias_con_libros = []
-    for categoria in categorias:
-        libros = categoria.libro_set.all()
-        categorias_con_libros.append({
-            'categoria': categoria,
-            'libros': libros
-        })
+    panel = estadisticas.panel_catalogo()
 
     context = {
         'title': 'Inicio - Biblioteca',
-        'total_libros': total_libros,
-        'libros_disponibles': libros_disponibles,
-        'prestamos_activos': prestamos_activos,
-        'categorias_con_libros': categorias_con_libros,
+        'total_libros': panel['total_libros'],
+        'libros_disponibles': panel['libros_disponibles'],
+        'prestamos_activos': Prestamo.libros_prestados_por_usuario(request.user),
+        'categorias_con_libros': panel['categorias'],
+        'tarjetas_categorias': fragmentos.renderizar(
+            request, 'libros/_categoria.html', panel['categorias'], _version_categoria, 'item'
+        ),
     }
     return render(request, 'inicio.html', context)
 
 
-class CategoriaViewSet(viewsets.ModelViewSet):
+def _version_categoria(item):
+    categoria = item['categoria']
+    return (categoria.pk, categoria.modificado, item['total'], tuple(libro.titulo for libro in item['libros']))
+
+
+class CategoriaViewSet(LecturaReplicaMixin, CondicionalMixin, CacheNivelesMixin, LecturaRapidaMixin, viewsets.ModelViewSet):
     queryset = Categoria.objects.all()
     serializer_class = CategoriaSerializer
+    # Igual para todos los usuarios: list y retrieve se comparten entre ellos
+    cache_espacios = ('categorias',)
+    esquema_lectura = EsquemaLectura(CategoriaSerializer)
     permission_classes = [IsAuthenticated]
 
-class LibroViewSet(viewsets.ModelViewSet):
+class LibroViewSet(LecturaReplicaMixin, CondicionalMixin, CacheRespuestasMixin, LecturaRapidaMixin, viewsets.ModelViewSet):
     queryset = Libro.objects.select_related('autor', 'categoria').all()
     serializer_class = LibroSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['disponible', 'categoria', 'autor']
-    search_fields = ['titulo', 'isbn', 'autor__nombre']
+    # Lecturas anónimas cacheadas y condicionales; el JSON incluye autor y categoría
+    cache_modelos = (Libro, Autor, Categoria)
+    # list y retrieve se construyen desde filas values_list()
+    esquema_lectura = EsquemaLectura(LibroSerializer)
+    filter_backends = [DjangoFilterBackend, BusquedaLibroFilter, filters.OrderingFilter]
+    filterset_class = LibroFilter
     ordering_fields = ['titulo', 'fecha_publicacion']
 
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.action == 'list' and request.query_params.get('search', '').strip():
+            # La búsqueda devuelve como mucho los LIMITE_RESULTADOS más relevantes
+            response['X-Limite-Resultados'] = str(LIMITE_RESULTADOS)
+        return response
+
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
             permission_classes = [AllowAny]
+        elif self.action == 'exportar':
+            permission_classes = [IsAdminUser]
         else:
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
 
-@login_required
-def lista_libros(request):
+    @action(detail=False, methods=['post', 'patch'], serializer_class=LibroLoteSerializer)
+    def lote(self, request):
+        """
+        Crea (``POST``) o actualiza parcialmente (``PATCH``, cada objeto con
+        su ``id``) una lista de libros. Devuelve un resultado por elemento.
+        """
+        elementos = elementos_solicitud(request)
+        contexto = self.get_serializer_context()
+        if request.method == 'POST':
+            validos, errores = validar_elementos(LibroLoteSerializer, elementos, context=contexto)
+            guardados, rechazados = LibroService.crear_libros_lote(
+                [(indice, datos) for indice, _, datos in validos]
+            )
+            return respuesta_lote(len(elementos), guardados, {**errores, **rechazados}, status.HTTP_201_CREATED)
+
+        instancias = Libro.objects.in_bulk(ids_solicitados(elementos))
+        validos, errores = validar_elementos(LibroLoteSerializer, elementos, instancias, context=contexto)
+        guardados, rechazados = LibroService.actualizar_libros_lote(validos)
+        return respuesta_lote(len(elementos), guardados, {**errores, **rechazados})
+
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def exportar(self, request):
+        """
+        Exporta el catálogo completo en streaming (``?formato=csv|ndjson``),
+        con los mismos filtros y búsqueda que el listado.
+        """
+        formato = formato_solicitado(request)
+        return respuesta_exportacion(
+            request, self.filter_queryset(self.get_queryset()), CAMPOS_EXPORTACION, formato, 'catalogo'
+        )
+
+# Libros por página en el catálogo HTML
+LIBROS_POR_PAGINA = 24
+
+# Columnas que usa la tarjeta de libro (templates/libros/_tarjeta.html) y su versión
+CAMPOS_TARJETA = (
+    'id', 'titulo', 'isbn', 'stock', 'disponible', 'imagen', 'imagen_estado', 'imagen_url',
+    'imagen_variantes', 'modificado',
+    'autor__nombre', 'autor__modificado', 'categoria__nombre', 'categoria__modificado',
+)
 
-    # Obtener parámetros de búsqueda
+
+def _version_tarjeta(libro):
+    categoria = libro.categoria.modificado if libro.categoria_id else None
+    return (libro.pk, libro.modificado, libro.autor.modificado, categoria)
+
+
+def _tarjetas(request, libros):
+    """Tarjetas HTML de ``libros``; solo se renderizan las que han cambiado."""
+    return fragmentos.renderizar(request, 'libros/_tarjeta.html', libros, _version_tarjeta, 'libro')
+
+
+def _pagina_catalogo(request):
+    """
+    Obtiene una página de libros del catálogo a partir de los parámetros
+    ``q``, ``categoria`` y ``cursor`` de la petición.
+
+    Returns:
+        Tupla ``(libros, url_siguiente)``; ``url_siguiente`` es ``None`` en la última página.
+    """
     query = request.GET.get('q', '')
     categoria_id = request.GET.get('categoria', '')
-    
-    # Filtrar libros
-    libros = Libro.objects.all()
-    
-    if query:
-        libros = libros.filter(
-            Q(titulo__icontains=query) |
-            Q(autor__nombre__icontains=query) |
-            Q(isbn__icontains=query)
-        )
-    
+
+    libros = Libro.objects.select_related('autor', 'categoria').only(*CAMPOS_TARJETA)
     if categoria_id:
         libros = libros.filter(categoria_id=categoria_id)
-    
+    if query:
+        libros = buscar_libros(libros, query)
+
+    ordering = ordenacion_keyset(libros)
+    posicion = None
+    if request.GET.get('cursor'):
+        try:
+            posicion, _ = decodificar_cursor(Libro, ordering, request.GET['cursor'])
+        except ValueError:
+            raise Http404('Cursor inválido.')
+
+    libros, hay_mas = pagina_keyset(libros, ordering, posicion, LIBROS_POR_PAGINA)
+    url_siguiente = None
+    if hay_mas:
+        params = request.GET.copy()
+        params['cursor'] = codificar_cursor(ordering, libros[-1])
+        url_siguiente = f"{reverse('lista_libros_mas')}?{params.urlencode()}"
+    return libros, url_siguiente
+
+
+@login_required
+@lectura_replica
+def lista_libros(request):
+    query = request.GET.get('q', '')
+    categoria_id = request.GET.get('categoria', '')
+    libros, url_siguiente = _pagina_catalogo(request)
+
     # Obtener todas las categorías para el filtro
-    categorias = Categoria.objects.all()
-    
+    categorias = Categoria.objects.only('id', 'nombre')
+
     context = {
         'libros': libros,
+        'tarjetas': _tarjetas(request, libros),
+        'url_siguiente': url_siguiente,
         'categorias': categorias,
         'query': query,
         'categoria_seleccionada': int(categoria_id) if categoria_id else None
     }
     return render(request, 'libros.html', context)
 
+
+@login_required
+@lectura_replica
+def lista_libros_mas(request):
+    """
+    Fragmento HTML con la siguiente página de tarjetas del catálogo.
+
+    La URL de la página posterior viaja en la cabecera ``X-Siguiente``.
+    """
+    libros, url_siguiente = _pagina_catalogo(request)
+    response = render(request, 'libros/_tarjetas.html', {'libros': libros, 'tarjetas': _tarjetas(request, libros)})
+    if url_siguiente:
+        response['X-Siguiente'] = url_siguiente
+    return response
+
 @login_required
 def crear_libro(request):
     if request.method == 'POST':
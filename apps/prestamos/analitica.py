@@ -0,0 +1,109 @@
+"""
+Consultas de la API de analítica sobre ``ResumenPrestamos``.
+
+Todas filtran por ``(dimension, fecha)``, con índice, y leen como mucho una
+fila por objeto y día del intervalo pedido: el coste no depende del tamaño
+del historial de ``Prestamo``. Los resultados se cachean en el espacio
+``prestamos`` (y en los de los nombres que incluyen) de
+``apps.common.cache_niveles``.
+"""
+from django.db.models import Sum
+from django.db.models.functions import TruncWeek
+
+from apps.autores.models import Autor
+from apps.common.cache_niveles import cacheado
+from apps.libros.models import Categoria, Libro
+
+from .models import ResumenPrestamos
+
+# Espacios de caché de los que dependen las consultas, nombres incluidos
+ESPACIOS = ('prestamos', 'libros', 'categorias', 'autores')
+
+# Modelo y campo con el nombre de los objetos de cada dimensión
+NOMBRES = {
+    ResumenPrestamos.LIBRO: (Libro, 'titulo'),
+    ResumenPrestamos.CATEGORIA: (Categoria, 'nombre'),
+    ResumenPrestamos.AUTOR: (Autor, 'nombre'),
+}
+
+NOMBRE_SIN_CATEGORIA = 'Sin categoría'
+
+
+def _resumenes(dimension, desde, hasta):
+    return ResumenPrestamos.objects.filter(dimension=dimension, fecha__range=(desde, hasta))
+
+
+def _nombres(dimension, ids):
+    modelo, campo = NOMBRES[dimension]
+    nombres = dict(modelo.objects.filter(pk__in=ids).values_list('pk', campo))
+    if dimension == ResumenPrestamos.CATEGORIA:
+        nombres[ResumenPrestamos.SIN_CATEGORIA] = NOMBRE_SIN_CATEGORIA
+    return nombres
+
+
+@cacheado(*ESPACIOS)
+def mas_prestados(dimension, desde, hasta, limite):
+    """Los ``limite`` objetos con más préstamos iniciados en el intervalo."""
+    filas = list(
+        _resumenes(dimension, desde, hasta)
+        .values('objeto_id')
+        .annotate(total=Sum('prestamos'))
+        .filter(total__gt=0)
+        .order_by('-total', 'objeto_id')[:limite]
+    )
+    nombres = _nombres(dimension, [fila['objeto_id'] for fila in filas])
+    return [
+        {'id': fila['objeto_id'], 'nombre': nombres.get(fila['objeto_id']), 'prestamos': fila['total']}
+        for fila in filas
+    ]
+
+
+@cacheado(*ESPACIOS)
+def prestamos_por_semana(dimension, desde, hasta):
+    """Préstamos iniciados por objeto y semana (lunes de cada semana)."""
+    filas = list(
+        _resumenes(dimension, desde, hasta)
+        .annotate(semana=TruncWeek('fecha'))
+        .values('semana', 'objeto_id')
+        .annotate(total=Sum('prestamos'))
+        .filter(total__gt=0)
+        .order_by('semana', '-total', 'objeto_id')
+    )
+    nombres = _nombres(dimension, {fila['objeto_id'] for fila in filas})
+    return [
+        {
+            'semana': fila['semana'],
+            'id': fila['objeto_id'],
+            'nombre': nombres.get(fila['objeto_id']),
+            'prestamos': fila['total'],
+        }
+        for fila in filas
+    ]
+
+
+@cacheado(*ESPACIOS)
+def resumen(dimension, desde, hasta, objeto_id=None):
+    """
+    Totales del intervalo: préstamos, devoluciones, duración media de los
+    préstamos devueltos (días) y proporción de devoluciones con retraso.
+
+    Sin ``objeto_id`` se resume toda la biblioteca (cada préstamo cuenta una
+    sola vez en cualquier dimensión).
+    """
+    resumenes = _resumenes(dimension, desde, hasta)
+    if objeto_id is not None:
+        resumenes = resumenes.filter(objeto_id=objeto_id)
+    totales = resumenes.aggregate(
+        prestamos=Sum('prestamos'),
+        devoluciones=Sum('devoluciones'),
+        dias_prestado=Sum('dias_prestado'),
+        devoluciones_tardias=Sum('devoluciones_tardias'),
+    )
+    totales = {campo: valor or 0 for campo, valor in totales.items()}
+    devoluciones = totales['devoluciones']
+    return {
+        'prestamos': totales['prestamos'],
+        'devoluciones': devoluciones,
+        'duracion_media': round(totales['dias_prestado'] / devoluciones, 2) if devoluciones else None,
+        'tasa_retraso': round(totales['devoluciones_tardias'] / devoluciones, 4) if devoluciones else None,
+    }
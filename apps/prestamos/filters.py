@@ -0,0 +1,15 @@
+from django_filters import rest_framework as django_filters
+from .models import Prestamo
+
+
+class PrestamoFilter(django_filters.FilterSet):
+    """
+    Filtros de ``PrestamoViewSet``, compartidos con la exportación del historial.
+    """
+    desde = django_filters.DateFilter(field_name='fecha_prestamo', lookup_expr='gte')
+    hasta = django_filters.DateFilter(field_name='fecha_prestamo', lookup_expr='lte')
+    devuelto = django_filters.BooleanFilter(field_name='fecha_devolucion', lookup_expr='isnull', exclude=True)
+
+    class Meta:
+        model = Prestamo
+        fields = ['libro', 'usuario', 'desde', 'hasta', 'devuelto']
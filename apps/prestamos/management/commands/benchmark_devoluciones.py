@@ -0,0 +1,76 @@
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.autores.models import Autor
+from apps.libros.models import Libro
+from apps.prestamos.models import ContadorPrestamos, Prestamo, MAX_LIBROS_POR_USUARIO
+from apps.prestamos.services import PrestamoService
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la devolución préstamo a préstamo con la devolución por lotes. '
+        'Los datos sintéticos se crean en una transacción que se revierte al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prestamos', type=int, default=500, help='Préstamos a devolver con cada método')
+        parser.add_argument('--libros', type=int, default=50, help='Libros distintos entre los que se reparten')
+
+    def handle(self, *args, **options):
+        total = options['prestamos']
+        with transaction.atomic():
+            individuales = self._poblar(total, options['libros'], 'uno')
+            lote = self._poblar(total, options['libros'], 'lote')
+
+            inicio = time.perf_counter()
+            for prestamo in Prestamo.objects.filter(pk__in=individuales).select_related('libro'):
+                PrestamoService.devolver_libro(prestamo)
+            tiempo_individual = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            PrestamoService.devolver_prestamos_lote(lote)
+            tiempo_lote = time.perf_counter() - inicio
+
+            self.stdout.write(f'{"método":<12}{"total (ms)":>12}{"por préstamo (ms)":>20}')
+            for nombre, tiempo in (('individual', tiempo_individual), ('lote', tiempo_lote)):
+                self.stdout.write(f'{nombre:<12}{tiempo * 1000:>12.1f}{tiempo * 1000 / total:>20.3f}')
+            self.stdout.write(f'Aceleración: x{tiempo_individual / tiempo_lote:.1f}')
+            transaction.set_rollback(True)
+
+    def _poblar(self, total, num_libros, prefijo):
+        """Crea ``total`` préstamos activos y devuelve sus ids."""
+        autor = Autor.objects.create(nombre=f'Autor benchmark {prefijo}', nacionalidad='Test')
+        Libro.objects.bulk_create(
+            Libro(
+                titulo=f'Benchmark {prefijo} {i}', autor=autor, isbn=f'{prefijo[:1]}{i:012d}',
+                fecha_publicacion=date(2000, 1, 1), stock=0, disponible=False
+            )
+            for i in range(num_libros)
+        )
+        libros = list(Libro.objects.filter(autor=autor).values_list('pk', flat=True))
+
+        num_usuarios = -(-total // MAX_LIBROS_POR_USUARIO)
+        # Sin contraseña: el hash haría el benchmark mucho más lento
+        User.objects.bulk_create(User(username=f'benchmark_{prefijo}_{i}') for i in range(num_usuarios))
+        usuarios = list(
+            User.objects.filter(username__startswith=f'benchmark_{prefijo}_').values_list('pk', flat=True)
+        )
+
+        esperada = date.today() + timedelta(days=7)
+        Prestamo.objects.bulk_create(
+            Prestamo(
+                usuario_id=usuarios[i // MAX_LIBROS_POR_USUARIO],
+                libro_id=libros[i % len(libros)],
+                fecha_devolucion_esperada=esperada
+            )
+            for i in range(total)
+        )
+        ContadorPrestamos.objects.bulk_create(
+            ContadorPrestamos(usuario_id=pk, activos=MAX_LIBROS_POR_USUARIO) for pk in usuarios
+        )
+        return list(Prestamo.objects.filter(libro__autor=autor).values_list('pk', flat=True))
@@ -0,0 +1,82 @@
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.autores.models import Autor
+from apps.common.lectura import EsquemaLectura
+from apps.libros.models import Categoria, Libro
+from apps.prestamos.models import Prestamo
+from apps.prestamos.serializers import PrestamoSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la serialización de préstamos con PrestamoSerializer y con la lectura rápida '
+        'desde filas values_list(). Los datos sintéticos se crean en una transacción que se '
+        'revierte al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prestamos', type=int, default=100, help='Préstamos del historial a serializar')
+        parser.add_argument('--repeticiones', type=int, default=20, help='Ejecuciones por método')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            usuario = self._poblar(options['prestamos'])
+            prestamos = Prestamo.objects.filter(usuario=usuario)
+            esquema = EsquemaLectura(PrestamoSerializer)
+
+            def serializer():
+                return PrestamoSerializer(
+                    prestamos.select_related('usuario', 'libro', 'libro__autor', 'libro__categoria'), many=True
+                ).data
+
+            def lectura_rapida():
+                return esquema.construir_lista(esquema.filas(prestamos))
+
+            if serializer() != lectura_rapida():
+                raise CommandError('La lectura rápida no produce el mismo JSON que el serializer.')
+
+            self.stdout.write(f'{"método":<16}{"mediana (ms)":>14}')
+            tiempos = {}
+            for nombre, funcion in (('serializer', serializer), ('lectura rápida', lectura_rapida)):
+                tiempos[nombre] = self._medir(funcion, options['repeticiones'])
+                self.stdout.write(f'{nombre:<16}{tiempos[nombre]:>14.2f}')
+            self.stdout.write(f'Aceleración: x{tiempos["serializer"] / tiempos["lectura rápida"]:.1f}')
+            transaction.set_rollback(True)
+
+    def _poblar(self, total):
+        autor = Autor.objects.create(
+            nombre='Autor benchmark', nacionalidad='Test', biografia='Biografía extensa. ' * 50
+        )
+        categoria = Categoria.objects.create(nombre='Categoría benchmark')
+        Libro.objects.bulk_create(
+            Libro(
+                titulo=f'Benchmark {i}', autor=autor, categoria=categoria, isbn=f'9{i:012d}',
+                fecha_publicacion=date(2000, 1, 1), descripcion='Descripción. ' * 20
+            )
+            for i in range(total)
+        )
+        libros = list(Libro.objects.filter(autor=autor).values_list('pk', flat=True))
+        usuario = User.objects.create(username='benchmark_serializacion')
+        hoy = date.today()
+        Prestamo.objects.bulk_create(
+            Prestamo(
+                usuario=usuario, libro_id=libro_id,
+                fecha_devolucion_esperada=hoy + timedelta(days=7), fecha_devolucion=hoy
+            )
+            for libro_id in libros
+        )
+        return usuario
+
+    def _medir(self, funcion, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos)
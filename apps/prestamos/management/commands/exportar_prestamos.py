@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.exportacion import FORMATOS, filtrar, generar_exportacion
+from apps.prestamos.filters import PrestamoFilter
+from apps.prestamos.models import Prestamo
+from apps.prestamos.serializers import CAMPOS_EXPORTACION
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta el historial de préstamos en streaming a CSV o NDJSON. Admite los mismos filtros '
+        'que /api/prestamos/ (libro, usuario, desde, hasta, devuelto).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=FORMATOS, default='csv')
+        parser.add_argument('--salida', help='Fichero de salida (por defecto, la salida estándar)')
+        parser.add_argument(
+            '--filtro', action='append', default=[], metavar='CAMPO=VALOR',
+            help='Filtro del listado de la API; se puede repetir (p. ej. --filtro desde=2025-01-01)'
+        )
+
+    def handle(self, *args, **options):
+        if any('=' not in filtro for filtro in options['filtro']):
+            raise CommandError('Los filtros deben tener la forma CAMPO=VALOR.')
+        parametros = dict(filtro.split('=', 1) for filtro in options['filtro'])
+        try:
+            prestamos = filtrar(PrestamoFilter, Prestamo.objects.all(), parametros)
+        except ValueError as e:
+            raise CommandError(f'Filtros no válidos: {e}')
+
+        fragmentos = generar_exportacion(prestamos, CAMPOS_EXPORTACION, options['formato'])
+        if not options['salida']:
+            for fragmento in fragmentos:
+                self.stdout.write(fragmento, ending='')
+            return
+        with open(options['salida'], 'w', encoding='utf-8', newline='') as salida:
+            for fragmento in fragmentos:
+                salida.write(fragmento)
@@ -0,0 +1,25 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.prestamos import resumenes
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los resúmenes diarios de circulación a partir del historial de préstamos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde', metavar='AAAA-MM-DD',
+            help='Solo recalcula los días a partir de esta fecha (por defecto, todo el historial)'
+        )
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['desde']:
+            try:
+                desde = date.fromisoformat(options['desde'])
+            except ValueError:
+                raise CommandError('--desde debe tener el formato AAAA-MM-DD.')
+
+        filas = resumenes.recalcular(desde)
+        self.stdout.write(self.style.SUCCESS(f'{filas} resúmenes diarios escritos.'))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from apps.prestamos.models import ContadorPrestamos, Prestamo
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los contadores de préstamos activos por usuario a partir de Prestamo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Solo informa de las diferencias, sin corregirlas'
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        reales = dict(
+            Prestamo.objects.filter(fecha_devolucion__isnull=True)
+            .values('usuario')
+            .annotate(total=Count('id'))
+            .values_list('usuario', 'total')
+        )
+
+        corregidos = []
+        for contador in ContadorPrestamos.objects.select_for_update().iterator():
+            real = reales.pop(contador.usuario_id, 0)
+            if contador.activos != real:
+                self.stdout.write(f'Usuario {contador.usuario_id}: {contador.activos} -> {real}')
+                contador.activos = real
+                corregidos.append(contador)
+        nuevos = [
+            ContadorPrestamos(usuario_id=usuario_id, activos=total)
+            for usuario_id, total in reales.items()
+        ]
+        for contador in nuevos:
+            self.stdout.write(f'Usuario {contador.usuario_id}: sin contador -> {contador.activos}')
+
+        if options['dry_run']:
+            transaction.set_rollback(True)
+            self.stdout.write(f'{len(corregidos) + len(nuevos)} contadores con diferencias (sin cambios).')
+            return
+
+        ContadorPrestamos.objects.bulk_update(corregidos, ['activos'], batch_size=1000)
+        ContadorPrestamos.objects.bulk_create(nuevos, batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(corregidos)} contadores corregidos, {len(nuevos)} creados.'
+        ))
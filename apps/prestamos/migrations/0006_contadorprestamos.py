@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def poblar_contadores(apps, schema_editor):
+    Prestamo = apps.get_model('prestamos', 'Prestamo')
+    ContadorPrestamos = apps.get_model('prestamos', 'ContadorPrestamos')
+    alias = schema_editor.connection.alias
+    activos = (
+        Prestamo.objects.using(alias)
+        .filter(fecha_devolucion__isnull=True)
+        .values('usuario')
+        .annotate(total=models.Count('id'))
+    )
+    ContadorPrestamos.objects.using(alias).bulk_create(
+        [ContadorPrestamos(usuario_id=fila['usuario'], activos=fila['total']) for fila in activos],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('prestamos', '0005_remove_devuelto_field'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorPrestamos',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='contador_prestamos', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('activos', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contador de préstamos',
+                'verbose_name_plural': 'Contadores de préstamos',
+            },
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
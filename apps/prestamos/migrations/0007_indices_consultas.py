@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('libros', '0007_indices_consultas'),
+        ('prestamos', '0006_contadorprestamos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['usuario', '-fecha_prestamo'], name='prestamo_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['usuario', 'fecha_devolucion'], name='prestamo_usuario_devol_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(condition=models.Q(('fecha_devolucion__isnull', True)), fields=['usuario', '-fecha_prestamo'], name='prestamo_activo_idx'),
+        ),
+    ]
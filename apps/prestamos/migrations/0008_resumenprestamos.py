@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prestamos', '0007_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenPrestamos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('libro', 'Libro'), ('categoria', 'Categoría'), ('autor', 'Autor')], max_length=10)),
+                ('objeto_id', models.PositiveIntegerField()),
+                ('fecha', models.DateField()),
+                ('prestamos', models.PositiveIntegerField(default=0)),
+                ('devoluciones', models.PositiveIntegerField(default=0)),
+                ('dias_prestado', models.PositiveIntegerField(default=0)),
+                ('devoluciones_tardias', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Resumen diario de préstamos',
+                'verbose_name_plural': 'Resúmenes diarios de préstamos',
+                'indexes': [models.Index(fields=['dimension', 'fecha'], name='resumen_dimension_fecha_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'objeto_id', 'fecha'), name='resumen_dimension_objeto_fecha')],
+            },
+        ),
+    ]
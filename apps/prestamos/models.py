@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import User
 from apps.libros.models import Libro
 from django.utils import timezone
@@ -20,6 +21,19 @@ class Prestamo(models.Model):
         ordering = ['-fecha_prestamo']
         verbose_name = 'Préstamo'
         verbose_name_plural = 'Préstamos'
+        indexes = [
+            # Listado e historial del usuario ordenados por fecha de préstamo
+            models.Index(fields=['usuario', '-fecha_prestamo'], name='prestamo_usuario_fecha_idx'),
+            # Activos (IS NULL) y devueltos ordenados por fecha de devolución
+            models.Index(fields=['usuario', 'fecha_devolucion'], name='prestamo_usuario_devol_idx'),
+            # Solo préstamos activos; MySQL no admite índices parciales y
+            # recurre a prestamo_usuario_devol_idx
+            models.Index(
+                fields=['usuario', '-fecha_prestamo'],
+                condition=models.Q(fecha_devolucion__isnull=True),
+                name='prestamo_activo_idx',
+            ),
+        ]
     
     def __str__(self):
         return f'Préstamo de {self.libro.titulo} a {self.usuario.username}'
@@ -30,10 +44,7 @@ class Prestamo(models.Model):
     
     @classmethod
     def libros_prestados_por_usuario(cls, usuario):
-        return cls.objects.filter(
-            usuario=usuario,
-            fecha_devolucion__isnull=True
-        ).count()
+        return ContadorPrestamos.activos_de(usuario)
 
     def clean(self):
         # Mantenemos validaciones básicas para compatibilidad con el Admin
@@ -51,3 +62,100 @@ class Prestamo(models.Model):
     def save(self, *args, **kwargs):
         self.full_clean()
         super().save(*args, **kwargs)
+
+
+class ContadorPrestamos(models.Model):
+    """
+    Número de préstamos activos de cada usuario.
+
+    Los guardados y borrados individuales de ``Prestamo`` (también desde el
+    admin) lo mantienen mediante señales (``apps.prestamos.signals``); las
+    escrituras por conjuntos (``bulk_create``, ``update()``) lo ajustan
+    desde ``PrestamoService``, en la misma transacción.
+
+    Evita contar ``Prestamo`` en cada operación y permite aplicar
+    ``MAX_LIBROS_POR_USUARIO`` con un UPDATE condicional. Se puede
+    reconstruir con ``manage.py reconciliar_prestamos``.
+    """
+    usuario = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='contador_prestamos'
+    )
+    activos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Contador de préstamos'
+        verbose_name_plural = 'Contadores de préstamos'
+
+    def __str__(self):
+        return f'{self.usuario.username}: {self.activos}'
+
+    @classmethod
+    def activos_de(cls, usuario):
+        activos = cls.objects.filter(usuario=usuario).values_list('activos', flat=True).first()
+        return activos or 0
+
+    @classmethod
+    def sumar(cls, usuario_id, cantidad):
+        """
+        Suma ``cantidad`` (positiva o negativa) a los préstamos activos del
+        usuario con un UPDATE, que bloquea su fila hasta el final de la
+        transacción. Nunca baja de cero: un contador desviado por debajo de
+        la cantidad queda en cero en lugar de conservar su valor.
+        """
+        contador = cls.objects.filter(usuario_id=usuario_id)
+        if cantidad < 0:
+            contador.update(activos=Greatest(models.F('activos') + cantidad, 0))
+        elif not contador.update(activos=models.F('activos') + cantidad):
+            # Primer préstamo del usuario: aún no tiene fila de contador
+            cls.objects.get_or_create(usuario_id=usuario_id)
+            contador.update(activos=models.F('activos') + cantidad)
+
+
+class ResumenPrestamos(models.Model):
+    """
+    Agregados diarios de circulación por libro, categoría y autor,
+    mantenidos por ``apps.prestamos.resumenes`` en las mismas transacciones
+    que los préstamos y devoluciones, incluidos los que se crean, editan o
+    borran desde el admin (señales de ``Prestamo``).
+
+    Las estadísticas de la API de analítica se calculan sobre esta tabla,
+    nunca sobre ``Prestamo``. Se puede reconstruir con
+    ``manage.py recalcular_resumenes``.
+    """
+    LIBRO = 'libro'
+    CATEGORIA = 'categoria'
+    AUTOR = 'autor'
+    DIMENSIONES = [
+        (LIBRO, 'Libro'),
+        (CATEGORIA, 'Categoría'),
+        (AUTOR, 'Autor'),
+    ]
+    # objeto_id de los libros sin categoría
+    SIN_CATEGORIA = 0
+
+    dimension = models.CharField(max_length=10, choices=DIMENSIONES)
+    objeto_id = models.PositiveIntegerField()
+    fecha = models.DateField()
+    # Préstamos iniciados ese día
+    prestamos = models.PositiveIntegerField(default=0)
+    # Devoluciones registradas ese día, su duración total y cuántas con retraso
+    devoluciones = models.PositiveIntegerField(default=0)
+    dias_prestado = models.PositiveIntegerField(default=0)
+    devoluciones_tardias = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Resumen diario de préstamos'
+        verbose_name_plural = 'Resúmenes diarios de préstamos'
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'objeto_id', 'fecha'], name='resumen_dimension_objeto_fecha'),
+        ]
+        indexes = [
+            # Rankings y series de un intervalo de fechas
+            models.Index(fields=['dimension', 'fecha'], name='resumen_dimension_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.dimension} {self.objeto_id} {self.fecha}: {self.prestamos} préstamos'
@@ -0,0 +1,178 @@
+"""
+Resúmenes diarios de circulación (``ResumenPrestamos``).
+
+Cada préstamo suma en el día en que empieza y cada devolución en el día en
+que se registra, en tres dimensiones: su libro, su categoría y su autor.
+Los guardados y borrados individuales de ``Prestamo`` (también desde el
+admin o ``DELETE /api/prestamos/{id}/``) llaman a ``registrar_cambio``
+mediante señales (``apps.prestamos.signals``); las escrituras por conjuntos
+de ``PrestamoService`` llaman a ``registrar_prestamos`` y
+``registrar_devoluciones`` dentro de sus transacciones. Los incrementos se
+aplican con un ``INSERT`` que ignora las filas ya existentes y un ``UPDATE``
+por cada combinación distinta de incrementos, sin leer los valores previos.
+Toda escritura invalida el espacio ``prestamos`` de la caché, del que
+dependen las consultas cacheadas de ``analitica``.
+"""
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from apps.common import cache_respuestas
+
+from .models import Prestamo, ResumenPrestamos
+
+CAMPOS = ('prestamos', 'devoluciones', 'dias_prestado', 'devoluciones_tardias')
+
+# Filas insertadas por consulta al recalcular
+TAMANO_LOTE = 1000
+
+
+def _claves(fila, fecha):
+    libro_id, categoria_id, autor_id = fila
+    return (
+        (ResumenPrestamos.LIBRO, libro_id, fecha),
+        (ResumenPrestamos.CATEGORIA, categoria_id or ResumenPrestamos.SIN_CATEGORIA, fecha),
+        (ResumenPrestamos.AUTOR, autor_id, fecha),
+    )
+
+
+def _acumular(deltas, claves, valores):
+    for clave in claves:
+        actuales = deltas.get(clave, (0, 0, 0, 0))
+        deltas[clave] = tuple(a + b for a, b in zip(actuales, valores))
+
+
+def _aportar(deltas, estado, signo=1, desde=date.min):
+    # estado: (libro_id, categoria_id, autor_id, fecha_prestamo,
+    # fecha_devolucion_esperada, fecha_devolucion)
+    *relaciones, inicio, esperada, devolucion = estado
+    if inicio >= desde:
+        _acumular(deltas, _claves(relaciones, inicio), (signo, 0, 0, 0))
+    if devolucion is not None and devolucion >= desde:
+        _acumular(
+            deltas, _claves(relaciones, devolucion),
+            (0, signo, signo * (devolucion - inicio).days, signo * int(devolucion > esperada))
+        )
+
+
+def registrar_cambio(antes, despues):
+    """
+    Ajusta los resúmenes a un préstamo creado, modificado o borrado.
+
+    Args:
+        antes, despues: ``None`` (el préstamo no existía o ya no existe) o
+            ``(libro_id, categoria_id, autor_id, fecha_prestamo,
+            fecha_devolucion_esperada, fecha_devolucion)``
+    """
+    deltas = {}
+    for estado, signo in ((antes, -1), (despues, 1)):
+        if estado is not None:
+            _aportar(deltas, estado, signo)
+    aplicar(deltas)
+
+
+def registrar_prestamos(prestamos):
+    """
+    Suma préstamos nuevos a los resúmenes.
+
+    Args:
+        prestamos: Iterable de ``(libro_id, categoria_id, autor_id, fecha_prestamo)``
+    """
+    deltas = {}
+    for libro_id, categoria_id, autor_id, fecha_prestamo in prestamos:
+        _acumular(deltas, _claves((libro_id, categoria_id, autor_id), fecha_prestamo), (1, 0, 0, 0))
+    aplicar(deltas)
+
+
+def registrar_devoluciones(devoluciones):
+    """
+    Suma devoluciones a los resúmenes.
+
+    Args:
+        devoluciones: Iterable de ``(libro_id, categoria_id, autor_id,
+            fecha_prestamo, fecha_devolucion_esperada, fecha_devolucion)``
+    """
+    deltas = {}
+    for libro_id, categoria_id, autor_id, inicio, esperada, devolucion in devoluciones:
+        _acumular(
+            deltas, _claves((libro_id, categoria_id, autor_id), devolucion),
+            (0, 1, (devolucion - inicio).days, int(devolucion > esperada))
+        )
+    aplicar(deltas)
+
+
+def aplicar(deltas):
+    """
+    Aplica incrementos ``{(dimension, objeto_id, fecha): (prestamos,
+    devoluciones, dias_prestado, devoluciones_tardias)}``.
+    """
+    # Un cambio que no altera los valores (p. ej. editar la fecha esperada
+    # sin devolución) se anula a sí mismo
+    deltas = {clave: valores for clave, valores in deltas.items() if any(valores)}
+    if not deltas:
+        return
+    # Crear las filas que falten: una consulta que no choca con las existentes
+    ResumenPrestamos.objects.bulk_create(
+        [ResumenPrestamos(dimension=d, objeto_id=o, fecha=f) for d, o, f in deltas],
+        ignore_conflicts=True
+    )
+    por_valores = defaultdict(list)
+    for clave, valores in deltas.items():
+        por_valores[valores].append(clave)
+    for valores, claves in por_valores.items():
+        filtro = Q()
+        for dimension, objeto_id, fecha in claves:
+            filtro |= Q(dimension=dimension, objeto_id=objeto_id, fecha=fecha)
+        # Los descuentos (préstamos borrados) nunca dejan un valor negativo
+        ResumenPrestamos.objects.filter(filtro).update(**{
+            campo: F(campo) + valor if valor > 0 else Greatest(F(campo) + valor, 0)
+            for campo, valor in zip(CAMPOS, valores) if valor
+        })
+    cache_respuestas.invalidar(Prestamo)
+
+
+def calcular(desde=None):
+    """
+    Recalcula los resúmenes desde ``Prestamo`` recorriéndolo en streaming.
+
+    Returns:
+        Diccionario ``{(dimension, objeto_id, fecha): valores}`` con los días
+        a partir de ``desde`` (todos si es ``None``)
+    """
+    prestamos = Prestamo.objects.order_by()
+    if desde is not None:
+        prestamos = prestamos.filter(Q(fecha_prestamo__gte=desde) | Q(fecha_devolucion__gte=desde))
+    filas = prestamos.values_list(
+        'libro_id', 'libro__categoria_id', 'libro__autor_id',
+        'fecha_prestamo', 'fecha_devolucion_esperada', 'fecha_devolucion',
+    ).iterator(chunk_size=5000)
+
+    deltas = {}
+    for estado in filas:
+        _aportar(deltas, estado, desde=desde or date.min)
+    return deltas
+
+
+@transaction.atomic
+def recalcular(desde=None):
+    """
+    Sustituye los resúmenes a partir de ``desde`` por los calculados desde
+    ``Prestamo``. Devuelve el número de filas escritas.
+    """
+    deltas = calcular(desde)
+    existentes = ResumenPrestamos.objects.all()
+    if desde is not None:
+        existentes = existentes.filter(fecha__gte=desde)
+    existentes.delete()
+    ResumenPrestamos.objects.bulk_create(
+        (
+            ResumenPrestamos(dimension=d, objeto_id=o, fecha=f, **dict(zip(CAMPOS, valores)))
+            for (d, o, f), valores in deltas.items()
+        ),
+        batch_size=TAMANO_LOTE
+    )
+    cache_respuestas.invalidar(Prestamo)
+    return len(deltas)
@@ -1,12 +1,33 @@
 from rest_framework import serializers
 from django.core.exceptions import ValidationError
-from .models import Prestamo, MAX_LIBROS_POR_USUARIO
+from django.utils import timezone
+from .models import Prestamo, ResumenPrestamos, MAX_LIBROS_POR_USUARIO
 from django.contrib.auth.models import User
 from apps.libros.models import Libro
 from apps.libros.serializers import LibroSerializer
 from .services import PrestamoService
 from apps.common.exceptions import BibliotecaBaseError
 
+# Máximo de elementos aceptados en una solicitud de préstamo por lotes
+MAX_LIBROS_POR_LOTE = 20
+# Máximo de préstamos aceptados en una devolución por lotes (buzón)
+MAX_DEVOLUCIONES_POR_LOTE = 1000
+# Intervalo por defecto y tamaño máximo de los rankings de la API de analítica
+DIAS_ESTADISTICAS = 30
+MAX_LIMITE_ESTADISTICAS = 100
+
+# Columnas de la exportación del historial: (columna, campo del ORM)
+CAMPOS_EXPORTACION = (
+    ('id', 'id'),
+    ('usuario', 'usuario__username'),
+    ('libro_id', 'libro_id'),
+    ('libro', 'libro__titulo'),
+    ('isbn', 'libro__isbn'),
+    ('fecha_prestamo', 'fecha_prestamo'),
+    ('fecha_devolucion_esperada', 'fecha_devolucion_esperada'),
+    ('fecha_devolucion', 'fecha_devolucion'),
+)
+
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -43,3 +64,49 @@ class PrestamoSerializer(serializers.ModelSerializer):
             return PrestamoService.devolver_libro(instance)
         except ValidationError as e:
             raise serializers.ValidationError(e.message_dict if hasattr(e, 'message_dict') else e.messages)
+
+
+class PrestamoLoteSerializer(serializers.Serializer):
+    """Datos de entrada para prestar varios libros a la vez."""
+    libro_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=MAX_LIBROS_POR_LOTE
+    )
+    dias_prestamo = serializers.IntegerField(required=False, default=7, min_value=1)
+    todo_o_nada = serializers.BooleanField(
+        required=False,
+        default=True,
+        help_text='Si es falso, se prestan los libros válidos y se informa del resto.'
+    )
+
+
+class DevolucionLoteSerializer(serializers.Serializer):
+    """Datos de entrada para devolver varios préstamos a la vez."""
+    prestamo_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=MAX_DEVOLUCIONES_POR_LOTE
+    )
+
+
+class EstadisticasSerializer(serializers.Serializer):
+    """
+    Parámetros de la API de analítica. Por defecto, los últimos
+    ``DIAS_ESTADISTICAS`` días hasta hoy.
+    """
+    dimension = serializers.ChoiceField(choices=ResumenPrestamos.DIMENSIONES, required=False)
+    id = serializers.IntegerField(required=False, min_value=0)
+    desde = serializers.DateField(required=False)
+    hasta = serializers.DateField(required=False)
+    limite = serializers.IntegerField(required=False, default=10, min_value=1, max_value=MAX_LIMITE_ESTADISTICAS)
+
+    def validate(self, datos):
+        datos.setdefault('hasta', timezone.now().date())
+        datos.setdefault('desde', datos['hasta'] - timezone.timedelta(days=DIAS_ESTADISTICAS - 1))
+        if datos['desde'] > datos['hasta']:
+            raise serializers.ValidationError({'desde': 'Debe ser anterior o igual a hasta.'})
+        if 'id' in datos and 'dimension' not in datos:
+            raise serializers.ValidationError({'dimension': 'Indique la dimensión del id.'})
+        return datos
+
@@ -1,7 +1,14 @@
+from collections import Counter
+
 from django.utils import timezone
 from django.db import transaction
-from .models import Prestamo, MAX_LIBROS_POR_USUARIO
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.core.exceptions import ValidationError
+from .models import ContadorPrestamos, Prestamo, MAX_LIBROS_POR_USUARIO
+from . import resumenes
 from apps.libros.models import Libro
+from apps.libros.services import LibroService
 from apps.common.exceptions import BusinessLogicError, ResourceNotFoundError
 
 class PrestamoService:
@@ -11,37 +18,147 @@ class PrestamoService:
         """
         Crea un nuevo préstamo validando disponibilidad y límites.
         """
-        # 1. Validar disponibilidad del libro
+        # 1. Validar disponibilidad del libro (rechazo rápido; la reserva real
+        #    se decide en el paso 6 con un UPDATE condicional)
         if not libro.disponible or libro.stock <= 0:
             raise BusinessLogicError(f'El libro "{libro.titulo}" no está disponible.')
 
-        # 2. Validar límite de préstamos del usuario
-        prestamos_activos = Prestamo.objects.filter(
-            usuario=usuario,
-            fecha_devolucion__isnull=True
-        ).count()
-        
-        if prestamos_activos >= MAX_LIBROS_POR_USUARIO:
+        # 2. Validar límite de préstamos del usuario (rechazo rápido; el cupo
+        #    se comprueba de nuevo en el paso 5, con el contador bloqueado)
+        if ContadorPrestamos.activos_de(usuario) >= MAX_LIBROS_POR_USUARIO:
             raise BusinessLogicError(f'El usuario ha alcanzado el límite de {MAX_LIBROS_POR_USUARIO} préstamos.')
 
         # 3. Calcular fecha de devolución esperada
         fecha_esperada = timezone.now().date() + timezone.timedelta(days=dias_prestamo)
 
-        # 4. Crear el préstamo
+        # 4. Crear el préstamo; la señal post_save lo suma al contador del
+        #    usuario (dejando su fila bloqueada hasta el final de la
+        #    transacción) y a los resúmenes de circulación
         prestamo = Prestamo.objects.create(
             usuario=usuario,
             libro=libro,
             fecha_devolucion_esperada=fecha_esperada
         )
 
-        # 5. Actualizar stock del libro
-        libro.stock -= 1
-        if libro.stock == 0:
-            libro.disponible = False
-        libro.save()
+        # 5. Si un préstamo simultáneo agotó el cupo, se revierte
+        if ContadorPrestamos.activos_de(usuario) > MAX_LIBROS_POR_USUARIO:
+            raise BusinessLogicError(f'El usuario ha alcanzado el límite de {MAX_LIBROS_POR_USUARIO} préstamos.')
+
+        # 6. Reservar el ejemplar: si otro préstamo se llevó el último,
+        #    la transacción se revierte y el préstamo no se crea
+        try:
+            LibroService.actualizar_stock(libro, -1)
+        except ValidationError:
+            raise BusinessLogicError(f'El libro "{libro.titulo}" no está disponible.')
 
         return prestamo
 
+    @staticmethod
+    @transaction.atomic
+    def crear_prestamos_lote(usuario, libro_ids, dias_prestamo=7, todo_o_nada=True):
+        """
+        Presta varios libros a un usuario en una sola transacción.
+
+        Los libros se bloquean en orden de ``id`` (el mismo para cualquier lote,
+        así dos lotes concurrentes no se interbloquean), el límite del usuario
+        se comprueba una sola vez, los préstamos se insertan con un único
+        INSERT de varias filas y el stock se descuenta por conjuntos.
+
+        Args:
+            usuario: Usuario que recibe los préstamos
+            libro_ids: Lista de ids de libros, en el orden de la solicitud
+            dias_prestamo: Días hasta la devolución esperada
+            todo_o_nada: Si es ``True``, cualquier elemento rechazado anula el
+                lote completo; si es ``False``, se prestan los válidos
+
+        Returns:
+            Lista de resultados en el orden de ``libro_ids``: diccionarios con
+            ``libro_id`` y ``prestamo`` (creado) o ``error`` (rechazado)
+
+        Raises:
+            BusinessLogicError: Con ``todo_o_nada``, si algún elemento es
+                rechazado; ``extra['resultados']`` detalla cada uno
+        """
+        # 1. Bloquear los libros en un orden consistente
+        libros = {
+            libro.pk: libro
+            for libro in Libro.objects.select_for_update().filter(pk__in=libro_ids).order_by('pk')
+        }
+
+        # 2. Bloquear el contador del usuario y calcular su cupo una sola vez
+        ContadorPrestamos.objects.get_or_create(usuario=usuario)
+        contador = ContadorPrestamos.objects.select_for_update().get(usuario=usuario)
+        cupo = MAX_LIBROS_POR_USUARIO - contador.activos
+
+        # 3. Validar cada elemento
+        fecha_esperada = timezone.now().date() + timezone.timedelta(days=dias_prestamo)
+        resultados = []
+        nuevos = []
+        vistos = set()
+        for libro_id in libro_ids:
+            libro = libros.get(libro_id)
+            if libro is None:
+                error = 'El libro especificado no existe.'
+            elif libro_id in vistos:
+                error = 'El libro está repetido en la solicitud.'
+            elif not libro.disponible or libro.stock <= 0:
+                error = f'El libro "{libro.titulo}" no está disponible.'
+            elif len(nuevos) >= cupo:
+                error = f'El usuario ha alcanzado el límite de {MAX_LIBROS_POR_USUARIO} préstamos.'
+            else:
+                error = None
+            vistos.add(libro_id)
+
+            if error:
+                resultados.append({'libro_id': libro_id, 'error': error})
+                continue
+            prestamo = Prestamo(usuario=usuario, libro=libro, fecha_devolucion_esperada=fecha_esperada)
+            nuevos.append(prestamo)
+            resultados.append({'libro_id': libro_id, 'prestamo': prestamo})
+
+        if todo_o_nada and len(nuevos) < len(libro_ids):
+            raise BusinessLogicError(
+                'No se realizó ningún préstamo del lote.',
+                extra={'resultados': [r for r in resultados if 'error' in r]}
+            )
+        if not nuevos:
+            return resultados
+
+        # 4. Insertar todos los préstamos de una vez (sin full_clean por fila:
+        #    las validaciones ya se hicieron arriba)
+        creados = Prestamo.objects.bulk_create(nuevos)
+        if creados[0].pk is None:
+            # Motores que no devuelven ids en inserciones múltiples (MySQL):
+            # el contador bloqueado garantiza que son los últimos del usuario
+            ids = Prestamo.objects.filter(usuario=usuario).order_by('-pk').values_list('pk', flat=True)
+            for prestamo, pk in zip(creados, reversed(list(ids[:len(creados)]))):
+                prestamo.pk = pk
+
+        # 5. Reservar el cupo y los ejemplares; cualquier conflicto revierte
+        #    el lote completo
+        if not ContadorPrestamos.objects.filter(
+            usuario=usuario,
+            activos__lte=MAX_LIBROS_POR_USUARIO - len(creados)
+        ).update(activos=F('activos') + len(creados)):
+            raise BusinessLogicError(f'El usuario ha alcanzado el límite de {MAX_LIBROS_POR_USUARIO} préstamos.')
+        try:
+            LibroService.actualizar_stock_lote({p.libro_id: -1 for p in creados})
+        except ValidationError:
+            raise BusinessLogicError('Alguno de los libros del lote ya no está disponible.')
+
+        for pk, stock, disponible in Libro.objects.filter(
+            pk__in=[p.libro_id for p in creados]
+        ).values_list('pk', 'stock', 'disponible'):
+            libros[pk].stock, libros[pk].disponible = stock, disponible
+
+        # 6. Estadísticas de circulación
+        resumenes.registrar_prestamos(
+            (p.libro_id, libros[p.libro_id].categoria_id, libros[p.libro_id].autor_id, p.fecha_prestamo)
+            for p in creados
+        )
+
+        return resultados
+
     @staticmethod
     @transaction.atomic
     def devolver_libro(prestamo):
@@ -51,14 +168,106 @@ class PrestamoService:
         if prestamo.devuelto:
             raise BusinessLogicError('Este libro ya fue devuelto.')
 
-        # 1. Registrar fecha de devolución
-        prestamo.fecha_devolucion = timezone.now().date()
-        prestamo.save()
+        # 1. Registrar fecha de devolución solo si sigue pendiente, para que
+        #    dos devoluciones simultáneas no repongan el stock dos veces
+        hoy = timezone.now().date()
+        actualizados = Prestamo.objects.filter(
+            pk=prestamo.pk,
+            fecha_devolucion__isnull=True
+        ).update(fecha_devolucion=hoy)
+        if not actualizados:
+            raise BusinessLogicError('Este libro ya fue devuelto.')
+        prestamo.fecha_devolucion = hoy
+
+        # 2. Liberar el cupo del usuario
+        ContadorPrestamos.sumar(prestamo.usuario_id, -1)
 
-        # 2. Restaurar stock
+        # 3. Restaurar stock
         libro = prestamo.libro
-        libro.stock += 1
-        libro.disponible = True
-        libro.save()
+        LibroService.actualizar_stock(libro, 1)
+
+        # 4. Estadísticas de circulación
+        resumenes.registrar_devoluciones([(
+            libro.pk, libro.categoria_id, libro.autor_id,
+            prestamo.fecha_prestamo, prestamo.fecha_devolucion_esperada, hoy
+        )])
 
         return prestamo
+
+    @staticmethod
+    @transaction.atomic
+    def devolver_prestamos_lote(prestamo_ids, usuario=None):
+        """
+        Procesa la devolución de muchos préstamos con actualizaciones por
+        conjuntos: un UPDATE para los préstamos, uno por cada cantidad
+        distinta para contadores y stock, y otro para la disponibilidad.
+
+        Args:
+            prestamo_ids: Ids de los préstamos a devolver
+            usuario: Si se indica, solo se aceptan préstamos de ese usuario
+
+        Returns:
+            Diccionario con ``devueltos`` (ids devueltos) y ``rechazados``
+            (lista de ``{'prestamo_id', 'error'}``)
+        """
+        prestamos = Prestamo.objects.filter(pk__in=prestamo_ids)
+        if usuario is not None:
+            prestamos = prestamos.filter(usuario=usuario)
+        encontrados = {
+            pk: (usuario_id, libro_id, fecha_devolucion, fecha_prestamo, fecha_esperada)
+            for pk, usuario_id, libro_id, fecha_devolucion, fecha_prestamo, fecha_esperada
+            in prestamos.select_for_update().order_by('pk').values_list(
+                'pk', 'usuario_id', 'libro_id', 'fecha_devolucion',
+                'fecha_prestamo', 'fecha_devolucion_esperada'
+            )
+        }
+
+        pendientes = []
+        rechazados = []
+        for prestamo_id in dict.fromkeys(prestamo_ids):
+            if prestamo_id not in encontrados:
+                rechazados.append({'prestamo_id': prestamo_id, 'error': 'El préstamo especificado no existe.'})
+            elif encontrados[prestamo_id][2] is not None:
+                rechazados.append({'prestamo_id': prestamo_id, 'error': 'Este libro ya fue devuelto.'})
+            else:
+                pendientes.append(prestamo_id)
+        if not pendientes:
+            return {'devueltos': [], 'rechazados': rechazados}
+
+        # 1. Registrar la devolución de todos los préstamos a la vez; si otra
+        #    devolución se adelantó a alguno, se revierte el lote
+        hoy = timezone.now().date()
+        actualizados = Prestamo.objects.filter(
+            pk__in=pendientes,
+            fecha_devolucion__isnull=True
+        ).update(fecha_devolucion=hoy)
+        if actualizados != len(pendientes):
+            raise BusinessLogicError('Alguno de los préstamos ya fue devuelto. Inténtelo de nuevo.')
+
+        # 2. Liberar los cupos, agrupando a los usuarios por cantidad devuelta
+        por_usuario = Counter(encontrados[pk][0] for pk in pendientes)
+        por_cantidad = {}
+        for usuario_id, cantidad in por_usuario.items():
+            por_cantidad.setdefault(cantidad, []).append(usuario_id)
+        for cantidad, usuario_ids in por_cantidad.items():
+            # Un contador desviado por debajo de la cantidad queda en cero
+            ContadorPrestamos.objects.filter(usuario_id__in=usuario_ids).update(
+                activos=Greatest(F('activos') - cantidad, 0)
+            )
+
+        # 3. Restaurar stock y disponibilidad
+        LibroService.actualizar_stock_lote(Counter(encontrados[pk][1] for pk in pendientes))
+
+        # 4. Estadísticas de circulación
+        relaciones = {
+            pk: (categoria_id, autor_id)
+            for pk, categoria_id, autor_id in Libro.objects.filter(
+                pk__in={encontrados[pk][1] for pk in pendientes}
+            ).values_list('pk', 'categoria_id', 'autor_id')
+        }
+        resumenes.registrar_devoluciones(
+            (libro_id, *relaciones[libro_id], fecha_prestamo, fecha_esperada, hoy)
+            for _, libro_id, _, fecha_prestamo, fecha_esperada in (encontrados[pk] for pk in pendientes)
+        )
+
+        return {'devueltos': pendientes, 'rechazados': rechazados}
@@ -0,0 +1,63 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from .models import ContadorPrestamos, Prestamo
+from . import resumenes
+
+# Estado de un préstamo para el contador y los resúmenes:
+# (usuario_id, libro_id, categoria_id, autor_id, fecha_prestamo,
+#  fecha_devolucion_esperada, fecha_devolucion)
+CAMPOS_ESTADO = (
+    'usuario_id', 'libro_id', 'libro__categoria_id', 'libro__autor_id',
+    'fecha_prestamo', 'fecha_devolucion_esperada', 'fecha_devolucion',
+)
+
+
+def _estado(prestamo):
+    libro = prestamo.libro
+    return (
+        prestamo.usuario_id, prestamo.libro_id, libro.categoria_id, libro.autor_id,
+        prestamo.fecha_prestamo, prestamo.fecha_devolucion_esperada, prestamo.fecha_devolucion,
+    )
+
+
+def _activo(estado):
+    # Usuario del préstamo si sigue activo; None si está devuelto o no existe
+    return estado[0] if estado is not None and estado[-1] is None else None
+
+
+def _registrar_cambio(antes, despues):
+    activo_antes, activo_despues = _activo(antes), _activo(despues)
+    if activo_antes != activo_despues:
+        if activo_antes is not None:
+            ContadorPrestamos.sumar(activo_antes, -1)
+        if activo_despues is not None:
+            ContadorPrestamos.sumar(activo_despues, 1)
+    if antes != despues:
+        resumenes.registrar_cambio(antes and antes[1:], despues and despues[1:])
+
+
+@receiver(pre_save, sender=Prestamo)
+@receiver(pre_delete, sender=Prestamo)
+def recordar_estado_prestamo(sender, instance, raw=False, **kwargs):
+    """
+    Guarda el estado de la base de datos para el contador y los resúmenes:
+    la instancia puede estar desactualizada (las devoluciones usan
+    ``update()``).
+    """
+    if raw or instance._state.adding:
+        return
+    instance._estado_contador = Prestamo.objects.filter(pk=instance.pk).values_list(*CAMPOS_ESTADO).first()
+
+
+@receiver(post_save, sender=Prestamo)
+def contar_prestamo(sender, instance, raw=False, created=False, **kwargs):
+    if raw:
+        return
+    antes = None if created else instance.__dict__.pop('_estado_contador', None)
+    _registrar_cambio(antes, _estado(instance))
+
+
+@receiver(post_delete, sender=Prestamo)
+def descontar_prestamo(sender, instance, **kwargs):
+    antes = instance.__dict__.pop('_estado_contador', None) or _estado(instance)
+    _registrar_cambio(antes, None)
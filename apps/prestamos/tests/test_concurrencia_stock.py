@@ -0,0 +1,100 @@
+import random
+import threading
+import time
+import pytest
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from apps.common.exceptions import BusinessLogicError
+from apps.libros.models import Libro
+from apps.autores.models import Autor
+from apps.prestamos.models import Prestamo
+from apps.prestamos.services import PrestamoService
+
+STOCK_INICIAL = 3
+HILOS = 8
+# Segundos que un hilo sigue reintentando antes de dar la prueba por fallida
+PLAZO_REINTENTOS = 10
+
+
+def _reintentar(operacion):
+    # SQLite serializa las escrituras: un hilo bloqueado reintenta en vez de
+    # fallar, pero solo hasta PLAZO_REINTENTOS para no colgar la prueba
+    limite = time.monotonic() + PLAZO_REINTENTOS
+    while True:
+        try:
+            return operacion()
+        except OperationalError:
+            if time.monotonic() >= limite:
+                raise
+            time.sleep(random.uniform(0, 0.02))
+
+
+def _en_paralelo(objetivos):
+    barrera = threading.Barrier(len(objetivos))
+
+    def ejecutar(objetivo):
+        try:
+            barrera.wait()
+            objetivo()
+        finally:
+            connection.close()
+
+    hilos = [threading.Thread(target=ejecutar, args=(objetivo,)) for objetivo in objetivos]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrenciaStock:
+    @pytest.fixture
+    def setup_data(self):
+        autor = Autor.objects.create(nombre="Autor Test", nacionalidad="Test")
+        libro = Libro.objects.create(
+            titulo="Libro Disputado", autor=autor, isbn="1234567890123",
+            fecha_publicacion="2020-01-01", stock=STOCK_INICIAL
+        )
+        usuarios = [User.objects.create_user(username=f"lector{i}") for i in range(HILOS)]
+        return libro, usuarios
+
+    def test_checkouts_simultaneos_no_sobrevenden(self, setup_data):
+        libro, usuarios = setup_data
+        exitos, rechazos = [], []
+
+        def prestar(usuario, copia):
+            try:
+                exitos.append(_reintentar(lambda: PrestamoService.crear_prestamo(usuario, copia)))
+            except BusinessLogicError:
+                rechazos.append(usuario)
+
+        # Cada hilo parte de una copia del libro leída antes de competir,
+        # que queda obsoleta en cuanto otro hilo presta un ejemplar
+        copias = [Libro.objects.get(pk=libro.pk) for _ in usuarios]
+        _en_paralelo([lambda u=u, c=c: prestar(u, c) for u, c in zip(usuarios, copias)])
+
+        libro.refresh_from_db()
+        assert len(exitos) == STOCK_INICIAL
+        assert len(rechazos) == HILOS - STOCK_INICIAL
+        assert libro.stock == 0
+        assert libro.disponible is False
+        assert Prestamo.objects.filter(libro=libro, fecha_devolucion__isnull=True).count() == STOCK_INICIAL
+
+    def test_devoluciones_simultaneas_reponen_una_vez(self, setup_data):
+        libro, usuarios = setup_data
+        prestamo = PrestamoService.crear_prestamo(usuarios[0], libro)
+        devoluciones, rechazos = [], []
+
+        def devolver(copia):
+            try:
+                devoluciones.append(_reintentar(lambda: PrestamoService.devolver_libro(copia)))
+            except BusinessLogicError:
+                rechazos.append(copia)
+
+        copias = [Prestamo.objects.select_related('libro').get(pk=prestamo.pk) for _ in range(HILOS)]
+        _en_paralelo([lambda c=c: devolver(c) for c in copias])
+
+        libro.refresh_from_db()
+        assert len(devoluciones) == 1
+        assert libro.stock == STOCK_INICIAL
+        assert libro.disponible is True
@@ -0,0 +1,91 @@
+import io
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from apps.common.exceptions import BusinessLogicError
+from apps.libros.models import Libro
+from apps.autores.models import Autor
+from apps.prestamos.models import ContadorPrestamos, Prestamo, MAX_LIBROS_POR_USUARIO
+from apps.prestamos.services import PrestamoService
+
+@pytest.mark.django_db
+class TestContadorPrestamos:
+    @pytest.fixture
+    def setup_data(self):
+        user = User.objects.create_user(username="testuser", password="pass")
+        autor = Autor.objects.create(nombre="Autor Test", nacionalidad="Test")
+        libros = [
+            Libro.objects.create(
+                titulo=f"Libro {i}", autor=autor, isbn=f"111111111111{i}",
+                fecha_publicacion="2020-01-01", stock=2
+            )
+            for i in range(MAX_LIBROS_POR_USUARIO + 1)
+        ]
+        return user, libros
+
+    def test_contador_sigue_prestamos_y_devoluciones(self, setup_data):
+        user, libros = setup_data
+        prestamo = PrestamoService.crear_prestamo(user, libros[0])
+        PrestamoService.crear_prestamo(user, libros[1])
+        assert ContadorPrestamos.activos_de(user) == 2
+
+        PrestamoService.devolver_libro(prestamo)
+        assert ContadorPrestamos.activos_de(user) == 1
+
+    def test_limite_sin_consultas_agregadas(self, setup_data):
+        user, libros = setup_data
+        with CaptureQueriesContext(connection) as consultas:
+            for libro in libros[:MAX_LIBROS_POR_USUARIO]:
+                PrestamoService.crear_prestamo(user, libro)
+            with pytest.raises(BusinessLogicError) as exc:
+                PrestamoService.crear_prestamo(user, libros[-1])
+
+        assert 'límite' in str(exc.value)
+        assert not [q for q in consultas.captured_queries if 'COUNT(' in q['sql'].upper()]
+
+    def test_escrituras_fuera_del_servicio(self, setup_data):
+        # Altas, devoluciones, cambios de usuario y borrados desde el admin o el ORM
+        user, libros = setup_data
+        otro = User.objects.create_user(username="otro", password="pass")
+        prestamo = Prestamo.objects.create(usuario=user, libro=libros[0], fecha_devolucion_esperada="2030-01-01")
+        segundo = Prestamo.objects.create(usuario=user, libro=libros[1], fecha_devolucion_esperada="2030-01-01")
+        assert ContadorPrestamos.activos_de(user) == 2
+
+        prestamo.fecha_devolucion = "2029-01-01"
+        prestamo.save()
+        segundo.usuario = otro
+        segundo.save()
+        assert (ContadorPrestamos.activos_de(user), ContadorPrestamos.activos_de(otro)) == (0, 1)
+
+        Prestamo.objects.filter(usuario=otro).delete()
+        prestamo.delete()
+        assert (ContadorPrestamos.activos_de(user), ContadorPrestamos.activos_de(otro)) == (0, 0)
+
+    def test_descontar_mas_que_los_activos_deja_cero(self, setup_data):
+        user, libros = setup_data
+        prestamos = [PrestamoService.crear_prestamo(user, libro) for libro in libros[:3]]
+        # Contador desviado por debajo de los préstamos que se devuelven
+        ContadorPrestamos.objects.filter(usuario=user).update(activos=2)
+        PrestamoService.devolver_prestamos_lote([p.pk for p in prestamos])
+        assert ContadorPrestamos.activos_de(user) == 0
+
+        ContadorPrestamos.objects.filter(usuario=user).update(activos=1)
+        ContadorPrestamos.sumar(user.pk, -3)
+        assert ContadorPrestamos.activos_de(user) == 0
+
+    def test_reconciliar_corrige_desvios(self, setup_data):
+        user, libros = setup_data
+        PrestamoService.crear_prestamo(user, libros[0])
+        otro = User.objects.create_user(username="otro", password="pass")
+        # Inserción por conjuntos sin pasar por el servicio
+        Prestamo.objects.bulk_create([
+            Prestamo(usuario=otro, libro=libros[1], fecha_devolucion_esperada="2030-01-01")
+        ])
+        ContadorPrestamos.objects.filter(usuario=user).update(activos=3)
+
+        call_command('reconciliar_prestamos', stdout=io.StringIO())
+
+        assert ContadorPrestamos.activos_de(user) == 1
+        assert ContadorPrestamos.activos_de(otro) == 1
@@ -0,0 +1,77 @@
+import io
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.libros.models import Libro
+from apps.autores.models import Autor
+from apps.prestamos.models import ContadorPrestamos, Prestamo
+from apps.prestamos.services import PrestamoService
+
+@pytest.mark.django_db
+class TestDevolucionesLote:
+    URL = '/api/prestamos/devolver-lote/'
+
+    @pytest.fixture
+    def user(self):
+        return User.objects.create_user(username="lector", password="pass")
+
+    @pytest.fixture
+    def client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    @pytest.fixture
+    def prestamos(self, user):
+        autor = Autor.objects.create(nombre="Autor Test", nacionalidad="Test")
+        libros = [
+            Libro.objects.create(
+                titulo=f"Libro {i}", autor=autor, isbn=f"978000000000{i}",
+                fecha_publicacion="2020-01-01", stock=1
+            )
+            for i in range(2)
+        ]
+        return [PrestamoService.crear_prestamo(user, libro) for libro in libros]
+
+    def test_devuelve_con_actualizaciones_por_conjuntos(self, client, user, prestamos):
+        ids = [p.pk for p in prestamos]
+        with CaptureQueriesContext(connection) as consultas:
+            response = client.post(self.URL, {'prestamo_ids': ids}, format='json')
+
+        assert response.status_code == 200
+        assert response.json() == {'devueltos': ids, 'rechazados': []}
+        assert not Prestamo.objects.filter(fecha_devolucion__isnull=True).exists()
+        assert ContadorPrestamos.activos_de(user) == 0
+        assert list(Libro.objects.values_list('stock', 'disponible')) == [(1, True), (1, True)]
+        updates = [q for q in consultas.captured_queries if q['sql'].startswith('UPDATE')]
+        # préstamos, contador, stock, disponibilidad, contador del catálogo y
+        # resúmenes (uno por libro y otro compartido por su categoría y autor)
+        assert len(updates) == 7
+
+    def test_informa_rechazados(self, client, user, prestamos):
+        PrestamoService.devolver_libro(prestamos[0])
+        response = client.post(
+            self.URL, {'prestamo_ids': [prestamos[0].pk, prestamos[1].pk, 9999]}, format='json'
+        )
+
+        assert response.status_code == 200
+        datos = response.json()
+        assert datos['devueltos'] == [prestamos[1].pk]
+        assert [r['prestamo_id'] for r in datos['rechazados']] == [prestamos[0].pk, 9999]
+        assert ContadorPrestamos.activos_de(user) == 0
+
+    def test_no_devuelve_prestamos_de_otro_usuario(self, prestamos):
+        otro = User.objects.create_user(username="otro", password="pass")
+        resultado = PrestamoService.devolver_prestamos_lote([p.pk for p in prestamos], usuario=otro)
+
+        assert resultado['devueltos'] == []
+        assert Prestamo.objects.filter(fecha_devolucion__isnull=True).count() == 2
+
+    def test_benchmark(self):
+        salida = io.StringIO()
+        call_command('benchmark_devoluciones', prestamos=6, libros=2, stdout=salida)
+        assert 'Aceleración' in salida.getvalue()
+        assert not Prestamo.objects.exists()
@@ -0,0 +1,108 @@
+import io
+import json
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
+from django.test import AsyncRequestFactory, RequestFactory
+from rest_framework.test import APIClient
+from apps.common.exportacion import generar_exportacion, respuesta_exportacion
+from apps.libros import search
+from apps.libros.models import Libro
+from apps.libros.serializers import CAMPOS_EXPORTACION as CAMPOS_LIBRO
+from apps.autores.models import Autor
+from apps.prestamos.services import PrestamoService
+
+@pytest.mark.django_db
+class TestExportacion:
+    @pytest.fixture
+    def datos(self):
+        autor = Autor.objects.create(nombre="Autor Test", nacionalidad="Test")
+        libros = [
+            Libro.objects.create(
+                titulo=f"Libro {i}", autor=autor, isbn=f"978000000000{i}",
+                fecha_publicacion="2020-01-01", stock=2
+            )
+            for i in range(5)
+        ]
+        lector = User.objects.create_user(username="lector", password="pass")
+        otro = User.objects.create_user(username="otro", password="pass")
+        prestamo = PrestamoService.crear_prestamo(lector, libros[0])
+        PrestamoService.crear_prestamo(lector, libros[1])
+        PrestamoService.crear_prestamo(otro, libros[2])
+        PrestamoService.devolver_libro(prestamo)
+        staff = User.objects.create_user(username="staff", password="pass", is_staff=True)
+        return libros, lector, staff
+
+    def _cliente(self, usuario):
+        client = APIClient()
+        client.force_authenticate(usuario)
+        return client
+
+    def _contenido(self, response):
+        assert isinstance(response, StreamingHttpResponse)
+        return b''.join(response.streaming_content).decode()
+
+    def test_exporta_catalogo_csv_con_filtros(self, datos):
+        libros, _, staff = datos
+        response = self._cliente(staff).get('/api/libros/exportar/', {'autor': libros[0].autor_id})
+
+        assert response.status_code == 200
+        assert response['Content-Disposition'] == 'attachment; filename="catalogo.csv"'
+        lineas = self._contenido(response).splitlines()
+        assert lineas[0] == ','.join(columna for columna, _ in CAMPOS_LIBRO)
+        assert len(lineas) == 6
+
+    def test_exportar_catalogo_requiere_personal(self, datos):
+        _, lector, _ = datos
+        assert self._cliente(lector).get('/api/libros/exportar/').status_code == 403
+
+    def test_exporta_prestamos_ndjson(self, datos):
+        _, lector, staff = datos
+        response = self._cliente(staff).get('/api/prestamos/exportar/', {'formato': 'ndjson', 'devuelto': 'false'})
+        filas = [json.loads(linea) for linea in self._contenido(response).splitlines()]
+        assert sorted(f['usuario'] for f in filas) == ['lector', 'otro']
+
+        # Un usuario sin privilegios solo exporta sus propios préstamos
+        response = self._cliente(lector).get('/api/prestamos/exportar/', {'formato': 'ndjson'})
+        filas = [json.loads(linea) for linea in self._contenido(response).splitlines()]
+        assert [f['usuario'] for f in filas] == ['lector', 'lector']
+
+    def test_lotes_por_clave(self, datos):
+        # Con lotes de 2, los 5 libros salen en orden y sin repetidos
+        fragmentos = list(generar_exportacion(Libro.objects.all(), CAMPOS_LIBRO, 'ndjson', tamano_lote=2))
+        assert len(fragmentos) == 3
+        ids = [json.loads(linea)['id'] for linea in ''.join(fragmentos).splitlines()]
+        assert ids == sorted(libro.pk for libro in datos[0])
+
+    def test_comando_exportar_prestamos(self, datos, tmp_path):
+        _, lector, _ = datos
+        archivo = tmp_path / "prestamos.csv"
+        call_command('exportar_prestamos', salida=str(archivo), filtro=[f'usuario={lector.pk}'])
+        assert len(archivo.read_text(encoding="utf-8").splitlines()) == 3
+
+        salida = io.StringIO()
+        call_command('exportar_catalogo', formato='ndjson', filtro=['search=libro'], stdout=salida)
+        assert len(salida.getvalue().splitlines()) == 5
+
+    def test_asgi_usa_iterador_asincrono(self, datos):
+        respuesta = respuesta_exportacion(RequestFactory().get('/'), Libro.objects.all(), CAMPOS_LIBRO, 'csv', 'catalogo')
+        assert not respuesta.is_async
+
+        respuesta = respuesta_exportacion(
+            AsyncRequestFactory().get('/'), Libro.objects.all(), CAMPOS_LIBRO, 'csv', 'catalogo'
+        )
+        assert respuesta.is_async
+
+        async def leer():
+            return b''.join([fragmento async for fragmento in respuesta.streaming_content]).decode()
+        assert len(async_to_sync(leer)().splitlines()) == 6
+
+    def test_busqueda_sin_limite_de_resultados(self, datos, monkeypatch):
+        _, _, staff = datos
+        monkeypatch.setattr(search, 'LIMITE_RESULTADOS', 2)
+        assert len(self._cliente(staff).get('/api/libros/', {'search': 'libro'}).data['results']) == 2
+
+        response = self._cliente(staff).get('/api/libros/exportar/', {'search': 'libro'})
+        assert len(self._contenido(response).splitlines()) == 6
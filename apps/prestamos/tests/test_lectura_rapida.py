@@ -0,0 +1,53 @@
+import io
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from apps.common.lectura import EsquemaLectura
+from apps.libros.models import Categoria, Libro
+from apps.libros.serializers import LibroSerializer
+from apps.autores.models import Autor
+from apps.prestamos.models import Prestamo
+from apps.prestamos.serializers import PrestamoSerializer
+from apps.prestamos.services import PrestamoService
+
+@pytest.mark.django_db
+class TestLecturaRapida:
+    @pytest.fixture
+    def datos(self):
+        autor = Autor.objects.create(nombre="Autor Test", nacionalidad="Test", biografia="Bio")
+        categoria = Categoria.objects.create(nombre="Novela")
+        con_categoria = Libro.objects.create(
+            titulo="Con categoría", autor=autor, categoria=categoria, isbn="9780000000001",
+            fecha_publicacion="2020-01-01", paginas=100, calificacion=4, stock=2
+        )
+        sin_categoria = Libro.objects.create(
+            titulo="Sin categoría", autor=autor, isbn="9780000000002", fecha_publicacion="2021-06-15"
+        )
+        Libro.objects.filter(pk=con_categoria.pk).update(imagen="biblioteca/libros/portada")
+        user = User.objects.create_user(username="lector", password="pass", email="l@example.com")
+        prestamo = PrestamoService.crear_prestamo(user, con_categoria)
+        PrestamoService.crear_prestamo(user, sin_categoria)
+        PrestamoService.devolver_libro(prestamo)
+        return user
+
+    def test_libros_mismo_json_que_el_serializer(self, datos):
+        esquema = EsquemaLectura(LibroSerializer)
+        libros = Libro.objects.select_related('autor', 'categoria')
+        assert esquema.construir_lista(esquema.filas(libros)) == LibroSerializer(libros, many=True).data
+
+    def test_api_prestamos_mismo_json_que_el_serializer(self, datos):
+        client = APIClient()
+        client.force_authenticate(datos)
+        esperado = PrestamoSerializer(Prestamo.objects.filter(usuario=datos), many=True).data
+
+        assert client.get('/api/prestamos/').json()['results'] == esperado
+        assert client.get(f'/api/prestamos/{esperado[0]["id"]}/').json() == esperado[0]
+        assert client.get('/api/prestamos/historial/').json() == [p for p in esperado if p['fecha_devolucion']]
+        assert client.get('/api/prestamos/9999/').status_code == 404
+
+    def test_benchmark(self):
+        salida = io.StringIO()
+        call_command('benchmark_serializacion', prestamos=5, repeticiones=1, stdout=salida)
+        assert 'Aceleración' in salida.getvalue()
+        assert not Prestamo.objects.exists()
@@ -0,0 +1,34 @@
+import pytest
+from django.contrib.auth.models import User
+from apps.common.planes import problemas_plan
+from apps.prestamos.models import ContadorPrestamos, Prestamo
+
+USUARIO_ID = 1
+
+CONSULTAS = {
+    # PrestamoViewSet (primera página)
+    'api_lista': lambda: Prestamo.objects.filter(usuario_id=USUARIO_ID)
+        .select_related('libro', 'libro__autor', 'libro__categoria')
+        .order_by('-fecha_prestamo', 'pk')[:11],
+    # mis_prestamos y perfil
+    'activos': lambda: Prestamo.objects.filter(
+        usuario_id=USUARIO_ID, fecha_devolucion__isnull=True
+    ).select_related('libro'),
+    'devueltos': lambda: Prestamo.objects.filter(
+        usuario_id=USUARIO_ID, fecha_devolucion__isnull=False
+    ).select_related('libro').order_by('-fecha_devolucion'),
+    'historial_reciente': lambda: Prestamo.objects.filter(
+        usuario_id=USUARIO_ID, fecha_devolucion__isnull=False
+    ).order_by('-fecha_prestamo')[:5],
+    # Devolución condicional
+    'devolucion': lambda: Prestamo.objects.filter(pk=1, fecha_devolucion__isnull=True),
+    'contador': lambda: ContadorPrestamos.objects.filter(usuario_id=USUARIO_ID),
+    'perfil_usuario': lambda: User.objects.filter(username='lector'),
+}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('nombre', CONSULTAS)
+def test_consulta_usa_indices(nombre):
+    queryset = CONSULTAS[nombre]()
+    assert problemas_plan(queryset) == [], queryset.explain()
@@ -0,0 +1,73 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.libros.models import Libro
+from apps.autores.models import Autor
+from apps.prestamos.models import ContadorPrestamos, Prestamo, MAX_LIBROS_POR_USUARIO
+
+@pytest.mark.django_db
+class TestPrestamosLote:
+    URL = '/api/prestamos/lote/'
+
+    @pytest.fixture
+    def user(self):
+        return User.objects.create_user(username="lector", password="pass")
+
+    @pytest.fixture
+    def client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    @pytest.fixture
+    def libros(self):
+        autor = Autor.objects.create(nombre="Autor Test", nacionalidad="Test")
+        return [
+            Libro.objects.create(
+                titulo=f"Libro {i}", autor=autor, isbn=f"978000000000{i}",
+                fecha_publicacion="2020-01-01", stock=1
+            )
+            for i in range(MAX_LIBROS_POR_USUARIO + 1)
+        ]
+
+    def test_presta_varios_libros(self, client, user, libros):
+        ids = [libros[1].pk, libros[0].pk]
+        with CaptureQueriesContext(connection) as consultas:
+            response = client.post(self.URL, {'libro_ids': ids}, format='json')
+
+        assert response.status_code == 201
+        resultados = response.json()['resultados']
+        assert [r['libro_id'] for r in resultados] == ids
+        assert all(r['prestamo']['libro']['disponible'] is False for r in resultados)
+        assert ContadorPrestamos.activos_de(user) == 2
+        assert Prestamo.objects.filter(usuario=user).count() == 2
+        assert not Libro.objects.filter(pk__in=ids, stock__gt=0).exists()
+        inserts = [q for q in consultas.captured_queries if q['sql'].startswith('INSERT INTO "prestamos_prestamo"')]
+        assert len(inserts) == 1
+
+    def test_todo_o_nada_revierte_el_lote(self, client, user, libros):
+        Libro.objects.filter(pk=libros[1].pk).update(stock=0, disponible=False)
+        response = client.post(
+            self.URL, {'libro_ids': [libros[0].pk, libros[1].pk, 9999]}, format='json'
+        )
+
+        assert response.status_code == 400
+        errores = response.json()['details']['resultados']
+        assert [e['libro_id'] for e in errores] == [libros[1].pk, 9999]
+        assert not Prestamo.objects.exists()
+        assert Libro.objects.get(pk=libros[0].pk).stock == 1
+        assert ContadorPrestamos.activos_de(user) == 0
+
+    def test_resultados_parciales_respetan_el_limite(self, client, user, libros):
+        ids = [libro.pk for libro in libros] + [libros[0].pk]
+        response = client.post(self.URL, {'libro_ids': ids, 'todo_o_nada': False}, format='json')
+
+        assert response.status_code == 201
+        resultados = response.json()['resultados']
+        creados = [r for r in resultados if 'prestamo' in r]
+        assert len(creados) == MAX_LIBROS_POR_USUARIO
+        assert 'límite' in resultados[MAX_LIBROS_POR_USUARIO]['error']
+        assert 'repetido' in resultados[-1]['error']
+        assert ContadorPrestamos.activos_de(user) == MAX_LIBROS_POR_USUARIO
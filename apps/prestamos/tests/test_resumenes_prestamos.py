@@ -0,0 +1,135 @@
+import io
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.libros.models import Categoria, Libro
+from apps.autores.models import Autor
+from apps.prestamos import resumenes
+from apps.prestamos.models import Prestamo, ResumenPrestamos
+from apps.prestamos.services import PrestamoService
+
+def tabla():
+    campos = ('dimension', 'objeto_id', 'fecha', *resumenes.CAMPOS)
+    return {
+        fila[:3]: fila[3:]
+        for fila in ResumenPrestamos.objects.values_list(*campos)
+        if any(fila[3:])
+    }
+
+@pytest.mark.django_db
+class TestResumenesPrestamos:
+    @pytest.fixture
+    def libros(self):
+        autor = Autor.objects.create(nombre="Autor Test", nacionalidad="Test")
+        otro_autor = Autor.objects.create(nombre="Otro Autor", nacionalidad="Test")
+        categoria = Categoria.objects.create(nombre="Novela")
+        return [
+            Libro.objects.create(
+                titulo=f"Libro {i}", autor=autor if i < 2 else otro_autor,
+                categoria=categoria if i else None, isbn=f"978000000000{i}",
+                fecha_publicacion="2020-01-01", stock=3
+            )
+            for i in range(3)
+        ]
+
+    @pytest.fixture
+    def usuarios(self):
+        return [User.objects.create_user(username=f"lector{i}") for i in range(3)]
+
+    @pytest.fixture
+    def admin(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="admin", password="pass", is_staff=True))
+        return client
+
+    def _circulacion(self, libros, usuarios):
+        a = PrestamoService.crear_prestamo(usuarios[0], libros[0])
+        b = PrestamoService.crear_prestamo(usuarios[1], libros[0])
+        PrestamoService.crear_prestamos_lote(usuarios[2], [libros[0].pk, libros[1].pk, libros[2].pk])
+        PrestamoService.devolver_libro(a)
+        lote = list(Prestamo.objects.filter(usuario=usuarios[2]).values_list('pk', flat=True))
+        PrestamoService.devolver_prestamos_lote([b.pk, *lote])
+
+    def test_incremental_igual_a_recalculado(self, libros, usuarios):
+        self._circulacion(libros, usuarios)
+        hoy = timezone.now().date()
+        incremental = tabla()
+        assert incremental[(ResumenPrestamos.LIBRO, libros[0].pk, hoy)] == (3, 3, 0, 0)
+        assert incremental[(ResumenPrestamos.CATEGORIA, ResumenPrestamos.SIN_CATEGORIA, hoy)] == (3, 3, 0, 0)
+        assert incremental[(ResumenPrestamos.AUTOR, libros[2].autor_id, hoy)] == (1, 1, 0, 0)
+        assert incremental == resumenes.calcular()
+
+        ResumenPrestamos.objects.all().delete()
+        salida = io.StringIO()
+        call_command('recalcular_resumenes', stdout=salida)
+        assert 'resúmenes diarios escritos' in salida.getvalue()
+        assert tabla() == incremental
+
+    def test_escrituras_fuera_del_servicio(self, libros, usuarios, admin):
+        # Préstamos creados, devueltos y borrados desde el admin o la API
+        hoy = timezone.now().date()
+        prestamo = Prestamo.objects.create(usuario=usuarios[0], libro=libros[1], fecha_devolucion_esperada=hoy)
+        otro = Prestamo.objects.create(usuario=usuarios[1], libro=libros[2], fecha_devolucion_esperada=hoy)
+        prestamo.fecha_devolucion = hoy
+        prestamo.save()
+        assert tabla() == resumenes.calcular()
+
+        admin.force_authenticate(usuarios[1])
+        assert admin.delete(f'/api/prestamos/{otro.pk}/').status_code == 204
+        prestamo.delete()
+        assert tabla() == {}
+
+    def test_duracion_y_retraso(self, libros, usuarios, admin):
+        hoy = timezone.now().date()
+        prestamo = PrestamoService.crear_prestamo(usuarios[0], libros[1])
+        Prestamo.objects.filter(pk=prestamo.pk).update(
+            fecha_prestamo=hoy - timezone.timedelta(days=10),
+            fecha_devolucion_esperada=hoy - timezone.timedelta(days=3),
+        )
+        prestamo.refresh_from_db()
+        PrestamoService.devolver_libro(prestamo)
+        PrestamoService.devolver_libro(PrestamoService.crear_prestamo(usuarios[1], libros[1]))
+
+        datos = admin.get(
+            '/api/estadisticas/resumen/', {'dimension': 'libro', 'id': libros[1].pk}
+        ).json()
+        assert datos == {'prestamos': 2, 'devoluciones': 2, 'duracion_media': 5.0, 'tasa_retraso': 0.5}
+
+    def test_api_sin_consultar_prestamos(self, libros, usuarios, admin):
+        self._circulacion(libros, usuarios)
+        with CaptureQueriesContext(connection) as consultas:
+            ranking = admin.get('/api/estadisticas/mas-prestados/', {'limite': 2}).json()
+            semanas = admin.get('/api/estadisticas/prestamos-por-semana/').json()
+            total = admin.get('/api/estadisticas/resumen/').json()
+        assert not [q for q in consultas if 'prestamos_prestamo' in q['sql']]
+
+        assert ranking == [
+            {'id': libros[0].pk, 'nombre': "Libro 0", 'prestamos': 3},
+            {'id': libros[1].pk, 'nombre': "Libro 1", 'prestamos': 1},
+        ]
+        assert {(s['nombre'], s['prestamos']) for s in semanas} == {("Sin categoría", 3), ("Novela", 2)}
+        assert total['prestamos'] == total['devoluciones'] == 5
+
+    def test_api_solo_para_personal_y_valida_parametros(self, admin):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="lector", password="pass"))
+        assert client.get('/api/estadisticas/resumen/').status_code == 403
+        assert admin.get('/api/estadisticas/resumen/', {'id': 1}).status_code == 400
+        assert admin.get(
+            '/api/estadisticas/mas-prestados/', {'desde': '2025-02-01', 'hasta': '2025-01-01'}
+        ).status_code == 400
+        assert admin.get('/api/estadisticas/mas-prestados/', {'dimension': 'usuario'}).status_code == 400
+
+    def test_recalcular_desde_fecha(self, libros, usuarios):
+        self._circulacion(libros, usuarios)
+        antiguo = ResumenPrestamos.objects.create(
+            dimension=ResumenPrestamos.LIBRO, objeto_id=libros[0].pk, fecha='2000-01-01', prestamos=5
+        )
+        call_command('recalcular_resumenes', desde=str(timezone.now().date()), stdout=io.StringIO())
+        assert ResumenPrestamos.objects.filter(pk=antiguo.pk).exists()
+        with pytest.raises(CommandError):
+            call_command('recalcular_resumenes', desde='ayer')
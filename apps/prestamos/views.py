@@ -1,11 +1,21 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from django.utils import timezone
+from django.db.models import prefetch_related_objects
 from django.contrib import messages
 from .models import Prestamo
-from .serializers import PrestamoSerializer
+from django_filters.rest_framework import DjangoFilterBackend
+from .filters import PrestamoFilter
+from .models import ResumenPrestamos
+from .serializers import (
+    CAMPOS_EXPORTACION, DevolucionLoteSerializer, EstadisticasSerializer, PrestamoLoteSerializer,
+    PrestamoSerializer
+)
+from . import analitica
+from apps.common.exportacion import formato_solicitado, respuesta_exportacion
+from apps.common.lectura import EsquemaLectura, LecturaRapidaMixin
 from apps.libros.models import Libro
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
@@ -42,17 +52,65 @@ def devolver_libro(request, prestamo_id):
         messages.error(request, str(e))
     return redirect('lista_prestamos')
 
-class PrestamoViewSet(viewsets.ModelViewSet):
+class PrestamoViewSet(LecturaRapidaMixin, viewsets.ModelViewSet):
     serializer_class = PrestamoSerializer
+    # list, retrieve, activos e historial se construyen desde filas values_list()
+    esquema_lectura = EsquemaLectura(PrestamoSerializer)
     permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = PrestamoFilter
 
     def get_queryset(self):
+        if self.action == 'exportar':
+            # El personal exporta el historial de todos los usuarios
+            prestamos = Prestamo.objects.all()
+            if not self.request.user.is_staff:
+                prestamos = prestamos.filter(usuario=self.request.user)
+            return prestamos
         return Prestamo.objects.filter(usuario=self.request.user).select_related('libro', 'libro__autor', 'libro__categoria')
 
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def exportar(self, request):
+        """
+        Exporta el historial de préstamos en streaming (``?formato=csv|ndjson``),
+        con los mismos filtros que el listado. El personal obtiene los
+        préstamos de todos los usuarios; el resto, solo los suyos.
+        """
+        formato = formato_solicitado(request)
+        return respuesta_exportacion(
+            request, self.filter_queryset(self.get_queryset()), CAMPOS_EXPORTACION, formato, 'prestamos'
+        )
+
     def perform_create(self, serializer):
         # El serializador ya utiliza el servicio
         serializer.save()
 
+    @action(detail=False, methods=['post'], serializer_class=PrestamoLoteSerializer)
+    def lote(self, request):
+        """
+        Presta varios libros en una sola transacción.
+
+        Devuelve un resultado por libro, en el orden recibido. Con
+        ``todo_o_nada`` (por defecto) un solo rechazo anula el lote.
+        """
+        entrada = PrestamoLoteSerializer(data=request.data)
+        entrada.is_valid(raise_exception=True)
+        resultados = PrestamoService.crear_prestamos_lote(request.user, **entrada.validated_data)
+
+        prestamos = [r['prestamo'] for r in resultados if 'prestamo' in r]
+        prefetch_related_objects([p.libro for p in prestamos], 'autor', 'categoria')
+        serializados = iter(
+            PrestamoSerializer(prestamos, many=True, context=self.get_serializer_context()).data
+        )
+        datos = [
+            {'libro_id': r['libro_id'], 'prestamo': next(serializados)} if 'prestamo' in r else r
+            for r in resultados
+        ]
+        return Response(
+            {'resultados': datos},
+            status=status.HTTP_201_CREATED if prestamos else status.HTTP_400_BAD_REQUEST
+        )
+
     @action(detail=True, methods=['post'])
     def devolver(self, request, pk=None):
         prestamo = self.get_object()
@@ -65,16 +123,73 @@ class PrestamoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    @action(detail=False, methods=['post'], url_path='devolver-lote', serializer_class=DevolucionLoteSerializer)
+    def devolver_lote(self, request):
+        """
+        Devuelve varios préstamos del usuario en una sola transacción.
+
+        Los préstamos inexistentes o ya devueltos se informan en ``rechazados``
+        sin impedir la devolución del resto.
+        """
+        entrada = DevolucionLoteSerializer(data=request.data)
+        entrada.is_valid(raise_exception=True)
+        resultado = PrestamoService.devolver_prestamos_lote(
+            entrada.validated_data['prestamo_ids'],
+            usuario=request.user
+        )
+        return Response(
+            resultado,
+            status=status.HTTP_200_OK if resultado['devueltos'] else status.HTTP_400_BAD_REQUEST
+        )
+
     @action(detail=False, methods=['get'])
     def activos(self, request):
         """Lista los préstamos activos del usuario"""
         prestamos_activos = self.get_queryset().filter(fecha_devolucion__isnull=True)
-        serializer = self.get_serializer(prestamos_activos, many=True)
-        return Response(serializer.data)
+        return self.respuesta_lectura(prestamos_activos, paginar=False)
 
     @action(detail=False, methods=['get'])
     def historial(self, request):
         """Lista el historial de préstamos del usuario"""
         prestamos = self.get_queryset().filter(fecha_devolucion__isnull=False)
-        serializer = self.get_serializer(prestamos, many=True)
-        return Response(serializer.data)
+        return self.respuesta_lectura(prestamos, paginar=False)
+
+
+class EstadisticasViewSet(viewsets.ViewSet):
+    """
+    Analítica de circulación para el personal, calculada sobre los
+    resúmenes diarios (``ResumenPrestamos``) y no sobre ``Prestamo``.
+
+    Parámetros comunes: ``desde`` y ``hasta`` (por defecto, los últimos 30
+    días) y ``dimension`` (``libro``, ``categoria`` o ``autor``).
+    """
+    permission_classes = [IsAdminUser]
+
+    def _parametros(self, request, dimension):
+        entrada = EstadisticasSerializer(data=request.query_params)
+        entrada.is_valid(raise_exception=True)
+        parametros = entrada.validated_data
+        parametros.setdefault('dimension', dimension)
+        return parametros
+
+    @action(detail=False, methods=['get'], url_path='mas-prestados')
+    def mas_prestados(self, request):
+        """Ranking de libros (o categorías, o autores) más prestados, con ``limite``."""
+        p = self._parametros(request, ResumenPrestamos.LIBRO)
+        return Response(analitica.mas_prestados(p['dimension'], p['desde'], p['hasta'], p['limite']))
+
+    @action(detail=False, methods=['get'], url_path='prestamos-por-semana')
+    def prestamos_por_semana(self, request):
+        """Préstamos por semana de cada categoría (o libro, o autor)."""
+        p = self._parametros(request, ResumenPrestamos.CATEGORIA)
+        return Response(analitica.prestamos_por_semana(p['dimension'], p['desde'], p['hasta']))
+
+    @action(detail=False, methods=['get'])
+    def resumen(self, request):
+        """
+        Préstamos, devoluciones, duración media y tasa de retraso de toda la
+        biblioteca o, con ``dimension`` e ``id``, de un libro, categoría o autor.
+        """
+        p = self._parametros(request, ResumenPrestamos.CATEGORIA)
+        return Response(analitica.resumen(p['dimension'], p['desde'], p['hasta'], p.get('id')))
+
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 class UsuariosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.usuarios'
+
+    def ready(self):
+        from apps.common import imagenes
+        from . import signals  # noqa: F401
+        from .models import PerfilUsuario
+        imagenes.diferir_subida(PerfilUsuario, 'avatar', imagenes.VARIANTES_AVATAR)
@@ -0,0 +1,68 @@
+import base64
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.common.autenticacion import BasicAutenticacionCacheada, JWTAutenticacionCacheada
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la cadena de autenticación de DRF (JWT, sesión, Basic) con la cacheada de '
+        'apps.common.autenticacion: mediana por petición y consultas. El usuario de prueba se '
+        'crea en una transacción que se revierte al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=20, help='Peticiones autenticadas por método')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            usuario = User.objects.create_user(username='benchmark_autenticacion', password='clave-benchmark')
+            credenciales = base64.b64encode(b'benchmark_autenticacion:clave-benchmark').decode()
+            cabeceras = {
+                'JWT': f'Bearer {AccessToken.for_user(usuario)}',
+                'Basic': f'Basic {credenciales}',
+            }
+            cadenas = {
+                'actual': [JWTAuthentication(), SessionAuthentication(), BasicAuthentication()],
+                'cacheada': [JWTAutenticacionCacheada(), SessionAuthentication(), BasicAutenticacionCacheada()],
+            }
+
+            self.stdout.write(f'{"credencial":<12}{"cadena":<10}{"mediana (ms)":>14}{"consultas":>11}')
+            for tipo, cabecera in cabeceras.items():
+                for nombre, cadena in cadenas.items():
+                    cache.clear()
+                    mediana, consultas = self._medir(cadena, cabecera, usuario, options['repeticiones'])
+                    self.stdout.write(f'{tipo:<12}{nombre:<10}{mediana:>14.3f}{consultas:>11.1f}')
+            transaction.set_rollback(True)
+        cache.clear()
+
+    def _autenticar(self, cadena, cabecera):
+        request = Request(APIRequestFactory().get('/api/libros/', HTTP_AUTHORIZATION=cabecera))
+        for autenticador in cadena:
+            resultado = autenticador.authenticate(request)
+            if resultado is not None:
+                return resultado[0]
+        return None
+
+    def _medir(self, cadena, cabecera, usuario, repeticiones):
+        tiempos = []
+        with CaptureQueriesContext(connection) as consultas:
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                autenticado = self._autenticar(cadena, cabecera)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+                if autenticado is None or autenticado.pk != usuario.pk:
+                    raise CommandError('La cadena no autenticó al usuario de prueba.')
+        return statistics.median(tiempos), len(consultas) / repeticiones
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:01
+
+from django.db import migrations, models
+
+
+def marcar_avatares_subidos(apps, schema_editor):
+    """Las imágenes ya subidas quedan listas, con su URL si se puede calcular."""
+    alias = schema_editor.connection.alias
+    PerfilUsuario = apps.get_model('usuarios', 'PerfilUsuario')
+    perfiles = PerfilUsuario.objects.using(alias)
+    for perfil in perfiles.exclude(avatar__isnull=True).exclude(avatar='').iterator():
+        try:
+            url = perfil.avatar.url
+        except Exception:
+            # Sin credenciales de Cloudinary: las plantillas usan el campo
+            url = ''
+        perfiles.filter(pk=perfil.pk).update(avatar_estado='lista', avatar_url=url)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0002_alter_perfilusuario_avatar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfilusuario',
+            name='avatar_estado',
+            field=models.CharField(blank=True, choices=[('pendiente', 'Pendiente'), ('lista', 'Lista'), ('fallida', 'Fallida')], max_length=10),
+        ),
+        migrations.AddField(
+            model_name='perfilusuario',
+            name='avatar_pendiente',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='perfilusuario',
+            name='avatar_url',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.RunPython(marcar_avatares_subidos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0003_imagen_diferida'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfilusuario',
+            name='avatar_variantes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from apps.common import imagenes
 
 class PerfilUsuario(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='perfil')
@@ -14,6 +15,11 @@ class PerfilUsuario(models.Model):
         null=True,
         storage=MediaCloudinaryStorage()
     )
+    # Subida en segundo plano (apps.common.imagenes)
+    avatar_estado = models.CharField(max_length=10, choices=imagenes.ESTADOS, blank=True)
+    avatar_pendiente = models.CharField(max_length=255, blank=True)
+    avatar_url = models.CharField(max_length=500, blank=True)
+    avatar_variantes = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
         return self.user.username
@@ -0,0 +1,11 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from apps.common import autenticacion
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def olvidar_usuario_cacheado(sender, instance, **kwargs):
+    """Desactivar, cambiar la contraseña o borrar invalida la autenticación cacheada."""
+    autenticacion.invalidar_usuario(instance.pk)
@@ -0,0 +1,113 @@
+import base64
+import io
+from unittest import mock
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.common.autenticacion import invalidar_usuario, usuario_cacheado
+from apps.common.cache_niveles import CacheDosNiveles
+
+def basic(username, password):
+    return 'Basic ' + base64.b64encode(f'{username}:{password}'.encode()).decode()
+
+def consultas_de_usuario(consultas):
+    return [q for q in consultas if 'FROM "auth_user"' in q['sql']]
+
+class VistaSinBasic(APIView):
+    permitir_basic = False
+
+    def get(self, request):
+        return Response({'usuario': request.user.username})
+
+@pytest.mark.django_db
+class TestAutenticacionCacheada:
+    @pytest.fixture
+    def usuario(self):
+        return User.objects.create_user(username="lector", password="clave-1")
+
+    def test_jwt_sin_leer_el_usuario_en_cada_peticion(self, usuario):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(usuario)}')
+        with CaptureQueriesContext(connection) as consultas:
+            assert client.get('/api/libros/').status_code == 200
+        assert len(consultas_de_usuario(consultas)) == 1
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = client.get('/api/prestamos/')
+        assert response.status_code == 200
+        assert consultas_de_usuario(consultas) == []
+
+    def test_desactivar_invalida_el_usuario_cacheado(self, usuario):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(usuario)}')
+        assert client.get('/api/libros/').status_code == 200
+        usuario.is_active = False
+        usuario.save()
+        assert client.get('/api/libros/').status_code == 401
+
+    def test_desactivar_desde_otro_worker(self, usuario):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(usuario)}')
+        assert client.get('/api/libros/').status_code == 200
+
+        # Otro proceso desactiva al usuario y borra su entrada compartida;
+        # este no conserva una copia local que lo siga autenticando
+        otro = CacheDosNiveles('otro-worker', {'OPTIONS': {'COMPARTIDA': 'compartida'}})
+        User.objects.filter(pk=usuario.pk).update(is_active=False)
+        with mock.patch('apps.common.autenticacion.cache', otro):
+            invalidar_usuario(usuario.pk)
+        assert client.get('/api/libros/').status_code == 401
+
+    def test_usuario_cacheado_se_guarda_sin_perder_columnas(self, usuario):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(usuario)}')
+        client.get('/api/libros/')
+        cacheado, _ = usuario_cacheado(usuario.pk)
+        assert (cacheado.username, cacheado.is_active) == ("lector", True)
+        cacheado.first_name = "Lectora"
+        cacheado.save()
+        usuario.refresh_from_db()
+        assert usuario.first_name == "Lectora"
+        assert usuario.check_password("clave-1")
+
+    def test_basic_verifica_la_contrasena_una_vez(self, usuario):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=basic("lector", "clave-1"))
+        with mock.patch.object(User, 'check_password', autospec=True, side_effect=User.check_password) as verificar:
+            assert client.get('/api/libros/').status_code == 200
+            assert client.get('/api/libros/').status_code == 200
+        assert verificar.call_count == 1
+
+        client.credentials(HTTP_AUTHORIZATION=basic("lector", "otra"))
+        assert client.get('/api/libros/').status_code == 401
+
+    def test_cambiar_la_contrasena_invalida_basic(self, usuario):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=basic("lector", "clave-1"))
+        assert client.get('/api/libros/').status_code == 200
+
+        usuario.set_password("clave-2")
+        usuario.save()
+        assert client.get('/api/libros/').status_code == 401
+        client.credentials(HTTP_AUTHORIZATION=basic("lector", "clave-2"))
+        assert client.get('/api/libros/').status_code == 200
+
+    def test_basic_desactivable_por_vista(self, usuario):
+        factory = APIRequestFactory()
+        request = factory.get('/', HTTP_AUTHORIZATION=basic("lector", "clave-1"))
+        assert VistaSinBasic.as_view()(request).status_code in (401, 403)
+
+        request = factory.get('/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(usuario)}')
+        assert VistaSinBasic.as_view()(request).data == {'usuario': "lector"}
+
+    def test_benchmark_autenticacion(self):
+        salida = io.StringIO()
+        call_command('benchmark_autenticacion', repeticiones=2, stdout=salida)
+        assert 'Basic       cacheada' in salida.getvalue()
+        assert not User.objects.filter(username='benchmark_autenticacion').exists()
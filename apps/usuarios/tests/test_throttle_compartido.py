@@ -0,0 +1,74 @@
+import multiprocessing
+import sqlite3
+from unittest import mock
+import pytest
+from django.conf import settings
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+from apps.common import throttling
+from apps.common.throttling import UserThrottleCompartido
+
+class TresPorMinuto(UserThrottleCompartido):
+    rate = '3/min'
+
+def filas():
+    with sqlite3.connect(settings.THROTTLE_DB_PATH) as conexion:
+        return conexion.execute('SELECT count(*) FROM limites').fetchone()[0]
+
+def intentos(n, cola):
+    cola.put(sum(throttling.consumir('cliente', 1000.0, 1.0, 100.0)[0] for _ in range(n)))
+
+@pytest.mark.django_db
+class TestThrottleCompartido:
+    def _peticion(self, usuario):
+        request = APIRequestFactory().get('/api/libros/')
+        request.user = usuario
+        return request
+
+    def test_cuota_comun_a_varios_workers(self):
+        usuario = User.objects.create_user(username="lector")
+        # Cada worker crea sus propias instancias del throttle
+        workers = [TresPorMinuto(), TresPorMinuto()]
+        with mock.patch.object(TresPorMinuto, 'timer', return_value=1000.0):
+            resultados = [workers[i % 2].allow_request(self._peticion(usuario), APIView()) for i in range(5)]
+        assert resultados == [True, True, True, False, False]
+        assert workers[0].wait() == pytest.approx(20.0)
+        assert filas() == 1
+
+        # Pasado un intervalo se repone un solo token
+        with mock.patch.object(TresPorMinuto, 'timer', return_value=1020.0):
+            assert TresPorMinuto().allow_request(self._peticion(usuario), APIView())
+            assert not TresPorMinuto().allow_request(self._peticion(usuario), APIView())
+
+        otro = User.objects.create_user(username="otro")
+        assert TresPorMinuto().allow_request(self._peticion(otro), APIView())
+        assert filas() == 2
+
+    def test_procesos_concurrentes_no_superan_la_cuota(self):
+        assert throttling.consumir('otro', 1000.0, 1.0, 100.0)[0]
+        contexto = multiprocessing.get_context('fork')
+        cola = contexto.Queue()
+        procesos = [contexto.Process(target=intentos, args=(50, cola)) for _ in range(4)]
+        for proceso in procesos:
+            proceso.start()
+        permitidos = sum(cola.get(timeout=30) for _ in procesos)
+        for proceso in procesos:
+            proceso.join()
+        assert permitidos == 100
+
+    def test_purga_las_entradas_caducadas(self):
+        for i in range(throttling.PURGA_CADA - 1):
+            throttling.consumir(f'cliente-{i}', 1000.0, 1.0, 10.0)
+        assert filas() == throttling.PURGA_CADA - 1
+        throttling.consumir('nuevo', 2000.0, 1.0, 10.0)
+        assert filas() == 1
+
+    def test_api_responde_429(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="lector"))
+        with mock.patch.dict(UserThrottleCompartido.THROTTLE_RATES, {'user': '2/min'}):
+            assert [client.get('/api/libros/').status_code for _ in range(3)] == [200, 200, 429]
+            response = client.get('/api/libros/')
+        assert response.status_code == 429
+        assert 0 < int(response['Retry-After']) <= 30
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -96,13 +97,16 @@ CLOUDINARY_STORAGE = {
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise con soporte asíncrono para no bloquear las vistas ASGI
+    'apps.common.middleware.WhiteNoiseAsincrona',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Lecturas en réplica por petición; fija en la principal a quien escribe
+    'apps.common.middleware.ReplicasMiddleware',
 ]
 
 ROOT_URLCONF = 'biblioteca.urls'
@@ -158,6 +162,24 @@ elif not DATABASES['default']['NAME'] and DEBUG:
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 
+# Réplicas de solo lectura de la principal, separadas por comas: hosts con
+# las mismas credenciales (MySQL) o archivos (SQLite). Solo leen de ellas las
+# vistas de catálogo marcadas (apps.common.replicas)
+DATABASE_REPLICAS = []
+for numero, replica in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    campo = 'NAME' if DATABASES['default']['ENGINE'].endswith('sqlite3') else 'HOST'
+    DATABASES[f'replica{numero}'] = {
+        **DATABASES['default'], campo: replica.strip(), 'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{numero}')
+DATABASE_ROUTERS = ['apps.common.replicas.RouterReplicas']
+# Segundos que un usuario lee de la principal tras escribir (retraso máximo de la replicación)
+REPLICAS_FIJACION = int(os.getenv('REPLICAS_FIJACION', 5))
+
+# MySQL no admite índices parciales (prestamo_activo_idx); se omiten allí
+# y las consultas usan el índice compuesto equivalente
+SILENCED_SYSTEM_CHECKS = ['models.W037']
+
 
 # Authentication settings
 LOGIN_URL = 'usuarios:login'  # URL para redirigir a los usuarios no autenticados
@@ -166,28 +188,86 @@ LOGOUT_REDIRECT_URL = 'usuarios:login'  # URL a la que redirigir después del ci
 
 # REST Framework settings
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Keyset por defecto; ?page=N o ?paginacion=numerada para la paginación clásica
+    'DEFAULT_PAGINATION_CLASS': 'apps.common.pagination.BibliotecaPagination',
     'PAGE_SIZE': 10,
+    # JWT y Basic resuelven el usuario desde la caché (apps.common.autenticacion)
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.common.autenticacion.JWTAutenticacionCacheada',
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
+        'apps.common.autenticacion.BasicAutenticacionCacheada',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'EXCEPTION_HANDLER': 'apps.common.exceptions.biblioteca_exception_handler',
+    # Cuotas compartidas por todos los workers del servidor (apps.common.throttling)
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'apps.common.throttling.AnonThrottleCompartido',
+        'apps.common.throttling.UserThrottleCompartido',
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '100/day',
-        'user': '1000/day'
+        'anon': os.getenv('THROTTLE_ANON', '100/day'),
+        'user': os.getenv('THROTTLE_USER', '1000/day'),
     }
 }
 
+# Caché compartida por todos los workers: Redis si se define REDIS_URL
+# (requiere el paquete redis) y, si no, archivos locales en CACHE_DIR. En los
+# tests, memoria del proceso
+if 'test' in sys.argv or 'pytest' in sys.modules:
+    CACHE_COMPARTIDA = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'compartida',
+    }
+elif os.getenv('REDIS_URL'):
+    CACHE_COMPARTIDA = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    }
+else:
+    CACHE_COMPARTIDA = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'biblioteca-cache')),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRADAS', 10000))},
+    }
+
+# La caché por defecto pone delante de la compartida una LRU acotada en cada
+# proceso, válida CACHE_LOCAL_TTL segundos (apps.common.cache_niveles). Los
+# usuarios autenticados no pasan por ella: desactivar a un usuario debe
+# verse en todos los workers en cuanto se borra su entrada compartida
+CACHES = {
+    'default': {
+        'BACKEND': 'apps.common.cache_niveles.CacheDosNiveles',
+        'LOCATION': 'dos-niveles',
+        'OPTIONS': {
+            'COMPARTIDA': 'compartida',
+            'MAX_ENTRADAS': int(os.getenv('CACHE_LOCAL_MAX_ENTRADAS', 1000)),
+            'TTL_LOCAL': int(os.getenv('CACHE_LOCAL_TTL', 5)),
+            'SOLO_COMPARTIDA': ('autenticacion',),
+        },
+    },
+    'compartida': CACHE_COMPARTIDA,
+}
+
+# Segundos que se conservan las respuestas anónimas cacheadas de libros y
+# autores (apps.common.cache_respuestas); la invalidación es por señales
+CACHE_RESPUESTAS_TTL = int(os.getenv('CACHE_RESPUESTAS_TTL', 300))
+
+# Segundos que se reutiliza un usuario autenticado por JWT o Basic sin
+# volver a leerlo ni verificar su contraseña; guardar o borrar el usuario lo
+# invalida antes (apps.common.autenticacion)
+AUTENTICACION_CACHE_TTL = int(os.getenv('AUTENTICACION_CACHE_TTL', 60))
+
+# Archivo SQLite con el estado de los límites de peticiones de la API; debe
+# ser local y común a todos los workers del servidor (apps.common.throttling)
+THROTTLE_DB_PATH = os.getenv('THROTTLE_DB_PATH', os.path.join(tempfile.gettempdir(), 'biblioteca-throttle.sqlite3'))
+
+# Segundos que se conservan los fragmentos HTML cacheados por objeto
+# (apps.common.fragmentos); la clave cambia con la versión de cada objeto
+CACHE_FRAGMENTOS_TTL = int(os.getenv('CACHE_FRAGMENTOS_TTL', 3600))
+
 # DRF Spectacular settings
 SPECTACULAR_SETTINGS = {
     'TITLE': 'API de Biblioteca',
@@ -272,6 +352,22 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 # MEDIA_ROOT = BASE_DIR / 'media'  # Comentado porque usamos Cloudinary
 
+# Subida de imágenes en segundo plano (apps.common.imagenes): con
+# IMAGENES_WORKER las imágenes esperan en IMAGENES_PENDIENTES_ROOT (disco
+# compartido por la web y el worker) hasta que `procesar_imagenes --continuo`
+# las sube; sin él se suben en la petición al confirmar la transacción. Con apps.common.imagenes.DestinoLocal se guardan en
+# IMAGENES_LOCAL_ROOT en lugar de Cloudinary (desarrollo y tests)
+IMAGENES_WORKER = os.getenv('IMAGENES_WORKER', 'False').lower() in ('true', '1', 't', 'y', 'yes')
+IMAGENES_DESTINO = os.getenv('IMAGENES_DESTINO', 'apps.common.imagenes.DestinoCloudinary')
+IMAGENES_PENDIENTES_ROOT = os.getenv('IMAGENES_PENDIENTES_ROOT', os.path.join(BASE_DIR, 'media', 'pendientes'))
+IMAGENES_LOCAL_ROOT = os.getenv('IMAGENES_LOCAL_ROOT', os.path.join(BASE_DIR, 'media', 'imagenes'))
+IMAGENES_LOCAL_URL = os.getenv('IMAGENES_LOCAL_URL', MEDIA_URL + 'imagenes/')
+# Procesado previo a la subida: formato de salida (WEBP o JPEG), calidad y
+# lado mayor de la imagen principal; las miniaturas tienen tamaños fijos
+IMAGENES_FORMATO = os.getenv('IMAGENES_FORMATO', 'WEBP')
+IMAGENES_CALIDAD = int(os.getenv('IMAGENES_CALIDAD', 82))
+IMAGENES_LADO_MAXIMO = int(os.getenv('IMAGENES_LADO_MAXIMO', 1600))
+
 # Configuración de WhiteNoise eliminada por redundancia
 
 
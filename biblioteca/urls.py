@@ -25,6 +25,8 @@ from apps.libros import views as libros_views
 from apps.prestamos import views as prestamos_views
 from apps.autores.views import AutorViewSet
 from rest_framework.routers import DefaultRouter
+from apps.common.asincrono import vista_asincrona
+from apps.common.views import EstadisticasCacheView
 from django.contrib.auth.decorators import login_required
 
 from rest_framework_simplejwt.views import (
@@ -37,6 +39,7 @@ router.register(r'libros', libros_views.LibroViewSet)
 router.register(r'categorias', libros_views.CategoriaViewSet, basename='categoria')
 router.register(r'autores', AutorViewSet, basename='autor')
 router.register(r'prestamos', prestamos_views.PrestamoViewSet, basename='prestamo')
+router.register(r'estadisticas', prestamos_views.EstadisticasViewSet, basename='estadisticas')
 
 # Cambiar el título del admin
 admin.site.site_header = 'Panel de Administración - Biblioteca'
@@ -54,6 +57,13 @@ urlpatterns = [
     
     # URLs de la API
     path('api/', include(router.urls)),
+    # Lecturas asíncronas del catálogo para el servidor ASGI
+    path('api/async/libros/', vista_asincrona(libros_views.LibroViewSet, 'list', 'libro'), name='async-libro-list'),
+    path('api/async/libros/<int:pk>/', vista_asincrona(libros_views.LibroViewSet, 'retrieve', 'libro'), name='async-libro-detail'),
+    path('api/async/autores/', vista_asincrona(AutorViewSet, 'list', 'autor'), name='async-autor-list'),
+    path('api/async/categorias/', vista_asincrona(libros_views.CategoriaViewSet, 'list', 'categoria'), name='async-categoria-list'),
+    # Administración de la caché (personal)
+    path('api/admin/cache/', EstadisticasCacheView.as_view(), name='admin-cache'),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     # path('api/autores/', include('apps.autores.urls')),  # Eliminado por redundancia
@@ -67,6 +77,7 @@ urlpatterns = [
     # URLs de la aplicación principal
     path('', libros_views.inicio, name='inicio'),
     path('libros/', libros_views.lista_libros, name='lista_libros'),
+    path('libros/mas/', libros_views.lista_libros_mas, name='lista_libros_mas'),
     path('prestamos/', prestamos_views.lista_prestamos, name='lista_prestamos'),
     path('prestamos/crear/', prestamos_views.crear_prestamo, name='crear_prestamo'),
     path('prestamos/devolver/<int:prestamo_id>/', prestamos_views.devolver_libro, name='devolver_libro'),
@@ -0,0 +1,26 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def limpiar_cache():
+    # La caché en memoria sobrevive al rollback de cada test
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def imagenes_locales(settings, tmp_path):
+    # Las imágenes pendientes y subidas van a un directorio temporal, sin Cloudinary
+    settings.IMAGENES_DESTINO = 'apps.common.imagenes.DestinoLocal'
+    settings.IMAGENES_WORKER = True
+    settings.IMAGENES_PENDIENTES_ROOT = str(tmp_path / 'pendientes')
+    settings.IMAGENES_LOCAL_ROOT = str(tmp_path / 'imagenes')
+    settings.IMAGENES_LOCAL_URL = '/media/imagenes/'
+
+
+@pytest.fixture(autouse=True)
+def limites_aislados(settings, tmp_path):
+    # Cada test empieza con las cuotas de la API intactas
+    settings.THROTTLE_DB_PATH = str(tmp_path / 'throttle.sqlite3')
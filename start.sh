@@ -6,5 +6,15 @@ python manage.py migrate --noinput
 echo "🔵 Recolectando archivos estáticos..."
 python manage.py collectstatic --noinput
 
-echo "🟢 Iniciando servidor Gunicorn..."
-gunicorn biblioteca.wsgi:application --bind 0.0.0.0:8000
+if [ "$IMAGENES_WORKER" = "true" ]; then
+    echo "🟣 Iniciando worker de imágenes..."
+    python manage.py procesar_imagenes --continuo &
+fi
+
+if [ "$SERVIDOR" = "asgi" ]; then
+    echo "🟢 Iniciando servidor Gunicorn (ASGI, workers de uvicorn)..."
+    gunicorn biblioteca.asgi:application -k uvicorn_worker.UvicornWorker --bind 0.0.0.0:8000
+else
+    echo "🟢 Iniciando servidor Gunicorn..."
+    gunicorn biblioteca.wsgi:application --bind 0.0.0.0:8000
+fi